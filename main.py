@@ -6,11 +6,43 @@ Description: 基于AI模型生成跨文化交流主题的英文文章
 使用方法：
     python main.py          # 启动GUI界面（默认）
     python main.py --cli    # 启动命令行界面
+    python main.py generate --topics config/topics.json --concurrency 4 --out output
+    python main.py plan --concurrency 4         # 估算token数、花费和耗时（不调用API）
+    python main.py experiment --sample 8        # 比较提示词变体的token数、延迟和质量
+    cat keywords.txt | python main.py generate --stdin --jsonl
+    python main.py serve --port 8765            # 启动本地HTTP服务
+    python main.py analyze --dir output         # 分析已生成文章的词汇水平
+    python main.py search "eye contact hospitality"   # 全文搜索已生成的文章
+    python main.py export --format md,pdf       # 导出为课堂讲义（Markdown / DOCX / PDF）
+    python main.py archive                      # 打包为压缩归档（分发和备份）
 """
 
+import argparse
+import contextlib
+import json
 import os
 import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
 from src.generator import ArticleGenerator
+from src.errors import BudgetExceededError, GenerationError
+from src.storage import safe_name, save_article
+from src.profiling import Profiler, print_summary
+from src.metrics import MetricsExporter
+from src.pipeline import print_stats
+from src.search import index_saved, open_index
+from src.manifest import Manifest, describe_changes, stale_counts, topics_key
+
+
+# 退出码
+EXIT_OK = 0
+EXIT_ERROR = 1          # 配置或初始化错误
+EXIT_USAGE = 2          # 参数错误（argparse）
+EXIT_PARTIAL = 3        # 部分文章生成失败
+EXIT_ABORTED = 4        # 批次被终止（鉴权、模型错误或断路器打开）
+EXIT_PAUSED = 5         # 达到预算上限，已保存检查点
+EXIT_INTERRUPTED = 130  # Ctrl+C
 
 
 def run_gui():
@@ -75,21 +107,74 @@ def check_env_file():
     return True
 
 
-def run_cli():
-    """启动命令行界面"""
+def create_profiler(args) -> Optional[Profiler]:
+    """
+    按命令行参数创建性能分析器
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        Profiler 实例，未指定 --profile 时返回 None
+    """
+    if not getattr(args, 'profile', None):
+        return None
+    return Profiler(cpu=args.cprofile, memory=args.tracemalloc)
+
+
+def start_metrics(generator: ArticleGenerator, args=None):
+    """
+    按命令行参数和环境变量（METRICS_PORT、METRICS_FILE）启动运行指标导出
+
+    Args:
+        generator: 文章生成器
+        args: 命令行参数（--metrics-port、--metrics-file）
+
+    Returns:
+        MetricsExporter 实例，未配置端口和文件时返回 None
+    """
+    exporter = MetricsExporter.from_env(generator.enable_metrics(), port=getattr(args, 'metrics_port', None),
+                                        path=getattr(args, 'metrics_file', None))
+    if not exporter.enabled:
+        return None
+    try:
+        exporter.start()
+    except OSError as e:
+        print(f"⚠️  Cannot start metrics on {exporter.host}:{exporter.port}: {e}")
+        return None
+    return exporter
+
+
+def run_cli(args=None):
+    """
+    启动命令行界面
+
+    Args:
+        args: 命令行参数（用于 --profile 等选项）
+    """
     print_banner()
 
     # 检查环境配置
     if not check_env_file():
         sys.exit(1)
 
+    generator = None
     try:
         # 初始化生成器
         print("🔧 Initializing Article Generator...")
         generator = ArticleGenerator()
+        generator.watch_settings()
         print(f"✓ Using model: {generator.model_name}")
+        if generator.router:
+            pool = ', '.join(f"{entry['model']} ({entry['tier']})" for entry in generator.router.stats())
+            print(f"✓ Model pool: {pool}")
         print(f"✓ Target article length: {generator.article_length} words")
 
+        profiler = create_profiler(args)
+        if profiler:
+            generator.enable_profiling(profiler)
+        start_metrics(generator)
+
         # 显示菜单
         print("\n" + "="*60)
         print("Please select an option:")
@@ -112,18 +197,23 @@ def run_cli():
             keyword = input("\nEnter the keyword/topic: ").strip()
             if keyword:
                 print(f"\n🚀 Generating CET-6 level article for: {keyword}")
-                article = generator.generate_article(keyword, f"An essay about {keyword}")
-
-                os.makedirs("output", exist_ok=True)
-                filename = f"{keyword.replace('/', '_').replace(' ', '_')}.txt"
-                filepath = os.path.join("output", filename)
+                with generator.profiler.profile_thread():
+                    article = generator.generate_article(keyword, f"An essay about {keyword}")
+                # 等进度信息打印完再输出结果
+                generator.events.flush()
 
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(f"Topic: {keyword}\n")
-                    f.write(f"{'='*60}\n\n")
-                    f.write(article)
+                filepath = os.path.join("output", f"{safe_name(keyword)}.txt")
+                with generator.profiler.span('file.write', file=filepath):
+                    save_article(filepath, keyword, article)
+                search_index = open_index("output")
+                index_saved(search_index, filepath, keyword, article)
+                if search_index:
+                    search_index.close()
 
                 print(f"✓ Article saved to: {filepath}")
+
+                if profiler:
+                    print_summary(profiler, profiler.export(args.profile))
             else:
                 print("❌ No keyword provided!")
 
@@ -131,16 +221,970 @@ def run_cli():
             print("❌ Invalid choice!")
 
     except Exception as e:
+        if generator:
+            generator.events.flush()
         print(f"\n❌ Error: {str(e)}")
         sys.exit(1)
 
 
+def read_stdin_tasks(stream):
+    """
+    逐行读取关键词，生成任务（空行和以#开头的行被忽略）
+
+    Args:
+        stream: 输入流
+
+    Yields:
+        任务字典（格式见 ArticleGenerator.build_tasks）
+    """
+    for line in stream:
+        keyword = line.strip()
+        if not keyword or keyword.startswith('#'):
+            continue
+        yield {
+            'group': '',
+            'keyword': keyword,
+            'description': f"An essay about {keyword}",
+            'is_subtopic': False,
+            'main_keyword': "",
+            'filename': f"{safe_name(keyword)}.txt"
+        }
+
+
+def run_generate(args) -> int:
+    """
+    非交互式批量生成（generate 子命令）
+
+    结果以JSONL逐行写入标准输出，进度和日志写入标准错误。
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        退出码
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        if not check_env_file():
+            return EXIT_ERROR
+
+    try:
+        generator = ArticleGenerator(args.out)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.candidates:
+        generator.candidates = max(1, args.candidates)
+
+    profiler = create_profiler(args)
+    if profiler:
+        generator.enable_profiling(profiler)
+    generator.watch_settings()
+    with contextlib.redirect_stdout(sys.stderr):
+        exporter = start_metrics(generator, args)
+
+    stdout = sys.stdout
+    lock = threading.Lock()
+    counts = {'ok': 0, 'failed': 0, 'skipped': 0}
+    failures = []
+    saved = {}
+    total = None
+    started = time.monotonic()
+
+    if not args.stdin:
+        try:
+            total = len(generator.build_tasks(generator.load_topics(args.topics)))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Cannot load topics from {args.topics}: {e}", file=sys.stderr)
+            return EXIT_ERROR
+
+    def on_result(result):
+        with lock:
+            counts[result['status']] += 1
+            if result['status'] == 'failed':
+                failures.append({key: result.get(key) for key in ('keyword', 'error', 'message')})
+            elif result.get('file'):
+                saved.setdefault(result['group'], []).append(os.path.relpath(result['file'], args.out))
+            done = sum(counts.values())
+            elapsed = time.monotonic() - started
+            mark = {'ok': '✓', 'failed': '✗', 'skipped': '↷'}[result['status']]
+            sys.stderr.write(f"[{done}/{total if total is not None else '?'}] {mark} {result['keyword']} | "
+                             f"ok={counts['ok']} failed={counts['failed']} | {elapsed:.1f}s\n")
+            sys.stderr.flush()
+            if args.jsonl:
+                record = {key: value for key, value in result.items() if key != 'fatal'}
+                stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+                stdout.flush()
+
+    # 生成器的日志输出重定向到标准错误（--quiet 时丢弃），标准输出只留给结果
+    log_target = open(os.devnull, 'w') if args.quiet else sys.stderr
+    status = 'completed'
+    # 自适应并发时 --concurrency 是上限，未指定时使用 ADAPTIVE_MAX
+    adaptive = args.adaptive or os.getenv('ADAPTIVE_CONCURRENCY', 'false').strip().lower() == 'true'
+    concurrency = args.concurrency
+    if adaptive and concurrency <= 1:
+        concurrency = int(os.getenv('ADAPTIVE_MAX', '16'))
+    try:
+        with contextlib.redirect_stdout(log_target):
+            if args.stdin:
+                try:
+                    generator.run_tasks(read_stdin_tasks(sys.stdin), args.out, concurrency,
+                                        on_result=on_result, adaptive=adaptive)
+                except BudgetExceededError as e:
+                    status = 'paused'
+                    print(f"⏸ Batch paused: {e}", file=sys.stderr)
+                except GenerationError as e:
+                    status = 'aborted'
+                    print(f"❌ Batch aborted: {e}", file=sys.stderr)
+            else:
+                generator.generate_all_articles(args.out, resume=not args.no_resume,
+                                                concurrency=concurrency, topics_path=args.topics,
+                                                on_result=on_result, adaptive=adaptive,
+                                                incremental=args.incremental or args.prune,
+                                                prune=args.prune)
+                status = generator.last_run_status
+    except KeyboardInterrupt:
+        status = 'interrupted'
+    finally:
+        # 停止检查配置文件，之后的输出只有汇总行
+        generator.settings_manager.stop()
+        if args.quiet:
+            log_target.close()
+        if exporter:
+            # 写入最终的指标文件
+            exporter.stop()
+
+    elapsed = time.monotonic() - started
+    profile_files = {}
+    if profiler:
+        profile_files = profiler.export(args.profile)
+        print_summary(profiler, profile_files, stream=sys.stderr)
+        print_stats(generator.last_pipeline_stats, stream=sys.stderr)
+
+    summary = {
+        'type': 'summary',
+        'status': status,
+        'total': total if total is not None else sum(counts.values()),
+        **counts,
+        'elapsed': round(elapsed, 3),
+        'articles_per_s': round(counts['ok'] / elapsed, 4) if elapsed > 0 else 0.0,
+        'budget': generator.budget.summary(),
+        'failures': failures,
+        'pipeline': generator.last_pipeline_stats,
+        'groups': generator.last_group_times,
+    }
+    if generator.last_run_changes:
+        changes = generator.last_run_changes
+        summary['changes'] = {**stale_counts(changes), 'up_to_date': len(changes['up_to_date']),
+                              'orphans': changes['orphans'], 'removed': changes['removed']}
+    if generator.last_concurrency_stats:
+        summary['concurrency'] = generator.last_concurrency_stats
+    if generator.router:
+        summary['models'] = generator.router.stats()
+    if generator.cassette:
+        summary['cassette'] = generator.cassette.stats()
+    if profile_files:
+        summary['profile'] = profile_files
+    if args.export and saved and status in ('completed', 'paused'):
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                summary['export'] = export_results(args.export, args.out, args.topics, saved)
+            except (OSError, ValueError) as e:
+                print(f"❌ Export failed: {e}")
+    stdout.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    stdout.flush()
+
+    if status == 'interrupted':
+        return EXIT_INTERRUPTED
+    if status == 'paused':
+        return EXIT_PAUSED
+    if status == 'aborted':
+        return EXIT_ABORTED
+    if counts['failed']:
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def format_duration(seconds: float) -> str:
+    """把秒数格式化为 1h02m、3m20s 或 45s"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def run_plan(args) -> int:
+    """
+    估算一次批量生成的token数、花费和耗时，不调用API（plan 子命令）
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        退出码
+    """
+    from src.planner import plan_run
+
+    log = sys.stderr if args.json else sys.stdout
+    with contextlib.redirect_stdout(log):
+        if not check_env_file():
+            return EXIT_ERROR
+        try:
+            generator = ArticleGenerator(args.out)
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            return EXIT_ERROR
+    if args.candidates:
+        generator.candidates = max(1, args.candidates)
+
+    try:
+        tasks = generator.build_tasks(generator.load_topics(args.topics))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Cannot load topics from {args.topics}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    # 与 generate 相同：跳过检查点中已完成的任务，--incremental 时还跳过输入没有变化的文章
+    done = set()
+    if not args.no_resume:
+        completed = set(generator._load_checkpoint(os.path.join(args.out, '.checkpoint.json')))
+        done = {task['filename'] for task in tasks if task['filename'] in completed}
+    changes = None
+    if args.incremental:
+        fingerprints = {task['filename']: generator.task_fingerprint(task) for task in tasks}
+        changes = Manifest(args.out).compare(tasks, fingerprints, topics_key(args.topics))
+        done |= changes['up_to_date']
+    tasks = [task for task in tasks if task['filename'] not in done]
+
+    plan = plan_run(generator, tasks, args.concurrency)
+    plan['skipped'] = len(done)
+    if changes:
+        plan['changes'] = {**stale_counts(changes), 'up_to_date': len(changes['up_to_date']),
+                           'orphans': changes['orphans']}
+    if args.json:
+        print(json.dumps(plan, ensure_ascii=False))
+        return EXIT_OK
+
+    print(f"📋 Plan for {args.topics}: {plan['tasks']} article(s)"
+          + (f", {len(done)} already done" if done else "")
+          + f" | candidates={plan['candidates']} | tokenizer: {plan['tokenizer']}\n")
+    if changes:
+        print(f"🔁 Incremental: {describe_changes(changes)}\n")
+    print(f"{'Group':<28} {'Articles':>8} {'Input':>9} {'Output':>9} {'Cost':>10}")
+    for group in plan['groups']:
+        print(f"{(group['group'] or '-')[:28]:<28} {group['requests']:>8} {group['input_tokens']:>9} "
+              f"{group['output_tokens']:>9} {'$' + format(group['cost'], '.4f'):>10}")
+    print(f"{'Total':<28} {plan['requests']:>8} {plan['input_tokens']:>9} {plan['output_tokens']:>9} "
+          f"{'$' + format(plan['cost'], '.4f'):>10}\n")
+    for model in plan['models']:
+        print(f"🤖 {model['model']}: {model['requests']} request(s), ~{model['latency_s']:.1f}s each "
+              f"({model['latency_source']})")
+    for limiter in plan['limiters']:
+        limits = ', '.join(f"{name.upper()}={limiter[name]:g}" for name in ('rpm', 'tpm') if limiter[name] > 0)
+        print(f"🚦 {limits or 'no rate limit'}: {limiter['requests']} request(s), {limiter['tokens']} tokens "
+              f"→ at least {format_duration(limiter['seconds'])}")
+    print(f"⏱  Estimated time: {format_duration(plan['wall_s'])} at concurrency {plan['concurrency']} "
+          f"(bound by {plan['bottleneck']})")
+    budget = f" (run budget ${plan['budget_limit']:.2f})" if plan['budget_limit'] > 0 else ""
+    print(f"💰 Estimated cost: ${plan['cost']:.4f}{budget}")
+    if 0 < plan['budget_limit'] < plan['cost']:
+        print(f"⚠️  Estimated cost exceeds BUDGET_RUN_LIMIT; the run would pause after about "
+              f"{plan['budget_limit'] / plan['cost']:.0%} of the articles")
+    return EXIT_OK
+
+
+def parse_formats(value: str):
+    """解析逗号分隔的导出格式（argparse 类型函数）"""
+    from src.export import FORMATS
+
+    formats = [fmt.strip().lower() for fmt in value.split(',') if fmt.strip()]
+    if 'all' in formats:
+        return list(FORMATS)
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"invalid format(s): {value} (choose from {', '.join(FORMATS)}, all)")
+    return formats
+
+
+def export_results(formats, output_dir: str, topics_path: str, results=None, out_dir=None,
+                   workers=None, title: str = "Article Collection"):
+    """
+    导出文章并打印输出文件
+
+    Args:
+        formats: 导出格式列表
+        output_dir: 文章目录
+        topics_path: 主题配置文件
+        results: 本次生成的文章 {分组: [文件名]}（为 None 时导出整个目录）
+        out_dir: 导出目录
+        workers: 工作进程数
+        title: 文档标题
+
+    Returns:
+        {格式: [输出文件路径]}
+    """
+    from src.export import export_corpus
+
+    started = time.monotonic()
+    files = export_corpus(formats, output_dir, out_dir, topics_path, results, workers, title)
+    for fmt, paths in files.items():
+        for path in paths:
+            print(f"📦 {fmt.upper():<5}{path}")
+    print(f"✅ Export finished in {time.monotonic() - started:.1f}s")
+    return files
+
+
+def run_export(args) -> int:
+    """
+    导出已生成的文章（export 子命令）
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        退出码（有格式因缺少依赖被跳过时返回 EXIT_PARTIAL）
+    """
+    if not os.path.isdir(args.dir):
+        print(f"❌ Cannot read {args.dir}: not a directory", file=sys.stderr)
+        return EXIT_ERROR
+    try:
+        files = export_results(args.format, args.dir, args.topics, out_dir=args.out,
+                               workers=args.workers, title=args.title)
+    except (OSError, ValueError) as e:
+        print(f"❌ Export failed: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    return EXIT_OK if all(files.values()) else EXIT_PARTIAL
+
+
+def parse_variants(value: str):
+    """解析 --variants 参数：逗号分隔的提示词变体，或 all"""
+    from src.prompts import PROMPT_VARIANTS
+
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if names == ['all']:
+        return list(PROMPT_VARIANTS)
+    unknown = [name for name in names if name not in PROMPT_VARIANTS]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(
+            f"unknown variant(s): {', '.join(unknown) or value} (choose from {', '.join(PROMPT_VARIANTS)} or all)")
+    return list(dict.fromkeys(names))
+
+
+def run_experiment(args) -> int:
+    """
+    在抽样主题上比较提示词变体（experiment 子命令）
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        退出码（有试验失败时返回 EXIT_PARTIAL）
+    """
+    from src.cache import ArticleCache
+    from src.experiment import CACHE_TTL, DEFAULT_CACHE_DIR, run_experiment as run_trials, sample_tasks, \
+        summarize_variants
+
+    log = sys.stderr if args.json else sys.stdout
+    with contextlib.redirect_stdout(log):
+        if not check_env_file():
+            return EXIT_ERROR
+        try:
+            generator = ArticleGenerator()
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            return EXIT_ERROR
+    try:
+        tasks = generator.build_tasks(generator.load_topics(args.topics))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Cannot load topics from {args.topics}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    tasks = sample_tasks(tasks, args.sample, args.seed)
+    cache = None if args.no_cache else ArticleCache(args.cache_dir or DEFAULT_CACHE_DIR, ttl=CACHE_TTL)
+    total = len(tasks) * len(args.variants) * args.repeats
+    print(f"🧪 {len(args.variants)} variant(s) × {len(tasks)} topic(s) × {args.repeats} = {total} trial(s) "
+          f"on {generator.model_name}, concurrency {args.concurrency}", file=log)
+    done = [0]
+    lock = threading.Lock()
+
+    def on_trial(trial):
+        with lock:
+            done[0] += 1
+            mark = '✓' if trial['ok'] else '✗'
+            detail = 'cached' if trial['cached'] else \
+                (f"{trial['latency']:.1f}s" if trial['ok'] else trial['error'])
+            print(f"[{done[0]}/{total}] {mark} {trial['variant']:<8} {trial['keyword']} ({detail})", file=log)
+
+    started = time.monotonic()
+    with contextlib.redirect_stdout(log):
+        try:
+            trials = run_trials(generator, tasks, args.variants, args.repeats, args.concurrency, cache, on_trial)
+        finally:
+            generator.events.flush()
+    elapsed = time.monotonic() - started
+    rows = summarize_variants(trials, args.variants)
+
+    if args.json:
+        for trial in trials:
+            print(json.dumps({'type': 'trial', **trial}, ensure_ascii=False))
+        for row in rows:
+            print(json.dumps({'type': 'variant', **row}, ensure_ascii=False))
+    else:
+        def number(value, spec: str = '.0f', suffix: str = '') -> str:
+            return '-' if value is None else f"{value:{spec}}{suffix}"
+
+        print(f"\n{'Variant':<9} {'OK':>5} {'Prompt':>7} {'Input':>7} {'Δin':>6} {'Output':>7} {'Usage':>8} "
+              f"{'p50':>6} {'p95':>6} "
+              f"{'TTFT':>6} {'Pass':>5} {'Score':>6} {'CET6':>5} {'Trans':>5} {'Regen':>5}")
+        for row in rows:
+            print(f"{row['variant']:<9} {row['ok']:>2}/{row['trials']:<2} {number(row['prompt_tokens']):>7} "
+                  f"{number(row['input_tokens']):>7} {number(row['input_change'], '+.0%'):>6} "
+                  f"{number(row['output_tokens']):>7} {row['usage'] or '-':>8} "
+                  f"{number(row['latency_p50'], '.1f', 's'):>6} "
+                  f"{number(row['latency_p95'], '.1f', 's'):>6} {number(row['ttft_p50'], '.2f', 's'):>6} "
+                  f"{number(row['pass_rate'], '.0%'):>5} {number(row['score'], '.3f'):>6} "
+                  f"{number(row['cet6_types'], '.1f'):>5} {number(row['transitions'], '.1f'):>5} "
+                  f"{number(row['regenerate_rate'], '.0%'):>5}")
+        cached = sum(row['cached'] for row in rows)
+        summary = generator.budget.summary()
+        print(f"\n⏱  {elapsed:.1f}s | {cached} cached trial(s) | "
+              f"💰 {summary['prompt_tokens']} in / {summary['completion_tokens']} out, ${summary['run_cost']:.4f}")
+        print("   Prompt = local estimate of the template; Input/Output = mean tokens per request, "
+              "reported by the API or estimated locally (Usage); "
+              "CET6 = distinct CET-6 words; Regen = share failing the analyze thresholds")
+        if any(row['usage'] in ('estimate', 'mixed') for row in rows):
+            print("⚠️  The API did not report usage for some trials; their Input/Output are local estimates")
+    return EXIT_OK if all(trial['ok'] for trial in trials) else EXIT_PARTIAL
+
+
+def format_size(size: int) -> str:
+    """把字节数格式化为 B、KB 或 MB"""
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.1f} MB"
+    if size >= 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size} B"
+
+
+def run_archive(args) -> int:
+    """
+    把已生成的文章打包为压缩归档，或从归档中列出、读取、解压文章（archive 子命令）
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        退出码（--get 找不到文章时返回 EXIT_PARTIAL）
+    """
+    from src.archive import ArchiveError, CorpusArchive, archive_directory
+
+    path = args.file or os.path.join(args.dir, 'export', 'articles.arc')
+    try:
+        if args.list or args.get or args.extract:
+            with CorpusArchive(path) as archive:
+                if archive.recovered:
+                    print(f"⚠️  {path} has no index (interrupted write?); rebuilt it by scanning", file=sys.stderr)
+                if args.list:
+                    for name in archive.names():
+                        print(f"{name}\t{archive.topic(name)}")
+                elif args.get:
+                    names = archive.find(args.get)
+                    if not names:
+                        print(f"❌ No article matching \"{args.get}\" in {path}", file=sys.stderr)
+                        return EXIT_PARTIAL
+                    if len(names) > 1:
+                        print(f"ℹ️  {len(names)} articles match; showing {names[0]}", file=sys.stderr)
+                    sys.stdout.write(archive.read(names[0]))
+                else:
+                    written = archive.extract(args.extract)
+                    print(f"📂 Extracted {len(written)} article(s) to {args.extract}")
+            return EXIT_OK
+
+        if not os.path.isdir(args.dir):
+            print(f"❌ Cannot read {args.dir}: not a directory", file=sys.stderr)
+            return EXIT_ERROR
+        started = time.monotonic()
+        result = archive_directory(args.dir, path, args.codec, args.rebuild)
+    except FileNotFoundError as e:
+        print(f"❌ Cannot open archive: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    except (OSError, ValueError, ArchiveError) as e:
+        print(f"❌ Archive failed: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print(f"📦 {result['path']}: +{result['added']} ~{result['updated']} ={result['unchanged']} "
+              f"({time.monotonic() - started:.2f}s)")
+        print(f"   {result['articles']} article(s), {format_size(result['raw_bytes'])} → "
+              f"{format_size(result['file_bytes'])} ({result['ratio']:.1f}x, {result['codec']}, "
+              f"{format_size(result['dict_bytes'])} dictionary)")
+    return EXIT_OK
+
+
+def run_serve(args) -> int:
+    """
+    启动本地HTTP服务（serve 子命令）
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        退出码
+    """
+    from src.server import serve
+
+    if not check_env_file():
+        return EXIT_ERROR
+
+    try:
+        generator = ArticleGenerator(args.out)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return EXIT_ERROR
+    generator.watch_settings()
+
+    try:
+        serve(generator, args.host, args.port, args.out, args.concurrency)
+    except OSError as e:
+        print(f"❌ Cannot start server on {args.host}:{args.port}: {e}")
+        return EXIT_ERROR
+    return EXIT_OK
+
+
+def run_analyze(args) -> int:
+    """
+    批量分析已生成的文章（analyze 子命令）
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        退出码（--strict 时有不达标的文章返回 EXIT_PARTIAL）
+    """
+    from src.analyzer import analyze_articles, get_wordlist, summarize
+    from src.storage import read_article
+
+    try:
+        names = sorted(name for name in os.listdir(args.dir)
+                       if name.endswith('.txt') and not name.startswith('.'))
+    except OSError as e:
+        print(f"❌ Cannot read {args.dir}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    try:
+        wordlist = get_wordlist(args.wordlist)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot load word list: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    # 逐篇读取（只保留文件名和主题，不在内存中保留全文），无法读取或不是 UTF-8 的文件跳过并报告
+    analyzed: List[str] = []
+    topics: List[Dict] = []
+    skipped: List[str] = []
+
+    def texts() -> Iterator[str]:
+        for name in names:
+            try:
+                article = read_article(os.path.join(args.dir, name))
+            except (OSError, UnicodeDecodeError) as e:
+                skipped.append(name)
+                print(f"⚠️  Skipped {name}: {e}", file=sys.stderr)
+                continue
+            analyzed.append(name)
+            topics.append({'topic': article['topic']})
+            yield f"{article['title']}\n\n{article['body']}"
+
+    thresholds = {}
+    if args.min_cet6 is not None:
+        thresholds['min_cet6_types'] = args.min_cet6
+    if args.min_transitions is not None:
+        thresholds['min_transitions'] = args.min_transitions
+    reports = analyze_articles(texts(), wordlist, thresholds, include_words=args.json)
+    summary = summarize(reports)
+    summary['skipped'] = skipped
+    summary['wordlist'] = {'headwords': len(wordlist.levels), 'partial': wordlist.partial}
+    flagged = [(name, article, report) for name, article, report in zip(analyzed, topics, reports)
+               if report['regenerate']]
+    # 内置词表只是精选子集，此时不把结果称为四六级词汇覆盖率
+    band4, band6 = ('L4', 'L6') if wordlist.partial else ('CET4', 'CET6')
+
+    if args.json:
+        for name, article, report in zip(analyzed, topics, reports):
+            print(json.dumps({'file': name, 'topic': article['topic'], **report}, ensure_ascii=False))
+        print(json.dumps({'type': 'summary', **summary}, ensure_ascii=False))
+    else:
+        print(f"{'File':<40}{'Words':>7}{band4 + '%':>8}{band6 + '%':>8}{band6:>6}{'RTTR':>7}"
+              f"{'Sent':>7}{'Trans':>7}  Status")
+        for name, report in zip(analyzed, reports):
+            status = '; '.join(report['regenerate']) or 'ok'
+            print(f"{name[:39]:<40}{report['tokens']:>7}{report['coverage']['cet4'] * 100:>7.1f}%"
+                  f"{report['coverage']['cet6'] * 100:>7.1f}%{report['cet6_types']:>6}"
+                  f"{report['root_ttr']:>7.2f}{report['sentence_length']['mean']:>7.1f}"
+                  f"{report['transitions']:>7}  {status}")
+        coverage = (f"{band4} {summary['coverage']['cet4']:.1%}, {band6} {summary['coverage']['cet6']:.1%}")
+        print(f"\n📊 {summary['articles']} article(s), {summary['tokens']} words | {coverage} | "
+              f"mean sentence {summary['mean_sentence_length']} words | "
+              f"{summary['flagged']} flagged for regeneration")
+        if wordlist.partial:
+            print(f"   L4/L6 = words from the CET-4/CET-6 sections of a partial word list "
+                  f"({len(wordlist.levels)} headwords), not coverage of the full CET syllabus")
+        if skipped:
+            print(f"⚠️  {len(skipped)} file(s) skipped (unreadable or not UTF-8)")
+
+    if args.regenerate and flagged:
+        return regenerate_articles(args, flagged)
+    if args.strict and flagged:
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def regenerate_articles(args, flagged) -> int:
+    """
+    重新生成分析不达标的文章
+
+    Args:
+        args: 命令行参数
+        flagged: [(文件名, {'topic': 主题}, 报告)] 列表
+
+    Returns:
+        退出码
+    """
+    log = sys.stderr if args.json else sys.stdout
+    with contextlib.redirect_stdout(log):
+        if not check_env_file():
+            return EXIT_ERROR
+        try:
+            generator = ArticleGenerator(args.dir)
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            return EXIT_ERROR
+
+        # 优先使用主题配置中的描述，其余按文件头部的主题重新生成
+        names = {name for name, _, _ in flagged}
+        try:
+            tasks = [task for task in generator.build_tasks(generator.load_topics(args.topics))
+                     if task['filename'] in names]
+        except (OSError, ValueError, KeyError):
+            tasks = []
+        known = {task['filename'] for task in tasks}
+        for name, article, _ in flagged:
+            if name not in known and article['topic']:
+                keyword = article['topic']
+                tasks.append({
+                    'group': '',
+                    'keyword': keyword,
+                    'description': f"An essay about {keyword}",
+                    'is_subtopic': False,
+                    'main_keyword': "",
+                    'filename': name
+                })
+
+        print(f"\n🔁 Regenerating {len(tasks)} article(s)...")
+        try:
+            results = generator.run_tasks(tasks, args.dir, args.concurrency)
+        except BudgetExceededError as e:
+            print(f"⏸ Regeneration paused: {e}")
+            return EXIT_PAUSED
+        except GenerationError as e:
+            print(f"❌ Regeneration aborted: {e}")
+            return EXIT_ABORTED
+
+    if any(result['status'] == 'failed' for result in results):
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def run_search(args) -> int:
+    """
+    全文搜索已生成的文章（search 子命令）
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        退出码（没有结果时返回 EXIT_PARTIAL）
+    """
+    from src.search import SearchIndex
+
+    try:
+        index = SearchIndex(args.dir)
+        if args.rebuild:
+            # 先关闭连接再删除数据库和 WAL 附属文件（否则 Windows 上无法删除，旧的 -wal 也可能被重放到新库中）
+            index.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(index.index_path + suffix):
+                    os.remove(index.index_path + suffix)
+            index = SearchIndex(args.dir)
+        started = time.monotonic()
+        added, updated, removed = index.refresh()
+        if added or updated or removed:
+            print(f"🔄 Index updated: +{added} ~{updated} -{removed} "
+                  f"({time.monotonic() - started:.2f}s)", file=sys.stderr)
+        started = time.monotonic()
+        results = index.search(args.query, args.limit)
+        elapsed = time.monotonic() - started
+        total = index.count()
+        index.close()
+    except Exception as e:
+        print(f"❌ Search failed: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
+    else:
+        print(f"🔍 {len(results)} result(s) for \"{args.query}\" in {total} article(s) ({elapsed * 1000:.1f} ms)\n")
+        for rank, result in enumerate(results, 1):
+            print(f"{rank:>3}. [{result['score']:.2f}] {result['title'] or result['topic']}")
+            print(f"     {os.path.join(args.dir, result['path'])}")
+            print(f"     {result['snippet']}\n")
+    return EXIT_OK if results else EXIT_PARTIAL
+
+
+def _defaults(subcommand: bool) -> dict:
+    """子命令中重复的参数不设默认值，避免覆盖写在子命令之前的同名参数"""
+    return {'default': argparse.SUPPRESS} if subcommand else {}
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser, subcommand: bool = False):
+    """
+    添加性能分析相关参数
+
+    Args:
+        parser: 参数解析器
+        subcommand: 是否为子命令（顶层解析器已有同名参数）
+    """
+    defaults = _defaults(subcommand)
+    parser.add_argument('--profile', nargs='?', const=os.path.join('output', 'profile'), metavar='DIR',
+                        help='记录各阶段耗时并导出 Chrome trace（默认目录: output/profile）', **defaults)
+    parser.add_argument('--cprofile', action='store_true',
+                        help='与 --profile 一起使用，同时导出 cProfile 数据', **defaults)
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='与 --profile 一起使用，同时导出内存分配快照', **defaults)
+
+
+def add_cassette_arguments(parser: argparse.ArgumentParser, subcommand: bool = False):
+    """
+    添加请求录制/回放相关参数
+
+    Args:
+        parser: 参数解析器
+        subcommand: 是否为子命令（顶层解析器已有同名参数）
+    """
+    defaults = _defaults(subcommand)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='FILE',
+                       help='把每次API请求和响应录制到 cassette 文件（.jsonl.gz）', **defaults)
+    group.add_argument('--replay', metavar='FILE',
+                       help='不访问网络，从 cassette 文件回放录制的响应', **defaults)
+    parser.add_argument('--replay-timing', choices=['original', 'none'],
+                        help='回放时按原始耗时（original，默认）或零延迟（none）返回', **defaults)
+
+
+def apply_cassette_arguments(args):
+    """
+    把录制/回放参数写入环境变量（生成器初始化时读取，GUI 同样生效）
+
+    Args:
+        args: 命令行参数
+    """
+    if getattr(args, 'record', None):
+        os.environ.update(CASSETTE_MODE='record', CASSETTE_PATH=args.record)
+    elif getattr(args, 'replay', None):
+        os.environ.update(CASSETTE_MODE='replay', CASSETTE_PATH=args.replay)
+    if getattr(args, 'replay_timing', None):
+        os.environ['CASSETTE_TIMING'] = args.replay_timing
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    创建命令行参数解析器
+
+    Returns:
+        参数解析器
+    """
+    parser = argparse.ArgumentParser(
+        description="英文文章生成器 - 不带参数时启动GUI界面"
+    )
+    parser.add_argument('--cli', '-c', '--console', action='store_true', dest='cli',
+                        help='启动交互式命令行界面')
+    add_profile_arguments(parser)
+    add_cassette_arguments(parser)
+
+    subparsers = parser.add_subparsers(dest='command')
+
+    generate = subparsers.add_parser('generate', help='非交互式批量生成文章')
+    source = generate.add_mutually_exclusive_group()
+    source.add_argument('--topics', metavar='FILE', default=os.path.join('config', 'topics.json'),
+                        help='主题配置文件（默认: config/topics.json）')
+    source.add_argument('--stdin', action='store_true',
+                        help='从标准输入逐行读取关键词')
+    generate.add_argument('--concurrency', '-j', type=int, default=1, metavar='N',
+                          help='并发请求数（默认: 1）')
+    generate.add_argument('--out', metavar='DIR', default='output',
+                          help='输出目录（默认: output）')
+    generate.add_argument('--adaptive', action='store_true',
+                          help='按延迟和429自动调整并发数（--concurrency 为上限，默认 ADAPTIVE_MAX=16）')
+    generate.add_argument('--candidates', '-n', type=int, metavar='N',
+                          help='每次请求生成N篇候选文章，在本地选出最好的一篇（默认: CANDIDATES 配置）')
+    generate.add_argument('--jsonl', action='store_true',
+                          help='每完成一篇文章向标准输出写一行JSON')
+    generate.add_argument('--no-resume', action='store_true',
+                          help='忽略上次暂停时保存的检查点')
+    generate.add_argument('--incremental', '-i', action='store_true',
+                          help='只生成新增或输入（描述、模板、模型、参数）有变化的文章')
+    generate.add_argument('--prune', action='store_true',
+                          help='增量生成时删除由该主题文件生成、但已从中移除的文章（隐含 --incremental）')
+    generate.add_argument('--quiet', '-q', action='store_true',
+                          help='不输出生成过程日志，只保留进度行')
+    generate.add_argument('--export', type=parse_formats, metavar='FORMATS',
+                          help='生成结束后导出本次生成的文章，如 md,pdf 或 all（输出到 OUT/export）')
+    generate.add_argument('--metrics-port', type=int, metavar='PORT',
+                          help='在本地端口提供 Prometheus 格式的运行指标（/metrics，默认: METRICS_PORT 配置）')
+    generate.add_argument('--metrics-file', metavar='FILE',
+                          help='每隔 METRICS_INTERVAL 秒把运行指标写入文件（供 node_exporter textfile 收集器读取）')
+    add_profile_arguments(generate, subcommand=True)
+    add_cassette_arguments(generate, subcommand=True)
+
+    plan = subparsers.add_parser('plan', help='估算批量生成的token数、花费和耗时（不调用API）')
+    plan.add_argument('--topics', metavar='FILE', default=os.path.join('config', 'topics.json'),
+                      help='主题配置文件（默认: config/topics.json）')
+    plan.add_argument('--concurrency', '-j', type=int, default=1, metavar='N',
+                      help='计划的并发请求数（默认: 1）')
+    plan.add_argument('--candidates', '-n', type=int, metavar='N',
+                      help='每次请求的候选文章数（默认: CANDIDATES 配置）')
+    plan.add_argument('--out', metavar='DIR', default='output',
+                      help='输出目录，用于跳过检查点中已完成的任务（默认: output）')
+    plan.add_argument('--no-resume', action='store_true',
+                      help='忽略检查点，估算全部任务')
+    plan.add_argument('--incremental', '-i', action='store_true',
+                      help='只估算增量生成时需要重新生成的文章')
+    plan.add_argument('--json', action='store_true',
+                      help='以JSON输出')
+
+    experiment = subparsers.add_parser('experiment', help='在抽样主题上比较提示词变体的token数、延迟和质量')
+    experiment.add_argument('--variants', type=parse_variants, default=parse_variants('all'), metavar='NAMES',
+                            help='逗号分隔的变体：default、compact、minimal、system 或 all（默认: all）')
+    experiment.add_argument('--topics', metavar='FILE', default=os.path.join('config', 'topics.json'),
+                            help='主题配置文件（默认: config/topics.json）')
+    experiment.add_argument('--sample', '-s', type=int, default=8, metavar='N',
+                            help='抽取的主题数，按主题和子主题的比例抽取（默认: 8）')
+    experiment.add_argument('--seed', type=int, default=0,
+                            help='抽样的随机种子（默认: 0）')
+    experiment.add_argument('--repeats', '-r', type=int, default=1, metavar='N',
+                            help='每个主题和变体的重复次数（默认: 1）')
+    experiment.add_argument('--concurrency', '-j', type=int, default=4, metavar='N',
+                            help='并发请求数（默认: 4）')
+    experiment.add_argument('--cache-dir', metavar='DIR',
+                            help='试验结果缓存目录（默认: output/.experiments）')
+    experiment.add_argument('--no-cache', action='store_true',
+                            help='不读取也不写入缓存，全部重新请求')
+    experiment.add_argument('--json', action='store_true',
+                            help='每次试验和每个变体的汇总各输出一行JSON')
+
+    serve = subparsers.add_parser('serve', help='启动本地HTTP服务，供多台机器共享')
+    serve.add_argument('--host', default='127.0.0.1',
+                       help='监听地址（默认: 127.0.0.1，局域网共享请用 0.0.0.0）')
+    serve.add_argument('--port', type=int, default=8765, help='监听端口（默认: 8765）')
+    add_cassette_arguments(serve, subcommand=True)
+    serve.add_argument('--concurrency', '-j', type=int, default=4, metavar='N',
+                       help='批量任务的并发请求数（默认: 4）')
+    serve.add_argument('--out', metavar='DIR', default='output',
+                       help='输出目录（默认: output）')
+
+    analyze = subparsers.add_parser('analyze', help='分析已生成文章的词汇水平，找出需要重新生成的文章')
+    analyze.add_argument('--dir', metavar='DIR', default='output',
+                         help='文章目录（默认: output）')
+    analyze.add_argument('--json', action='store_true',
+                         help='以JSONL输出每篇文章的详细报告和汇总')
+    analyze.add_argument('--wordlist', metavar='FILE',
+                         help='词表文件（默认: CET_WORDLIST 配置或内置词表）')
+    analyze.add_argument('--min-cet6', type=int, metavar='N',
+                         help='每篇文章至少使用的不同六级词数（默认: 3）')
+    analyze.add_argument('--min-transitions', type=int, metavar='N',
+                         help='每篇文章至少使用的过渡词次数（默认: 2）')
+    analyze.add_argument('--strict', action='store_true',
+                         help='有不达标的文章时以退出码3退出')
+    analyze.add_argument('--regenerate', action='store_true',
+                         help='重新生成不达标的文章')
+    analyze.add_argument('--topics', metavar='FILE', default=os.path.join('config', 'topics.json'),
+                         help='与 --regenerate 一起使用，用于查找主题描述（默认: config/topics.json）')
+    analyze.add_argument('--concurrency', '-j', type=int, default=1, metavar='N',
+                         help='与 --regenerate 一起使用，并发请求数（默认: 1）')
+
+    search = subparsers.add_parser('search', help='全文搜索已生成的文章（按相关度排序）')
+    search.add_argument('query', help='查询，如 "eye contact hospitality"；用引号括起的短语必须完整出现')
+    search.add_argument('--dir', metavar='DIR', default='output',
+                        help='文章目录（默认: output）')
+    search.add_argument('--limit', '-n', type=int, default=10, metavar='N',
+                        help='最多显示的结果数（默认: 10）')
+    search.add_argument('--json', action='store_true',
+                        help='每个结果输出一行JSON')
+    search.add_argument('--rebuild', action='store_true',
+                        help='删除并重建索引')
+
+    export = subparsers.add_parser('export', help='将已生成的文章导出为课堂讲义（Markdown / DOCX / PDF）')
+    export.add_argument('--format', '-f', type=parse_formats, default=['md'], metavar='FORMATS',
+                        help='逗号分隔的导出格式：md、docx、pdf 或 all（默认: md）')
+    export.add_argument('--dir', metavar='DIR', default='output',
+                        help='文章目录（默认: output）')
+    export.add_argument('--out', metavar='DIR',
+                        help='导出目录（默认: DIR/export）')
+    export.add_argument('--topics', metavar='FILE', default=os.path.join('config', 'topics.json'),
+                        help='主题配置文件，用于分组和目录（默认: config/topics.json）')
+    export.add_argument('--workers', '-j', type=int, metavar='N',
+                        help='工作进程数（默认: CPU核数）')
+    export.add_argument('--title', default='Article Collection',
+                        help='文档标题（默认: Article Collection）')
+
+    archive = subparsers.add_parser('archive', help='把已生成的文章打包为压缩归档，或从归档中读取文章')
+    archive.add_argument('--dir', metavar='DIR', default='output',
+                         help='文章目录（默认: output）')
+    archive.add_argument('--file', metavar='FILE',
+                         help='归档文件（默认: DIR/export/articles.arc）')
+    archive.add_argument('--codec', choices=('zlib', 'zstd'), default='zlib',
+                         help='新建归档时的压缩方式（zstd 需要安装 zstandard，默认: zlib）')
+    archive.add_argument('--rebuild', action='store_true',
+                         help='重新训练字典并重建归档（默认只追加新增和修改过的文章）')
+    archive.add_argument('--json', action='store_true',
+                         help='以JSON输出统计')
+    archive_action = archive.add_mutually_exclusive_group()
+    archive_action.add_argument('--list', action='store_true',
+                                help='列出归档中的文章')
+    archive_action.add_argument('--get', metavar='NAME',
+                                help='输出一篇文章（文件名或主题）')
+    archive_action.add_argument('--extract', metavar='DIR',
+                                help='把全部文章解压到目录')
+
+    return parser
+
+
 def main():
     """主函数 - 根据参数选择启动模式"""
-    # 检查命令行参数
-    if len(sys.argv) > 1 and sys.argv[1] in ['--cli', '-c', '--console']:
+    args = build_parser().parse_args()
+    apply_cassette_arguments(args)
+
+    if args.command == 'generate':
+        sys.exit(run_generate(args))
+    elif args.command == 'plan':
+        sys.exit(run_plan(args))
+    elif args.command == 'experiment':
+        sys.exit(run_experiment(args))
+    elif args.command == 'serve':
+        sys.exit(run_serve(args))
+    elif args.command == 'analyze':
+        sys.exit(run_analyze(args))
+    elif args.command == 'search':
+        sys.exit(run_search(args))
+    elif args.command == 'export':
+        sys.exit(run_export(args))
+    elif args.command == 'archive':
+        sys.exit(run_archive(args))
+    elif args.cli:
         # 命令行模式
-        run_cli()
+        run_cli(args)
     else:
         # GUI模式（默认）
         run_gui()
@@ -148,4 +1192,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,584 @@
+"""
+词汇分析模块
+对照 CET-4/CET-6 词表（内置的是精选子集，见 WordList.partial）分析文章的词汇水平、词汇多样性、句长分布和过渡词使用情况，
+可以一次性批量分析整个 output/ 目录，结果用于判断哪些文章需要重新生成
+"""
+
+import math
+import os
+import re
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # 没有 numpy 时逐篇计算，结果相同
+    np = None
+
+# 提示词中要求使用的过渡词
+TRANSITION_WORDS = (
+    'however', 'moreover', 'furthermore', 'in addition', 'for instance', 'for example',
+    'therefore', 'consequently', 'nevertheless', 'meanwhile', 'in conclusion', 'as a result',
+    'on the other hand', 'in contrast', 'similarly', 'thus', 'hence', 'besides',
+)
+TRANSITION_PATTERN = re.compile(
+    r'\b(' + '|'.join(sorted((re.escape(phrase) for phrase in TRANSITION_WORDS), key=len, reverse=True)) + r')\b'
+)
+WORD_PATTERN = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+
+DEFAULT_WORDLIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cet_wordlist.txt')
+# 词表文件中单独一行的这条注释表示只是部分词表（覆盖率不能当作官方四六级词汇覆盖率）
+PARTIAL_MARKER = '# partial'
+
+# 词汇等级（数组下标）
+LEVELS = ('other', 'cet4', 'cet6')
+LEVEL_IDS = {name: index for index, name in enumerate(LEVELS)}
+
+# 句长分布的分组上界（单词数）
+SENTENCE_BINS = (10, 20, 30)
+SENTENCE_BIN_NAMES = ('1-10', '11-20', '21-30', '31+')
+
+# 判断是否需要重新生成的默认阈值
+THRESHOLDS = {
+    'min_cet6_types': 3,        # 至少使用的不同 CET-6 词数
+    'min_transitions': 2,       # 至少使用的过渡词次数
+    'min_root_ttr': 5.5,        # 词汇多样性下限（Guiraud 指数：词元数/√词数）
+    'min_mean_sentence': 10.0,  # 平均句长范围（单词数）
+    'max_mean_sentence': 30.0,
+}
+
+# 不规则变化（变化形式 -> 原形），规则变化在加载词表时自动生成
+IRREGULAR_FORMS = {
+    'is': 'be', 'am': 'be', 'are': 'be', 'was': 'be', 'were': 'be', 'been': 'be', 'being': 'be',
+    'has': 'have', 'had': 'have', 'having': 'have', 'does': 'do', 'did': 'do', 'done': 'do',
+    'went': 'go', 'gone': 'go', 'made': 'make', 'took': 'take', 'taken': 'take',
+    'gave': 'give', 'given': 'give', 'saw': 'see', 'seen': 'see', 'came': 'come',
+    'knew': 'know', 'known': 'know', 'thought': 'think', 'brought': 'bring', 'bought': 'buy',
+    'taught': 'teach', 'caught': 'catch', 'found': 'find', 'felt': 'feel', 'kept': 'keep',
+    'left': 'leave', 'meant': 'mean', 'met': 'meet', 'paid': 'pay', 'said': 'say',
+    'sent': 'send', 'spent': 'spend', 'stood': 'stand', 'told': 'tell', 'understood': 'understand',
+    'wrote': 'write', 'written': 'write', 'spoke': 'speak', 'spoken': 'speak', 'chose': 'choose',
+    'chosen': 'choose', 'grew': 'grow', 'grown': 'grow', 'drew': 'draw', 'drawn': 'draw',
+    'arose': 'arise', 'arisen': 'arise', 'underwent': 'undergo', 'undergone': 'undergo',
+    'undertook': 'undertake', 'undertaken': 'undertake', 'withdrew': 'withdraw', 'withdrawn': 'withdraw',
+    'overcame': 'overcome', 'withstood': 'withstand', 'sought': 'seek', 'shrank': 'shrink',
+    'shrunk': 'shrink', 'shrunken': 'shrink', 'dwelt': 'dwell', 'misunderstood': 'misunderstand',
+    'overlooked': 'overlook', 'children': 'child', 'people': 'person', 'men': 'man', 'women': 'woman',
+    'better': 'good', 'best': 'good', 'worse': 'bad', 'worst': 'bad',
+    'phenomena': 'phenomenon', 'criteria': 'criterion', 'analyses': 'analysis',
+    'hypotheses': 'hypothesis', 'crises': 'crisis', 'theses': 'thesis',
+}
+
+# 英式/美式拼写差异（词表使用英式拼写）
+SPELLING_VARIANTS = (
+    ('ise', 'ize'), ('yse', 'yze'), ('our', 'or'), ('ogue', 'og'), ('gement', 'gment'), ('fil', 'fill'),
+    ('ence', 'ense'), ('tre', 'ter'),
+)
+
+VOWELS = set('aeiou')
+
+
+def _inflections(lemma: str) -> List[str]:
+    """
+    生成词原形的规则变化形式（可能包含少量不存在的词，不影响查找）
+
+    Args:
+        lemma: 词原形
+
+    Returns:
+        变化形式列表
+    """
+    forms = []
+    if lemma.endswith(('s', 'x', 'z', 'ch', 'sh', 'o')):
+        forms.append(lemma + 'es')
+    if len(lemma) > 2 and lemma.endswith('y') and lemma[-2] not in VOWELS:
+        stem = lemma[:-1]
+        forms += [stem + 'ies', stem + 'ied', stem + 'ier', stem + 'iest', stem + 'ily', stem + 'iness']
+    else:
+        forms.append(lemma + 's')
+
+    if lemma.endswith('e'):
+        stem = lemma[:-1]
+        forms += [lemma + 'd', lemma + 'r', lemma + 'st', lemma + 'ly', lemma + 'ment', lemma + 'ness']
+        if not lemma.endswith('ee'):
+            forms.append(stem + 'ing')
+        if lemma.endswith('le'):
+            forms.append(lemma[:-2] + 'ly')
+    else:
+        forms += [lemma + 'ed', lemma + 'ing', lemma + 'er', lemma + 'est', lemma + 'ly',
+                  lemma + 'ment', lemma + 'ness']
+        # commit -> committed、occur -> occurring
+        if (len(lemma) > 2 and lemma[-1] not in VOWELS and lemma[-1] not in 'wxy'
+                and lemma[-2] in VOWELS and lemma[-3] not in VOWELS):
+            forms += [lemma + lemma[-1] + 'ed', lemma + lemma[-1] + 'ing']
+    if lemma.endswith('ic'):
+        forms.append(lemma + 'ally')
+    return forms
+
+
+def _spelling_variants(lemma: str) -> List[str]:
+    """英式拼写对应的美式拼写"""
+    variants = []
+    for british, american in SPELLING_VARIANTS:
+        if british in lemma:
+            variants.append(lemma.replace(british, american))
+    return variants
+
+
+class WordList:
+    """
+    CET 词表及词形还原查找表
+
+    加载时为每个词原形预先生成变化形式，全部放入一个字典（变化形式 -> 原形），
+    查找时只需一次哈希查找，不需要在线做词形分析。
+    """
+
+    def __init__(self, levels: Dict[str, str], partial: bool = False):
+        """
+        Args:
+            levels: {词原形: 等级名称}
+            partial: 是否只是部分词表（如内置的精选词表）
+        """
+        self.levels = dict(levels)
+        self.partial = partial
+        self.lemmas: Dict[str, str] = {}
+
+        for lemma in self.levels:
+            self.lemmas[lemma] = lemma
+        for lemma in self.levels:
+            for variant in [lemma] + _spelling_variants(lemma):
+                self.lemmas.setdefault(variant, lemma)
+                for form in _inflections(variant):
+                    self.lemmas.setdefault(form, lemma)
+        for form, lemma in IRREGULAR_FORMS.items():
+            self.lemmas.setdefault(form, lemma)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_WORDLIST) -> 'WordList':
+        """
+        从文件加载词表
+
+        文件格式：[cet4] 或 [cet6] 开始一个分组，之后每行若干个以空格分隔的词原形，
+        # 开头为注释。同一个词出现在多个分组时取较低的等级。含有单独一行 "# partial" 的文件视为部分词表。
+
+        Args:
+            path: 词表文件路径
+
+        Returns:
+            WordList 实例
+        """
+        levels: Dict[str, str] = {}
+        level = None
+        partial = False
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip().lower() == PARTIAL_MARKER:
+                    partial = True
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                if line.startswith('[') and line.endswith(']'):
+                    level = line[1:-1].strip().lower()
+                    if level not in LEVEL_IDS:
+                        raise ValueError(f"Unknown level '{level}' in {path}")
+                    continue
+                if level is None:
+                    raise ValueError(f"Word list {path} must start with a [cet4] or [cet6] section")
+                for word in line.lower().split():
+                    levels.setdefault(word, level)
+        return cls(levels, partial)
+
+    def lemma(self, word: str) -> str:
+        """
+        词形还原
+
+        Args:
+            word: 小写单词
+
+        Returns:
+            词原形（不在查找表中时返回原词）
+        """
+        return self.lemmas.get(word, word)
+
+    def level(self, word: str) -> str:
+        """
+        单词的词汇等级
+
+        Args:
+            word: 小写单词
+
+        Returns:
+            'cet4'、'cet6' 或 'other'
+        """
+        return self.levels.get(self.lemma(word), 'other')
+
+
+@lru_cache(maxsize=None)
+def get_wordlist(path: Optional[str] = None) -> WordList:
+    """
+    加载词表（每个路径只加载一次）
+
+    Args:
+        path: 词表文件路径（默认使用 CET_WORDLIST 环境变量或内置词表）
+
+    Returns:
+        WordList 实例
+    """
+    return WordList.load(path or os.getenv('CET_WORDLIST') or DEFAULT_WORDLIST)
+
+
+def article_body(article: str) -> str:
+    """
+    去掉文章第一行的标题
+
+    Args:
+        article: 文章内容（标题 + 空行 + 正文）
+
+    Returns:
+        正文
+    """
+    blocks = re.split(r'\n\s*\n', article.strip(), maxsplit=1)
+    title = blocks[0].strip()
+    if len(blocks) > 1 and '\n' not in title and not title.endswith(('.', '!', '?')):
+        return blocks[1].strip()
+    return article.strip()
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    切分句子
+
+    Args:
+        text: 正文
+
+    Returns:
+        句子列表
+    """
+    sentences = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        sentences += [part.strip() for part in SENTENCE_END.split(paragraph.strip()) if part.strip()]
+    return sentences
+
+
+class Vocabulary:
+    """
+    分析过程中的词元编号表
+
+    每个不同的词元分配一个整数编号，并在 ids 对应位置记录其等级，
+    便于用数组一次性统计整个语料。
+    """
+
+    def __init__(self, wordlist: WordList):
+        self.wordlist = wordlist
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.levels: List[int] = []
+        # 单词 -> 词元编号，避免重复做词形还原
+        self._words: Dict[str, int] = {}
+
+    def lookup(self, word: str) -> int:
+        """
+        单词对应的词元编号
+
+        Args:
+            word: 小写单词
+
+        Returns:
+            词元编号
+        """
+        index = self._words.get(word)
+        if index is None:
+            lemma = self.wordlist.lemma(word)
+            index = self.ids.get(lemma)
+            if index is None:
+                index = len(self.levels)
+                self.ids[lemma] = index
+                self.names.append(lemma)
+                self.levels.append(LEVEL_IDS[self.wordlist.levels.get(lemma, 'other')])
+            self._words[word] = index
+        return index
+
+
+class Corpus:
+    """
+    拼接后的语料
+
+    所有文章的词元编号和句长依次存放在连续的数组中，另外记录每篇文章的词数和句数，
+    统计时不需要再遍历 Python 对象。
+    """
+
+    def __init__(self, vocabulary: Vocabulary):
+        self.vocabulary = vocabulary
+        self.ids = array('q')
+        self.lengths = array('q')
+        self.token_counts: List[int] = []
+        self.sentence_counts: List[int] = []
+        self.transitions: List[Dict[str, int]] = []
+
+    def add(self, article: str):
+        """
+        加入一篇文章
+
+        Args:
+            article: 文章内容（标题 + 空行 + 正文）
+        """
+        body = article_body(article).lower()
+        lookup = self.vocabulary.lookup
+        tokens = 0
+        sentences = 0
+        for sentence in split_sentences(body):
+            words = WORD_PATTERN.findall(sentence)
+            if words:
+                self.ids.extend(map(lookup, words))
+                self.lengths.append(len(words))
+                tokens += len(words)
+                sentences += 1
+        self.token_counts.append(tokens)
+        self.sentence_counts.append(sentences)
+
+        transitions: Dict[str, int] = {}
+        for match in TRANSITION_PATTERN.finditer(body):
+            transitions[match.group(1)] = transitions.get(match.group(1), 0) + 1
+        self.transitions.append(transitions)
+
+    def __len__(self) -> int:
+        return len(self.token_counts)
+
+
+def _aggregate_numpy(corpus: Corpus) -> Dict[str, List]:
+    """
+    用 NumPy 一次性统计所有文章
+
+    语料的词元编号直接映射为数组，用文章编号作为分组键，通过 bincount 得到每篇文章的
+    各等级词数、不同词元数和句长分布。
+
+    Returns:
+        {统计项: 每篇文章的值列表}
+    """
+    count = len(corpus)
+    token_counts = np.asarray(corpus.token_counts, dtype=np.int64)
+    sentence_counts = np.asarray(corpus.sentence_counts, dtype=np.int64)
+    ids = np.frombuffer(corpus.ids, dtype=np.int64) if corpus.ids else np.zeros(0, dtype=np.int64)
+    docs = np.repeat(np.arange(count, dtype=np.int64), token_counts)
+    level_table = np.asarray(corpus.vocabulary.levels, dtype=np.int64)
+    token_levels = level_table[ids]
+
+    # 每篇文章各等级的词数
+    level_counts = np.bincount(docs * len(LEVELS) + token_levels,
+                               minlength=count * len(LEVELS)).reshape(count, len(LEVELS))
+
+    # 每篇文章的不同词元数：文章编号和词元编号合成一个键，排序后去掉相邻的重复项
+    vocabulary_size = max(len(level_table), 1)
+    keys = np.sort(docs * vocabulary_size + ids)
+    unique_keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if keys.size else keys
+    unique_docs = unique_keys // vocabulary_size
+    types = np.bincount(unique_docs, minlength=count)
+    type_levels = np.bincount(unique_docs * len(LEVELS) + level_table[unique_keys % vocabulary_size],
+                              minlength=count * len(LEVELS)).reshape(count, len(LEVELS))
+
+    # 句长统计（每篇文章的句子在数组中是连续的）
+    lengths = (np.frombuffer(corpus.lengths, dtype=np.int64) if corpus.lengths
+               else np.zeros(0, dtype=np.int64)).astype(np.float64)
+    sentence_docs = np.repeat(np.arange(count, dtype=np.int64), sentence_counts)
+    length_sum = np.bincount(sentence_docs, weights=lengths, minlength=count)
+    square_sum = np.bincount(sentence_docs, weights=lengths ** 2, minlength=count)
+    mean = length_sum / np.maximum(sentence_counts, 1)
+    variance = square_sum / np.maximum(sentence_counts, 1) - mean ** 2
+    bins = np.digitize(lengths, [bound + 0.5 for bound in SENTENCE_BINS])
+    histogram = np.bincount(sentence_docs * len(SENTENCE_BIN_NAMES) + bins,
+                            minlength=count * len(SENTENCE_BIN_NAMES)).reshape(count, len(SENTENCE_BIN_NAMES))
+
+    maximum = np.zeros(count)
+    present = sentence_counts > 0
+    if present.any():
+        offsets = np.concatenate(([0], np.cumsum(sentence_counts)[:-1]))
+        maximum[present] = np.maximum.reduceat(lengths, offsets[present])
+
+    return {
+        'tokens': token_counts.tolist(),
+        'level_counts': level_counts.tolist(),
+        'types': types.tolist(),
+        'type_levels': type_levels.tolist(),
+        'sentences': sentence_counts.tolist(),
+        'mean_sentence': mean.tolist(),
+        'std_sentence': np.sqrt(np.maximum(variance, 0.0)).tolist(),
+        'max_sentence': maximum.astype(int).tolist(),
+        'histogram': histogram.tolist(),
+    }
+
+
+def _aggregate_python(corpus: Corpus) -> Dict[str, List]:
+    """逐篇统计（没有 numpy 时使用，结果与 _aggregate_numpy 相同）"""
+    levels = corpus.vocabulary.levels
+    result = {name: [] for name in ('tokens', 'level_counts', 'types', 'type_levels', 'sentences',
+                                    'mean_sentence', 'std_sentence', 'max_sentence', 'histogram')}
+    token_start = sentence_start = 0
+    for token_count, sentence_count in zip(corpus.token_counts, corpus.sentence_counts):
+        ids = corpus.ids[token_start:token_start + token_count]
+        lengths = corpus.lengths[sentence_start:sentence_start + sentence_count]
+        token_start += token_count
+        sentence_start += sentence_count
+
+        level_counts = [0] * len(LEVELS)
+        for index in ids:
+            level_counts[levels[index]] += 1
+        unique = set(ids)
+        type_levels = [0] * len(LEVELS)
+        for index in unique:
+            type_levels[levels[index]] += 1
+
+        histogram = [0] * len(SENTENCE_BIN_NAMES)
+        for length in lengths:
+            histogram[sum(1 for bound in SENTENCE_BINS if length > bound)] += 1
+        mean = sum(lengths) / len(lengths) if lengths else 0.0
+        variance = sum(length ** 2 for length in lengths) / len(lengths) - mean ** 2 if lengths else 0.0
+
+        result['tokens'].append(token_count)
+        result['level_counts'].append(level_counts)
+        result['types'].append(len(unique))
+        result['type_levels'].append(type_levels)
+        result['sentences'].append(sentence_count)
+        result['mean_sentence'].append(mean)
+        result['std_sentence'].append(math.sqrt(max(variance, 0.0)))
+        result['max_sentence'].append(max(lengths) if lengths else 0)
+        result['histogram'].append(histogram)
+    return result
+
+
+def needs_regeneration(report: Dict, thresholds: Optional[Dict] = None) -> List[str]:
+    """
+    根据分析结果判断文章是否需要重新生成
+
+    Args:
+        report: analyze_articles 返回的单篇报告
+        thresholds: 阈值（默认使用 THRESHOLDS，可只覆盖部分项）
+
+    Returns:
+        不达标的原因列表（为空表示达标）
+    """
+    limits = {**THRESHOLDS, **(thresholds or {})}
+    reasons = []
+    if report['tokens'] == 0:
+        return ['empty article']
+    if report['cet6_types'] < limits['min_cet6_types']:
+        reasons.append(f"only {report['cet6_types']} distinct CET-6 word(s)")
+    if report['transitions'] < limits['min_transitions']:
+        reasons.append(f"only {report['transitions']} transition word(s)")
+    if report['root_ttr'] < limits['min_root_ttr']:
+        reasons.append(f"low lexical diversity ({report['root_ttr']:.2f})")
+    mean = report['sentence_length']['mean']
+    if mean < limits['min_mean_sentence']:
+        reasons.append(f"sentences too short (mean {mean:.1f} words)")
+    elif mean > limits['max_mean_sentence']:
+        reasons.append(f"sentences too long (mean {mean:.1f} words)")
+    return reasons
+
+
+def analyze_articles(articles: Iterable[str], wordlist: Optional[WordList] = None,
+                     thresholds: Optional[Dict] = None, include_words: bool = False) -> List[Dict]:
+    """
+    批量分析文章
+
+    Args:
+        articles: 文章内容（标题 + 空行 + 正文）
+        wordlist: 词表（默认使用内置词表）
+        thresholds: 重新生成的判断阈值（见 THRESHOLDS）
+        include_words: 是否在报告中列出用到的 CET-6 词
+
+    Returns:
+        每篇文章的报告，包含 tokens、types、coverage（各等级词数占比）、cet6_types、
+        ttr、root_ttr、sentence_length、transitions、transition_words 和 regenerate（不达标原因）
+    """
+    vocabulary = Vocabulary(wordlist or get_wordlist())
+    corpus = Corpus(vocabulary)
+    for article in articles:
+        corpus.add(article)
+    if not len(corpus):
+        return []
+
+    aggregate = _aggregate_numpy if np is not None else _aggregate_python
+    stats = aggregate(corpus)
+
+    reports = []
+    offset = 0
+    for index, tokens in enumerate(stats['tokens']):
+        types = stats['types'][index]
+        report = {
+            'tokens': tokens,
+            'types': types,
+            'coverage': {
+                level: round(stats['level_counts'][index][level_id] / tokens, 4) if tokens else 0.0
+                for level_id, level in enumerate(LEVELS)
+            },
+            'cet6_types': stats['type_levels'][index][LEVEL_IDS['cet6']],
+            'ttr': round(types / tokens, 4) if tokens else 0.0,
+            'root_ttr': round(types / math.sqrt(tokens), 4) if tokens else 0.0,
+            'sentence_length': {
+                'count': stats['sentences'][index],
+                'mean': round(stats['mean_sentence'][index], 2),
+                'std': round(stats['std_sentence'][index], 2),
+                'max': stats['max_sentence'][index],
+                'histogram': dict(zip(SENTENCE_BIN_NAMES, stats['histogram'][index])),
+            },
+            'transitions': sum(corpus.transitions[index].values()),
+            'transition_words': corpus.transitions[index],
+        }
+        if include_words:
+            cet6 = LEVEL_IDS['cet6']
+            report['cet6_words'] = sorted({vocabulary.names[i] for i in corpus.ids[offset:offset + tokens]
+                                           if vocabulary.levels[i] == cet6})
+        offset += tokens
+        report['regenerate'] = needs_regeneration(report, thresholds)
+        reports.append(report)
+    return reports
+
+
+def analyze_article(article: str, wordlist: Optional[WordList] = None) -> Dict:
+    """
+    分析单篇文章
+
+    Args:
+        article: 文章内容
+        wordlist: 词表（默认使用内置词表）
+
+    Returns:
+        报告字典（格式见 analyze_articles）
+    """
+    return analyze_articles([article], wordlist, include_words=True)[0]
+
+
+def summarize(reports: List[Dict]) -> Dict:
+    """
+    汇总整个语料的分析结果
+
+    Args:
+        reports: analyze_articles 返回的报告列表
+
+    Returns:
+        汇总字典
+    """
+    tokens = sum(report['tokens'] for report in reports)
+    sentences = sum(report['sentence_length']['count'] for report in reports)
+    coverage = {level: 0.0 for level in LEVELS}
+    histogram = {name: 0 for name in SENTENCE_BIN_NAMES}
+    for report in reports:
+        for level in LEVELS:
+            coverage[level] += report['coverage'][level] * report['tokens']
+        for name in SENTENCE_BIN_NAMES:
+            histogram[name] += report['sentence_length']['histogram'][name]
+
+    return {
+        'articles': len(reports),
+        'tokens': tokens,
+        'coverage': {level: round(value / tokens, 4) if tokens else 0.0 for level, value in coverage.items()},
+        'mean_cet6_types': round(sum(r['cet6_types'] for r in reports) / len(reports), 2) if reports else 0.0,
+        'mean_root_ttr': round(sum(r['root_ttr'] for r in reports) / len(reports), 3) if reports else 0.0,
+        'mean_sentence_length': round(
+            sum(r['sentence_length']['mean'] * r['sentence_length']['count'] for r in reports) / sentences, 2
+        ) if sentences else 0.0,
+        'sentence_histogram': histogram,
+        'mean_transitions': round(sum(r['transitions'] for r in reports) / len(reports), 2) if reports else 0.0,
+        'flagged': sum(1 for report in reports if report['regenerate']),
+    }
@@ -0,0 +1,514 @@
+"""
+语料归档模块
+把已生成的文章打包为一个压缩归档文件，用于分发和备份。
+
+生成的文章短小且彼此相似（相同的文件头、段落结构和过渡词），逐篇压缩时每篇都要从头建立词表，
+压缩率很低；整体压缩（如 tar.gz）压缩率高，但读取一篇文章要解压前面的全部内容。
+这里先从语料中训练一个字典（出现在最多文章中的句子片段），每篇文章单独用字典压缩：
+标准库 zlib 的预设字典（zdict），或安装了 zstandard 时的 zstd 字典。
+文件末尾是偏移量索引，按文件名或主题读取一篇文章只需一次读取和解压。
+
+文件格式（整数均为小端）：
+    文件头    MAGIC | 编码(1字节) | 压缩级别(1字节) | 字典长度(4字节) | 字典
+    文章记录  'A' | 文件名长度(2) | 压缩后长度(4) | 原始长度(4) | CRC32(4) | 文件名 | 压缩数据
+    索引      'I' | 长度(4) | zlib 压缩的 JSON {文件名: [数据偏移, 压缩后长度, 原始长度, CRC32, 主题, mtime]}
+    文件尾    索引偏移(8) | INDEX_MAGIC
+
+追加时从索引处截断，逐篇写入文章记录，关闭时重新写入索引和文件尾；
+追加中途中断（没有文件尾）时，打开文件会顺序扫描文章记录重建索引。
+"""
+
+import heapq
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .history import scan_articles
+from .storage import parse_article
+
+MAGIC = b'ARTARC\x00\x01'
+INDEX_MAGIC = b'ARTIDX\x00\x01'
+
+CODECS = ('zlib', 'zstd')
+# zlib 只能引用窗口（32KB）内的字典内容，zstd 字典可以更大
+DICT_SIZES = {'zlib': 32 * 1024, 'zstd': 64 * 1024}
+DEFAULT_LEVEL = 9
+
+# 训练字典时最多读取的语料字节数（按文章均匀抽样）
+TRAIN_SAMPLE_BYTES = 2 * 1024 * 1024
+# 统计片段在多少篇文章中出现时使用的子串长度
+TRAIN_KMER = 8
+_SEGMENT = re.compile(rb'[^.\n]*[.\n]+\s*')
+
+_HEADER = struct.Struct('<8sBBI')
+_RECORD = struct.Struct('<cHIII')
+_BLOCK = struct.Struct('<cI')
+_TRAILER = struct.Struct('<Q8s')
+
+
+class ArchiveError(ValueError):
+    """归档文件损坏或格式不支持"""
+
+
+def _zstd():
+    """zstandard 模块（未安装时返回 None）"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def train_dictionary(samples: List[bytes], size: int = DICT_SIZES['zlib'], kmer: int = TRAIN_KMER) -> bytes:
+    """
+    从语料中训练压缩字典（不依赖第三方库）
+
+    把文章切成句子片段，按片段中的子串出现在多少篇文章中打分，贪心选出得分最高的片段，
+    已选片段覆盖的子串不再计分。得分最高的片段放在字典末尾（zlib 引用距离越近越省空间）。
+
+    Args:
+        samples: 文章内容（UTF-8 编码）
+        size: 字典最大字节数
+        kmer: 统计用的子串长度
+
+    Returns:
+        字典内容
+    """
+    frequency = Counter()
+    for sample in samples:
+        frequency.update({sample[i:i + kmer] for i in range(len(sample) - kmer + 1)})
+    segments = {segment for sample in samples for segment in _SEGMENT.findall(sample) if len(segment) >= kmer}
+
+    def score(segment: bytes) -> float:
+        # 每字节的得分：片段中每个子串额外出现的文章数之和
+        return sum(frequency[segment[i:i + kmer]] - 1 for i in range(len(segment) - kmer + 1)) / len(segment)
+
+    heap = [(-score(segment), segment) for segment in segments]
+    heapq.heapify(heap)
+    chosen: List[bytes] = []
+    total = 0
+    while heap and total < size:
+        _, segment = heapq.heappop(heap)
+        current = score(segment)
+        if heap and current < -heap[0][0]:
+            # 得分因已选片段而下降，放回堆中重新排序
+            heapq.heappush(heap, (-current, segment))
+            continue
+        if current <= 0:
+            break
+        if total + len(segment) > size:
+            continue
+        chosen.append(segment)
+        total += len(segment)
+        for i in range(len(segment) - kmer + 1):
+            frequency[segment[i:i + kmer]] = 0
+    return b''.join(reversed(chosen))
+
+
+def _build_dictionary(codec: str, samples: List[bytes]) -> bytes:
+    """按编码训练字典；zstd 样本太少无法训练时使用标准库算法的结果作为原始内容字典"""
+    size = DICT_SIZES[codec]
+    if codec == 'zstd':
+        zstandard = _zstd()
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError:
+            pass
+    return train_dictionary(samples, size)
+
+
+def sample_corpus(texts: List[bytes], limit: int = TRAIN_SAMPLE_BYTES) -> List[bytes]:
+    """
+    从语料中均匀抽取不超过 limit 字节的文章用于训练
+
+    Args:
+        texts: 全部文章内容
+        limit: 最多字节数
+
+    Returns:
+        抽样的文章
+    """
+    total = sum(len(text) for text in texts)
+    if total <= limit:
+        return list(texts)
+    step = total / limit
+    return [text for i, text in enumerate(texts) if int(i / step) != int((i + 1) / step)]
+
+
+class CorpusArchive:
+    """
+    语料归档文件
+
+    用法：
+        with CorpusArchive.create(path, samples) as archive:
+            archive.append('group_1_gesture.txt', text, topic='gesture')
+        with CorpusArchive(path) as archive:
+            print(archive.read('group_1_gesture.txt'))
+    """
+
+    def __init__(self, path: str, mode: str = 'r'):
+        """
+        打开归档文件
+
+        Args:
+            path: 文件路径
+            mode: 'r' 只读，'a' 追加
+
+        Raises:
+            ArchiveError: 文件格式不正确，或需要的压缩库未安装
+        """
+        if mode not in ('r', 'a'):
+            raise ValueError(f"Unsupported mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._file = open(path, 'rb' if mode == 'r' else 'r+b')
+        try:
+            self._read_header()
+            self.index, self._data_end, self.recovered = self._read_index()
+        except Exception:
+            self._file.close()
+            raise
+        self._dirty = False
+        self._compressor = None
+
+    @classmethod
+    def create(cls, path: str, samples: Iterable[bytes], codec: str = 'zlib',
+               level: int = DEFAULT_LEVEL) -> 'CorpusArchive':
+        """
+        新建归档文件（已存在时覆盖），用样本训练字典，返回追加模式的实例
+
+        Args:
+            path: 文件路径
+            samples: 用于训练字典的文章内容（UTF-8 编码，通常是要归档的全部文章，超过 TRAIN_SAMPLE_BYTES 时抽样）
+            codec: zlib 或 zstd（需要安装 zstandard）
+            level: 压缩级别
+
+        Returns:
+            CorpusArchive 实例
+
+        Raises:
+            ValueError: 不支持的编码，或 zstandard 未安装
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported codec: {codec} (choose from {', '.join(CODECS)})")
+        if codec == 'zstd' and _zstd() is None:
+            raise ValueError("zstd codec requires zstandard (pip install zstandard)")
+        dictionary = _build_dictionary(codec, sample_corpus(list(samples)))
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, CODECS.index(codec), level, len(dictionary)))
+            f.write(dictionary)
+        archive = cls(path, 'a')
+        # 没有文章时关闭也要写入空索引
+        archive._dirty = True
+        archive.recovered = False
+        return archive
+
+    # ---------- 读取 ----------
+
+    def _read_header(self):
+        header = self._file.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:8] != MAGIC:
+            raise ArchiveError(f"{self.path} is not an article archive")
+        _, codec, self.level, dict_size = _HEADER.unpack(header)
+        if codec >= len(CODECS):
+            raise ArchiveError(f"{self.path} uses an unknown codec ({codec})")
+        self.codec = CODECS[codec]
+        self.dictionary = self._file.read(dict_size)
+        self._header_end = _HEADER.size + dict_size
+        if self.codec == 'zstd':
+            zstandard = _zstd()
+            if zstandard is None:
+                raise ArchiveError(f"{self.path} is zstd-compressed; install zstandard to read it")
+            self._zstd_dict = zstandard.ZstdCompressionDict(self.dictionary)
+
+    def _read_index(self) -> Tuple[Dict[str, list], int, bool]:
+        """读取文件尾的索引；没有有效的文件尾时扫描文章记录"""
+        size = self._file.seek(0, os.SEEK_END)
+        if size >= self._header_end + _TRAILER.size:
+            self._file.seek(size - _TRAILER.size)
+            offset, magic = _TRAILER.unpack(self._file.read(_TRAILER.size))
+            if magic == INDEX_MAGIC and self._header_end <= offset < size:
+                self._file.seek(offset)
+                kind, length = _BLOCK.unpack(self._file.read(_BLOCK.size))
+                if kind == b'I':
+                    return json.loads(zlib.decompress(self._file.read(length))), offset, False
+        return self._scan()
+
+    def _scan(self) -> Tuple[Dict[str, list], int, bool]:
+        """顺序扫描文章记录重建索引，返回 (索引, 最后一条完整记录的结尾, True)"""
+        index: Dict[str, list] = {}
+        self._file.seek(self._header_end)
+        position = self._header_end
+        while True:
+            header = self._file.read(_RECORD.size)
+            if len(header) < _RECORD.size or header[:1] != b'A':
+                break
+            _, name_size, size, raw_size, crc = _RECORD.unpack(header)
+            name = self._file.read(name_size)
+            data_offset = position + _RECORD.size + name_size
+            if len(name) < name_size or self._file.seek(size, os.SEEK_CUR) > os.fstat(self._file.fileno()).st_size:
+                break
+            index[name.decode('utf-8')] = [data_offset, size, raw_size, crc, '', 0.0]
+            position = data_offset + size
+        return index, position, True
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.index))
+
+    def names(self) -> List[str]:
+        """全部文件名（按写入顺序）"""
+        return list(self.index)
+
+    def topic(self, name: str) -> str:
+        """文章的主题（索引中没有时读取文章）"""
+        return self.index[name][4] or parse_article(self.read(name))['topic']
+
+    def find(self, query: str) -> List[str]:
+        """
+        按文件名或主题查找文章
+
+        Args:
+            query: 文件名、主题（不区分大小写）或它们的一部分
+
+        Returns:
+            匹配的文件名，完全匹配的在前
+        """
+        if query in self.index:
+            return [query]
+        needle = query.strip().lower()
+        exact, partial = [], []
+        for name, entry in self.index.items():
+            topic = (entry[4] or '').lower()
+            if needle in (topic, name.lower(), os.path.splitext(name)[0].lower()):
+                exact.append(name)
+            elif needle in topic or needle in name.lower():
+                partial.append(name)
+        return exact + partial
+
+    def read_bytes(self, name: str) -> bytes:
+        """
+        读取一篇文章的原始内容
+
+        Args:
+            name: 文件名
+
+        Returns:
+            文件内容
+
+        Raises:
+            KeyError: 归档中没有这篇文章
+            ArchiveError: 数据损坏
+        """
+        offset, size, raw_size, crc = self.index[name][:4]
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(size)
+        try:
+            if self.codec == 'zstd':
+                raw = _zstd().ZstdDecompressor(dict_data=self._zstd_dict).decompress(data, max_output_size=raw_size)
+            else:
+                decompressor = zlib.decompressobj(-15, zdict=self.dictionary)
+                raw = decompressor.decompress(data) + decompressor.flush()
+        except Exception as e:
+            raise ArchiveError(f"Cannot decompress {name}: {e}") from e
+        if len(raw) != raw_size or zlib.crc32(raw) != crc:
+            raise ArchiveError(f"Checksum mismatch for {name}")
+        return raw
+
+    def read(self, name: str) -> str:
+        """读取一篇文章的文本"""
+        return self.read_bytes(name).decode('utf-8')
+
+    def read_article(self, name: str) -> Dict[str, str]:
+        """读取并解析一篇文章（格式同 storage.read_article）"""
+        return parse_article(self.read(name))
+
+    def extract(self, out_dir: str, names: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        解压文章到目录（保留相对路径）
+
+        Args:
+            out_dir: 目标目录
+            names: 要解压的文件名（默认全部）
+
+        Returns:
+            写出的文件路径
+        """
+        written = []
+        for name in (self.names() if names is None else names):
+            path = os.path.join(out_dir, *name.split('/'))
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(self.read_bytes(name))
+            written.append(path)
+        return written
+
+    def stats(self) -> Dict:
+        """
+        归档统计
+
+        Returns:
+            包含 articles、raw_bytes、stored_bytes（文章数据）、file_bytes（含字典和索引）、ratio、codec、dict_bytes 的字典
+        """
+        raw = sum(entry[2] for entry in self.index.values())
+        stored = sum(entry[1] for entry in self.index.values())
+        size = os.path.getsize(self.path)
+        return {
+            'articles': len(self.index),
+            'raw_bytes': raw,
+            'stored_bytes': stored,
+            'file_bytes': size,
+            'ratio': round(raw / size, 2) if size else 0.0,
+            'codec': self.codec,
+            'dict_bytes': len(self.dictionary),
+        }
+
+    # ---------- 追加 ----------
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.codec == 'zstd':
+            if self._compressor is None:
+                self._compressor = _zstd().ZstdCompressor(level=self.level, dict_data=self._zstd_dict,
+                                                          write_content_size=False, write_dict_id=False)
+            return self._compressor.compress(raw)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, 9, zdict=self.dictionary)
+        return compressor.compress(raw) + compressor.flush()
+
+    def append(self, name: str, text: Union[str, bytes], topic: Optional[str] = None, mtime: float = 0.0):
+        """
+        追加一篇文章（同名文章已存在时以新内容为准，旧数据留在文件中直到重建）
+
+        文章记录立即写入文件，索引在 flush() 或 close() 时写入。
+
+        Args:
+            name: 文件名（相对路径，以 / 分隔）
+            text: 文件内容（bytes 时原样保存）
+            topic: 主题（默认从文件头读取）
+            mtime: 源文件的修改时间（用于增量归档时判断是否变化）
+        """
+        if self.mode != 'a':
+            raise ValueError("Archive is opened read-only")
+        raw = text.encode('utf-8') if isinstance(text, str) else text
+        encoded = name.encode('utf-8')
+        crc = zlib.crc32(raw)
+        if topic is None:
+            topic = parse_article(raw.decode('utf-8', errors='replace'))['topic']
+        with self._lock:
+            data = self._compress(raw)
+            if not self._dirty:
+                # 第一次追加：去掉旧的索引和文件尾，中途中断时打开文件会扫描记录
+                self._file.truncate(self._data_end)
+                self._dirty = True
+            self._file.seek(self._data_end)
+            self._file.write(_RECORD.pack(b'A', len(encoded), len(data), len(raw), crc))
+            self._file.write(encoded)
+            self._file.write(data)
+            data_offset = self._data_end + _RECORD.size + len(encoded)
+            self._data_end = data_offset + len(data)
+            self.index[name] = [data_offset, len(data), len(raw), crc, topic, mtime]
+
+    def flush(self):
+        """写入索引和文件尾"""
+        with self._lock:
+            if not self._dirty:
+                return
+            index = zlib.compress(json.dumps(self.index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            self._file.seek(self._data_end)
+            self._file.truncate()
+            self._file.write(_BLOCK.pack(b'I', len(index)))
+            self._file.write(index)
+            self._file.write(_TRAILER.pack(self._data_end, INDEX_MAGIC))
+            self._file.flush()
+            self._dirty = False
+
+    def close(self):
+        """写入索引（追加模式）并关闭文件"""
+        if self._file.closed:
+            return
+        try:
+            if self.mode == 'a':
+                self.flush()
+        finally:
+            self._file.close()
+
+    def __enter__(self) -> 'CorpusArchive':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_source(output_dir: str, name: str) -> bytes:
+    with open(os.path.join(output_dir, *name.split('/')), 'rb') as f:
+        return f.read()
+
+
+def archive_directory(output_dir: str = "output", path: Optional[str] = None, codec: str = 'zlib',
+                      rebuild: bool = False) -> Dict:
+    """
+    把目录中的文章写入归档
+
+    归档不存在或 rebuild 时用全部文章训练字典并新建归档（先写临时文件再替换）；
+    否则只追加新增或修改过（大小或修改时间变化）的文章，沿用已有的字典。
+    目录中已删除的文章仍保留在归档中。
+
+    Args:
+        output_dir: 文章目录
+        path: 归档文件路径（默认 output_dir/export/articles.arc）
+        codec: 新建时使用的编码（zlib 或 zstd）
+        rebuild: 重新训练字典并重建归档
+
+    Returns:
+        包含 path、added、updated、unchanged 以及 CorpusArchive.stats() 各字段的字典
+    """
+    path = path or os.path.join(output_dir, 'export', 'articles.arc')
+    found = scan_articles(output_dir)
+    names = sorted(found)
+    added = updated = 0
+
+    if rebuild or not os.path.exists(path):
+        texts = {name: _read_source(output_dir, name) for name in names}
+        tmp_path = path + '.tmp'
+        try:
+            with CorpusArchive.create(tmp_path, texts.values(), codec) as archive:
+                for name in names:
+                    archive.append(name, texts[name], mtime=found[name].st_mtime)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        added = len(names)
+    else:
+        with CorpusArchive(path, 'a') as archive:
+            for name in names:
+                entry = archive.index.get(name)
+                stat = found[name]
+                if entry is not None and (entry[2], entry[5]) == (stat.st_size, stat.st_mtime):
+                    continue
+                archive.append(name, _read_source(output_dir, name), mtime=stat.st_mtime)
+                if entry is None:
+                    added += 1
+                else:
+                    updated += 1
+
+    with CorpusArchive(path) as archive:
+        result = {'path': path, 'added': added, 'updated': updated, 'unchanged': len(names) - added - updated}
+        result.update(archive.stats())
+    return result
@@ -0,0 +1,406 @@
+"""
+接口诊断与基准测试模块
+对每个配置的服务地址和模型测量 DNS 解析、TCP 连接和 TLS 握手耗时，
+再按不同并发数各发送若干次真实的文章生成请求，统计首token时间、生成速度（tokens/s）、延迟分位数和错误，
+据此推荐服务、模型和并发设置。每次运行的结果追加到 output/benchmarks.jsonl，便于比较不同时间的表现。
+"""
+
+import json
+import os
+import socket
+import ssl
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from .errors import classify_error
+from .tokens import count_tokens
+
+DEFAULT_ENDPOINTS = os.path.join('config', 'endpoints.json')
+DEFAULT_HISTORY = os.path.join('output', 'benchmarks.jsonl')
+
+# 高并发下p95延迟超过最低并发时的这个倍数，视为服务已过载
+MAX_P95_GROWTH = 2.0
+
+
+class Endpoint(NamedTuple):
+    """要测试的服务地址"""
+
+    name: str
+    base_url: str
+    api_key: str
+    models: List[str]
+
+
+def load_endpoints(path: Optional[str] = None) -> List[Endpoint]:
+    """
+    读取要测试的服务列表
+
+    存在 config/endpoints.json（格式见 config/endpoints.example.json）时使用其中的服务，
+    密钥从 api_key_env 指定的环境变量读取；否则只测试 config/.env 中的 API_BASE_URL 和 MODEL_NAME
+    （以及 config/models.json 模型池中的模型）。
+
+    Args:
+        path: 服务列表文件（默认 config/endpoints.json）
+
+    Returns:
+        服务列表（缺少密钥的服务被跳过）
+
+    Raises:
+        ValueError: 文件格式无效
+    """
+    path = path or DEFAULT_ENDPOINTS
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            endpoints = []
+            for entry in config['endpoints']:
+                api_key = entry.get('api_key') or os.getenv(entry.get('api_key_env', 'API_KEY'), '')
+                if api_key:
+                    endpoints.append(Endpoint(entry.get('name') or urlsplit(entry['base_url']).hostname,
+                                              entry['base_url'], api_key, list(entry['models'])))
+                else:
+                    print(f"⚠️  Skipping {entry.get('name', entry['base_url'])}: "
+                          f"{entry.get('api_key_env', 'API_KEY')} is not set")
+            return endpoints
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid endpoints file {path}: {e}") from e
+
+    api_key = os.getenv('API_KEY', '')
+    if not api_key:
+        return []
+    base_url = os.getenv('API_BASE_URL', 'https://api.openai.com/v1')
+    models = [os.getenv('MODEL_NAME', 'gpt-4o-mini')]
+    pool_path = os.getenv('MODEL_POOL_FILE', os.path.join('config', 'models.json'))
+    if os.path.exists(pool_path):
+        try:
+            with open(pool_path, 'r', encoding='utf-8') as f:
+                models += [model['name'] for model in json.load(f).get('models', []) if model['name'] not in models]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    return [Endpoint(urlsplit(base_url).hostname or base_url, base_url, api_key, models)]
+
+
+def probe_connection(base_url: str, timeout: float = 10.0) -> Dict:
+    """
+    测量建立连接各阶段的耗时（不经过代理）
+
+    Args:
+        base_url: 服务地址
+        timeout: 每个阶段的超时（秒）
+
+    Returns:
+        包含 host、address、dns_ms、tcp_ms、tls_ms 的字典，失败时包含 error
+    """
+    parts = urlsplit(base_url)
+    host = parts.hostname or ''
+    https = parts.scheme == 'https'
+    port = parts.port or (443 if https else 80)
+    result = {'host': host, 'address': None, 'dns_ms': None, 'tcp_ms': None, 'tls_ms': None}
+    sock = None
+    try:
+        started = time.perf_counter()
+        family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        result['dns_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        result['address'] = address[0]
+
+        started = time.perf_counter()
+        sock = socket.socket(family, kind, proto)
+        sock.settimeout(timeout)
+        sock.connect(address)
+        result['tcp_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        if https:
+            started = time.perf_counter()
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            result['tls_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    except (OSError, IndexError) as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        if sock is not None:
+            sock.close()
+    return result
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    分位数（线性插值）
+
+    Args:
+        values: 样本
+        q: 分位（0-100）
+
+    Returns:
+        分位数，没有样本时返回 None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def sample_request(client, model: str, prompt: str, max_tokens: int, temperature: float = 0.7) -> Dict:
+    """
+    发送一次流式生成请求并计时
+
+    Args:
+        client: OpenAI 客户端
+        model: 模型名称
+        prompt: 提示词
+        max_tokens: 最大token数
+        temperature: 温度
+
+    Returns:
+        包含 ok、latency、ttft、tokens、tokens_per_s 的字典，失败时包含 error（分类后的错误类型）和 message
+    """
+    started = time.perf_counter()
+    first = None
+    parts = []
+    usage = None
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        for chunk in stream:
+            usage = getattr(chunk, 'usage', None) or usage
+            choices = getattr(chunk, 'choices', None)
+            text = getattr(getattr(choices[0], 'delta', None), 'content', None) if choices else None
+            if text:
+                if first is None:
+                    first = time.perf_counter()
+                parts.append(text)
+    except Exception as e:
+        error = classify_error(e, model)
+        return {'ok': False, 'latency': round(time.perf_counter() - started, 3),
+                'error': type(error).__name__, 'message': error.message}
+
+    latency = time.perf_counter() - started
+    if first is None:
+        return {'ok': False, 'latency': round(latency, 3), 'error': 'EmptyResponseError',
+                'message': 'API returned empty content'}
+    # 流式响应通常不含用量，在本地估算
+    tokens = getattr(usage, 'completion_tokens', 0) or count_tokens(''.join(parts))
+    generating = latency - (first - started)
+    return {
+        'ok': True,
+        'latency': round(latency, 3),
+        'ttft': round(first - started, 3),
+        'tokens': tokens,
+        'tokens_per_s': round(tokens / generating, 1) if generating > 0 else None,
+    }
+
+
+def summarize_level(concurrency: int, samples: List[Dict], wall: float) -> Dict:
+    """
+    汇总同一并发数下的样本
+
+    Args:
+        concurrency: 并发数
+        samples: sample_request 的结果列表
+        wall: 这一轮的总耗时（秒）
+
+    Returns:
+        统计字典
+    """
+    ok = [sample for sample in samples if sample['ok']]
+    latencies = [sample['latency'] for sample in ok]
+    speeds = [sample['tokens_per_s'] for sample in ok if sample['tokens_per_s']]
+
+    def rounded(value, digits=3):
+        return round(value, digits) if value is not None else None
+
+    return {
+        'concurrency': concurrency,
+        'samples': len(samples),
+        'ok': len(ok),
+        'errors': dict(Counter(sample['error'] for sample in samples if not sample['ok'])),
+        'ttft_p50': rounded(percentile([sample['ttft'] for sample in ok], 50)),
+        'latency_p50': rounded(percentile(latencies, 50)),
+        'latency_p90': rounded(percentile(latencies, 90)),
+        'latency_p95': rounded(percentile(latencies, 95)),
+        'latency_p99': rounded(percentile(latencies, 99)),
+        'tokens_per_s': rounded(percentile(speeds, 50), 1),
+        'throughput_rps': round(len(ok) / wall, 3) if wall > 0 else 0.0,
+        'throughput_tps': round(sum(sample['tokens'] for sample in ok) / wall, 1) if wall > 0 else 0.0,
+        'wall_s': round(wall, 3),
+    }
+
+
+def benchmark_model(client, model: str, prompt: str, max_tokens: int, samples: int = 5,
+                    levels: List[int] = (1,), temperature: float = 0.7,
+                    on_sample: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
+    """
+    按各并发数测试一个模型
+
+    Args:
+        client: OpenAI 客户端（不应自动重试，错误计入结果）
+        model: 模型名称
+        prompt: 提示词
+        max_tokens: 最大token数
+        samples: 每个并发数的请求次数（至少等于并发数）
+        levels: 并发数列表
+        temperature: 温度
+        on_sample: 每个请求完成时的回调 (并发数, 结果)
+
+    Returns:
+        每个并发数的统计（见 summarize_level）
+    """
+    results = []
+    for concurrency in levels:
+        count = max(samples, concurrency)
+
+        def run(_):
+            sample = sample_request(client, model, prompt, max_tokens, temperature)
+            if on_sample:
+                on_sample(concurrency, sample)
+            return sample
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            collected = list(executor.map(run, range(count)))
+        results.append(summarize_level(concurrency, collected, time.perf_counter() - started))
+    return results
+
+
+def best_level(levels: List[Dict]) -> Optional[Dict]:
+    """
+    吞吐量最高、没有错误、p95延迟未明显变差的并发数
+
+    Args:
+        levels: benchmark_model 的结果
+
+    Returns:
+        对应的统计，全部有错误时返回 None
+    """
+    healthy = [level for level in levels if level['ok'] and not level['errors']]
+    if not healthy:
+        return None
+    base = min(healthy, key=lambda level: level['concurrency'])['latency_p95']
+    usable = [level for level in healthy if level['latency_p95'] <= base * MAX_P95_GROWTH]
+    return max(usable, key=lambda level: level['throughput_tps'])
+
+
+def recommend(results: List[Dict]) -> Dict:
+    """
+    根据测试结果推荐设置
+
+    Args:
+        results: 每个 (服务, 模型) 的结果，包含 endpoint、base_url、model、levels
+
+    Returns:
+        {'interactive': ..., 'batch': ...}：单篇生成选最低并发下p50延迟最短的，批量生成选吞吐量最高的；
+        没有可用结果时为空字典
+    """
+    interactive = []
+    batch = []
+    for result in results:
+        level = best_level(result['levels'])
+        if level is None:
+            continue
+        batch.append((level['throughput_tps'], result, level))
+        lowest = min((item for item in result['levels'] if item['ok'] and not item['errors']),
+                     key=lambda item: item['concurrency'])
+        interactive.append((lowest['latency_p50'], result, lowest))
+    if not batch:
+        return {}
+
+    _, result, level = min(interactive, key=lambda item: item[0])
+    recommendation = {'interactive': {
+        'endpoint': result['endpoint'], 'model': result['model'], 'latency_p50': level['latency_p50'],
+        'settings': {'API_BASE_URL': result['base_url'], 'MODEL_NAME': result['model']},
+    }}
+    _, result, level = max(batch, key=lambda item: item[0])
+    recommendation['batch'] = {
+        'endpoint': result['endpoint'], 'model': result['model'], 'concurrency': level['concurrency'],
+        'throughput_tps': level['throughput_tps'],
+        'settings': {
+            'API_BASE_URL': result['base_url'],
+            'MODEL_NAME': result['model'],
+            'ADAPTIVE_MAX': str(level['concurrency']),
+            'ADAPTIVE_TARGET_P95': str(int(level['latency_p95'] * 1.5) + 1),
+        },
+    }
+    return recommendation
+
+
+def save_run(run: Dict, path: str = DEFAULT_HISTORY):
+    """
+    追加一次运行的结果
+
+    Args:
+        run: 运行结果
+        path: 历史文件（JSONL）
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+
+
+def load_history(path: str = DEFAULT_HISTORY) -> List[Dict]:
+    """
+    读取历史运行结果（忽略无法解析的行）
+
+    Args:
+        path: 历史文件
+
+    Returns:
+        按时间顺序的运行列表
+    """
+    runs = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return runs
+
+
+def previous_level(history: List[Dict], base_url: str, model: str, concurrency: int) -> Optional[Dict]:
+    """
+    历史中同一服务、模型和并发数最近一次的统计
+
+    Args:
+        history: load_history 的结果
+        base_url: 服务地址
+        model: 模型名称
+        concurrency: 并发数
+
+    Returns:
+        统计字典（附带 timestamp），没有时返回 None
+    """
+    for run in reversed(history):
+        for result in run.get('results', []):
+            if result.get('base_url') != base_url or result.get('model') != model:
+                continue
+            for level in result.get('levels', []):
+                if level.get('concurrency') == concurrency:
+                    return dict(level, timestamp=run.get('timestamp'))
+    return None
+
+
+def new_run(config: Dict) -> Dict:
+    """
+    新的运行记录
+
+    Args:
+        config: 测试参数（samples、levels、max_tokens 等）
+
+    Returns:
+        运行记录，results 为空列表
+    """
+    return {'timestamp': datetime.now().isoformat(timespec='seconds'), 'config': config, 'results': []}
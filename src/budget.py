@@ -0,0 +1,366 @@
+"""
+预算管理模块
+统计token用量并折算费用，对单次运行、每日和每组的花费设置上限
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from .errors import BudgetExceededError
+
+
+# 每百万token价格（美元）：(输入, 输出)
+PRICE_TABLE: Dict[str, Tuple[float, float]] = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'openai/gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'deepseek-chat': (0.27, 1.10),
+    'Qwen/Qwen2.5-7B-Instruct': (0.0, 0.0),
+    'Qwen/Qwen2.5-32B-Instruct': (0.18, 0.18),
+    'Qwen/Qwen2.5-72B-Instruct': (0.57, 0.57),
+    'meta-llama/llama-3.2-3b-instruct:free': (0.0, 0.0),
+}
+
+# 价格表中没有的模型按此价格保守估算
+DEFAULT_PRICE: Tuple[float, float] = (1.00, 2.00)
+
+# 每日花费账本最多每隔多少秒写一次文件（运行结束、暂停和程序退出时由 flush() 写入剩余部分）
+LEDGER_SAVE_INTERVAL = 5.0
+
+
+class BudgetManager:
+    """
+    预算管理器
+
+    每次请求前调用 before_request() 决定使用的模型（可能被降级）并在需要时限速或暂停，
+    请求完成后调用 record() 记录实际用量。
+
+    上限是硬性的：花费达到任一上限后抛出 BudgetExceededError。
+    在达到上限之前（超过 soft_ratio 比例时）按 action 采取措施：
+        throttle  - 按 throttle_rate（美元/小时）限制花费速度
+        downgrade - 切换到 fallback_model
+        pause     - 不做处理，直到达到上限时暂停
+    """
+
+    ACTIONS = ('throttle', 'downgrade', 'pause')
+
+    def __init__(self, run_limit: float = 0.0, daily_limit: float = 0.0, group_limit: float = 0.0,
+                 action: str = 'pause', fallback_model: str = "", soft_ratio: float = 0.8,
+                 throttle_rate: float = 0.0, max_rate: float = 0.0,
+                 ledger_path: str = os.path.join('output', '.budget_ledger.json'),
+                 prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Args:
+            run_limit: 单次运行花费上限（美元，0表示不限）
+            daily_limit: 每日花费上限（美元，0表示不限）
+            group_limit: 每个主题组花费上限（美元，0表示不限）
+            action: 接近上限时的措施（throttle, downgrade, pause）
+            fallback_model: 降级使用的便宜模型
+            soft_ratio: 花费超过上限的该比例时开始采取措施
+            throttle_rate: throttle 措施下的花费速度（美元/小时）
+            max_rate: 始终生效的花费速度上限（美元/小时，0表示不限）
+            ledger_path: 每日花费账本文件
+            prices: 额外的价格表（覆盖默认值）
+        """
+        if action not in self.ACTIONS:
+            raise ValueError(f"BUDGET_ACTION must be one of {', '.join(self.ACTIONS)}, got: {action}")
+
+        self.run_limit = run_limit
+        self.daily_limit = daily_limit
+        self.group_limit = group_limit
+        self.action = action
+        self.fallback_model = fallback_model
+        self.soft_ratio = soft_ratio
+        self.throttle_rate = throttle_rate
+        self.max_rate = max_rate
+        self.ledger_path = ledger_path
+        self.prices = dict(PRICE_TABLE)
+        if prices:
+            self.prices.update(prices)
+
+        self.run_cost = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+        self.group_costs: Dict[str, float] = {}
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # 限速时下一个请求最早可以开始的时间（每个请求在锁内预订一个时间段，多个线程不会同时醒来）
+        self._next_allowed = 0.0
+        self._ledger = self._load_ledger()
+        self._ledger_version = 0
+        self._saved_version = 0
+        self._saved_at = time.monotonic()
+        self._save_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls, ledger_dir: str = 'output') -> 'BudgetManager':
+        """
+        从环境变量创建预算管理器
+
+        Args:
+            ledger_dir: 账本文件所在目录
+
+        Returns:
+            BudgetManager 实例
+        """
+        prices = None
+        model = os.getenv('MODEL_NAME', '')
+        if os.getenv('PRICE_INPUT_PER_M') or os.getenv('PRICE_OUTPUT_PER_M'):
+            prices = {model: (float(os.getenv('PRICE_INPUT_PER_M', '0')),
+                              float(os.getenv('PRICE_OUTPUT_PER_M', '0')))}
+
+        return cls(
+            run_limit=float(os.getenv('BUDGET_RUN_LIMIT', '0')),
+            daily_limit=float(os.getenv('BUDGET_DAILY_LIMIT', '0')),
+            group_limit=float(os.getenv('BUDGET_GROUP_LIMIT', '0')),
+            action=os.getenv('BUDGET_ACTION', 'pause'),
+            fallback_model=os.getenv('FALLBACK_MODEL', ''),
+            soft_ratio=float(os.getenv('BUDGET_SOFT_RATIO', '0.8')),
+            throttle_rate=float(os.getenv('BUDGET_THROTTLE_RATE', '0.1')),
+            max_rate=float(os.getenv('BUDGET_MAX_RATE', '0')),
+            ledger_path=os.path.join(ledger_dir, '.budget_ledger.json'),
+            prices=prices
+        )
+
+    def price(self, model: str) -> Tuple[float, float]:
+        """
+        查询模型价格
+
+        Args:
+            model: 模型名称
+
+        Returns:
+            (输入价格, 输出价格)，单位为美元/百万token
+        """
+        return self.prices.get(model, DEFAULT_PRICE)
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """
+        计算费用
+
+        Args:
+            model: 模型名称
+            prompt_tokens: 输入token数
+            completion_tokens: 输出token数
+
+        Returns:
+            费用（美元）
+        """
+        input_price, output_price = self.price(model)
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    @property
+    def daily_cost(self) -> float:
+        """今日累计花费"""
+        return self._ledger.get(date.today().isoformat(), 0.0)
+
+    def _load_ledger(self) -> Dict[str, float]:
+        if not os.path.exists(self.ledger_path):
+            return {}
+        try:
+            with open(self.ledger_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_ledger(self, ledger: Dict[str, float], version: int):
+        """写入账本快照（在锁外调用；较旧的快照不会覆盖较新的）"""
+        with self._save_lock:
+            if version <= self._saved_version:
+                return
+            directory = os.path.dirname(self.ledger_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.ledger_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(ledger, f, indent=2)
+            os.replace(tmp_path, self.ledger_path)
+            self._saved_version = version
+
+    def flush(self):
+        """把尚未写入的账本写入文件（运行结束、暂停时调用）"""
+        with self._lock:
+            if self._ledger_version <= self._saved_version:
+                return
+            snapshot = (dict(self._ledger), self._ledger_version)
+            self._saved_at = time.monotonic()
+        try:
+            self._save_ledger(*snapshot)
+        except OSError:
+            pass
+
+    def _usage_ratios(self, group: Optional[str]) -> Dict[str, float]:
+        """各上限的已用比例（未设置的上限不出现）"""
+        ratios = {}
+        if self.run_limit > 0:
+            ratios['run'] = self.run_cost / self.run_limit
+        if self.daily_limit > 0:
+            ratios['day'] = self.daily_cost / self.daily_limit
+        if self.group_limit > 0 and group:
+            ratios['group'] = self.group_costs.get(group, 0.0) / self.group_limit
+        return ratios
+
+    def _pacing_delay(self, rate_per_hour: float, now: float) -> float:
+        """
+        按给定花费速度预订下一个请求的时间段，返回需要等待的秒数（调用方持有锁）
+
+        已完成的请求决定最早可以开始的时间；每个请求再按平均单次花费把 _next_allowed 向后推，
+        同时等待的多个线程依次错开，而不是在同一时刻一起醒来。
+        """
+        allowed_elapsed = self.run_cost / rate_per_hour * 3600
+        start = max(now, self.started_at + allowed_elapsed, self._next_allowed)
+        average_cost = self.run_cost / self.requests if self.requests else 0.0
+        self._next_allowed = start + average_cost / rate_per_hour * 3600
+        return start - now
+
+    def before_request(self, model: str, group: Optional[str] = None) -> str:
+        """
+        请求前检查预算
+
+        Args:
+            model: 计划使用的模型
+            group: 所属主题组
+
+        Returns:
+            实际应使用的模型
+
+        Raises:
+            BudgetExceededError: 已达到某个花费上限
+        """
+        with self._lock:
+            ratios = self._usage_ratios(group)
+            for scope, ratio in ratios.items():
+                if ratio >= 1.0:
+                    raise BudgetExceededError(
+                        f"Budget limit reached ({scope}): ${self._spent(scope, group):.4f}",
+                        scope,
+                        "已达到花费上限，可调整 config/.env 中的 BUDGET_* 参数后重新运行以继续"
+                    )
+
+            soft = any(ratio >= self.soft_ratio for ratio in ratios.values())
+            rates = [self.max_rate] + ([self.throttle_rate] if soft and self.action == 'throttle' else [])
+            rates = [rate for rate in rates if rate > 0]
+            delay = self._pacing_delay(min(rates), time.monotonic()) if rates else 0.0
+            if soft and self.action == 'downgrade' and self.fallback_model:
+                model = self.fallback_model
+
+        if delay > 0:
+            time.sleep(delay)
+        return model
+
+    def _spent(self, scope: str, group: Optional[str]) -> float:
+        if scope == 'run':
+            return self.run_cost
+        if scope == 'day':
+            return self.daily_cost
+        return self.group_costs.get(group or '', 0.0)
+
+    @contextlib.contextmanager
+    def track(self, totals: Dict[str, float]):
+        """
+        把当前线程在 with 块内记录的花费累加到 totals['cost']（不含其他线程同时进行的请求）
+
+        Args:
+            totals: 累加结果的字典
+        """
+        trackers = getattr(self._local, 'trackers', None)
+        if trackers is None:
+            trackers = self._local.trackers = []
+        totals.setdefault('cost', 0.0)
+        trackers.append(totals)
+        try:
+            yield totals
+        finally:
+            trackers.remove(totals)
+
+    def record(self, model: str, usage, group: Optional[str] = None) -> float:
+        """
+        记录一次请求的用量
+
+        Args:
+            model: 实际使用的模型
+            usage: API响应中的 usage 对象（需包含 prompt_tokens 和 completion_tokens）
+            group: 所属主题组
+
+        Returns:
+            本次请求的费用（美元）
+        """
+        prompt_tokens = (getattr(usage, 'prompt_tokens', 0) or 0) if usage else 0
+        completion_tokens = (getattr(usage, 'completion_tokens', 0) or 0) if usage else 0
+        spent = self.cost(model, prompt_tokens, completion_tokens)
+
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.run_cost += spent
+            if group:
+                self.group_costs[group] = self.group_costs.get(group, 0.0) + spent
+            today = date.today().isoformat()
+            self._ledger[today] = self._ledger.get(today, 0.0) + spent
+            self._ledger_version += 1
+            # 账本文件按间隔写入（在锁外写），不让每个请求都等文件读写
+            snapshot = None
+            now = time.monotonic()
+            if now - self._saved_at >= LEDGER_SAVE_INTERVAL:
+                self._saved_at = now
+                snapshot = (dict(self._ledger), self._ledger_version)
+
+        if snapshot:
+            try:
+                self._save_ledger(*snapshot)
+            except OSError:
+                pass
+
+        for totals in getattr(self._local, 'trackers', ()):
+            totals['cost'] += spent
+        return spent
+
+    def estimate_remaining(self, remaining_requests: int, model: str, prompt_tokens: int = 600,
+                           max_tokens: int = 400) -> float:
+        """
+        估算完成剩余请求还需的花费
+
+        已有请求记录时按实际平均费用估算，否则按价格表和token上限估算。
+
+        Args:
+            remaining_requests: 剩余请求数
+            model: 使用的模型
+            prompt_tokens: 单次请求预计输入token数
+            max_tokens: 单次请求输出token上限
+
+        Returns:
+            预计花费（美元）
+        """
+        with self._lock:
+            if self.requests:
+                per_request = self.run_cost / self.requests
+            else:
+                per_request = self.cost(model, prompt_tokens, max_tokens)
+        return per_request * max(0, remaining_requests)
+
+    def summary(self) -> Dict:
+        """
+        用量汇总
+
+        Returns:
+            包含请求数、token数和花费的字典
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'run_cost': round(self.run_cost, 6),
+                'daily_cost': round(self.daily_cost, 6),
+                'group_costs': {k: round(v, 6) for k, v in self.group_costs.items()},
+            }
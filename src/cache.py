@@ -0,0 +1,117 @@
+"""
+文章缓存模块
+按请求指纹把已生成的文章缓存到本地磁盘
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class ArticleCache:
+    """
+    磁盘文章缓存
+
+    每条缓存是 cache_dir 下的一个JSON文件，文件名为请求指纹（见 ArticleGenerator.request_key），
+    因此模型、温度、长度等参数变化后旧缓存自然不再命中。
+    """
+
+    def __init__(self, cache_dir: str = os.path.join('output', '.cache'), ttl: float = 7 * 24 * 3600):
+        """
+        Args:
+            cache_dir: 缓存目录
+            ttl: 缓存有效期（秒）
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        读取缓存
+
+        Args:
+            key: 请求指纹
+
+        Returns:
+            缓存条目（包含 keyword、article、created_at），不存在或已过期时返回 None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        if entry and time.time() - entry.get('created_at', 0) > self.ttl:
+            self._remove(path)
+            entry = None
+
+        with self._lock:
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry
+
+    def pop(self, key: str) -> Optional[Dict]:
+        """
+        读取并删除缓存（每篇预取的文章只使用一次）
+
+        Args:
+            key: 请求指纹
+
+        Returns:
+            缓存条目或 None
+        """
+        entry = self.get(key)
+        if entry:
+            self._remove(self._path(key))
+        return entry
+
+    def contains(self, key: str) -> bool:
+        """是否存在有效缓存（不计入命中统计）"""
+        path = self._path(key)
+        try:
+            return time.time() - os.path.getmtime(path) <= self.ttl
+        except OSError:
+            return False
+
+    def put(self, key: str, keyword: str, article: str, **extra):
+        """
+        写入缓存
+
+        Args:
+            key: 请求指纹
+            keyword: 主题关键词
+            article: 文章内容
+            **extra: 其他需要保存的字段
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {'keyword': keyword, 'article': article, 'created_at': time.time(), **extra}
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def keys(self) -> List[str]:
+        """所有缓存条目的指纹"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        return [name[:-len('.json')] for name in names if name.endswith('.json')]
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
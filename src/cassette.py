@@ -0,0 +1,320 @@
+"""
+录制/回放模块
+录制模式下把经过 ArticleGenerator 的每次 chat.completions 请求和响应（包括流式片段、耗时和错误）
+追加到 gzip 压缩的 JSONL 文件（cassette）；回放模式下不访问网络，按请求内容从文件中取出响应，
+可以按原始耗时或零延迟返回。用于离线运行批量生成、命令行和GUI流程，测量生成器自身的开销，以及复现线上问题。
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+from . import errors
+from .errors import InvalidRequestError, RateLimitedError, classify_error
+
+DEFAULT_CASSETTE = os.path.join('output', '.cassette.jsonl.gz')
+
+MODES = ('record', 'replay')
+TIMINGS = ('original', 'none')
+
+
+class CassetteMissError(InvalidRequestError):
+    """回放时找不到对应的录制记录"""
+
+
+def request_keys(params: Dict) -> tuple:
+    """
+    请求的匹配键
+
+    Args:
+        params: chat.completions.create 的参数
+
+    Returns:
+        (完整键, 提示词键)：完整键包含模型和生成参数，提示词键只包含消息内容（配置变化后仍能匹配）
+    """
+    messages = json.dumps(params.get('messages', []), sort_keys=True, ensure_ascii=False)
+    full = json.dumps({
+        'model': params.get('model'),
+        'temperature': params.get('temperature'),
+        'max_tokens': params.get('max_tokens'),
+        'n': params.get('n', 1),
+        'stream': bool(params.get('stream')),
+    }, sort_keys=True) + messages
+    prompt = str(bool(params.get('stream'))) + messages
+    return (hashlib.sha256(full.encode('utf-8')).hexdigest()[:32],
+            hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:32])
+
+
+def _usage(usage) -> Optional[List[int]]:
+    """取出用量 [prompt_tokens, completion_tokens]"""
+    if usage is None:
+        return None
+    return [getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0]
+
+
+def _usage_object(usage: Optional[List[int]]):
+    if usage is None:
+        return None
+    return SimpleNamespace(prompt_tokens=usage[0], completion_tokens=usage[1], total_tokens=usage[0] + usage[1])
+
+
+def _chunk_text(chunk) -> str:
+    choices = getattr(chunk, 'choices', None)
+    if not choices:
+        return ""
+    delta = getattr(choices[0], 'delta', None)
+    return getattr(delta, 'content', None) or ""
+
+
+class CassetteClient:
+    """与 OpenAI 客户端接口相同的包装（只提供 chat.completions.create）"""
+
+    def __init__(self, create):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+class Cassette:
+    """
+    请求录制/回放
+
+    同一请求录制了多次时按录制顺序依次返回，用完后重复返回最后一次的结果。
+    """
+
+    def __init__(self, path: str = DEFAULT_CASSETTE, mode: str = 'replay', timing: str = 'original'):
+        """
+        Args:
+            path: cassette 文件路径（.jsonl.gz）
+            mode: record（录制，覆盖已有文件）或 replay（回放）
+            timing: 回放时按原始耗时返回（original）或立即返回（none）
+
+        Raises:
+            ValueError: 参数无效
+            OSError: 回放时文件无法读取
+        """
+        if mode not in MODES:
+            raise ValueError(f"Invalid cassette mode: {mode} (expected {' or '.join(MODES)})")
+        if timing not in TIMINGS:
+            raise ValueError(f"Invalid cassette timing: {timing} (expected {' or '.join(TIMINGS)})")
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries: Dict[str, deque] = defaultdict(deque)
+        self._last: Dict[str, Dict] = {}
+
+        if mode == 'record':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._file = gzip.open(path, 'wb')
+            atexit.register(self.close)
+        else:
+            for entry in self.load(path):
+                self._entries[entry['key']].append(entry)
+                self._entries[entry['prompt_key']].append(entry)
+
+    @classmethod
+    def from_env(cls) -> Optional['Cassette']:
+        """
+        从环境变量创建（CASSETTE_MODE、CASSETTE_PATH、CASSETTE_TIMING）
+
+        Returns:
+            Cassette 实例，CASSETTE_MODE 为空或 off 时返回 None
+
+        Raises:
+            ValueError: 配置无效或回放文件无法读取
+        """
+        mode = os.getenv('CASSETTE_MODE', '').strip().lower()
+        if mode in ('', 'off'):
+            return None
+        path = os.getenv('CASSETTE_PATH', '') or DEFAULT_CASSETTE
+        try:
+            return cls(path, mode, os.getenv('CASSETTE_TIMING', 'original').strip().lower())
+        except OSError as e:
+            raise ValueError(f"Cannot open cassette {path}: {e}") from e
+
+    @staticmethod
+    def load(path: str) -> List[Dict]:
+        """
+        读取 cassette 文件（录制中断导致文件末尾不完整时忽略不完整的部分）
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            录制记录列表
+        """
+        entries = []
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                pass
+        return entries
+
+    def wrap(self, client) -> CassetteClient:
+        """
+        录制模式：包装真实客户端，记录经过它的每次请求
+
+        Args:
+            client: OpenAI 客户端
+
+        Returns:
+            包装后的客户端
+        """
+        def create(**params):
+            key, prompt_key = request_keys(params)
+            entry = {'key': key, 'prompt_key': prompt_key, 'model': params.get('model'),
+                     'stream': bool(params.get('stream'))}
+            started = time.perf_counter()
+            try:
+                response = client.chat.completions.create(**params)
+            except Exception as e:
+                self._record(entry, started, error=e)
+                raise
+            if params.get('stream'):
+                return self._record_stream(entry, started, response)
+            entry['choices'] = [[choice.message.content, getattr(choice, 'finish_reason', None)]
+                                for choice in (response.choices or [])]
+            entry['usage'] = _usage(getattr(response, 'usage', None))
+            self._record(entry, started)
+            return response
+
+        return CassetteClient(create)
+
+    def _record_stream(self, entry: Dict, started: float, stream) -> Iterator:
+        """边转发流式片段边记录，流结束（或出错、被放弃）时写入"""
+        chunks = []
+        usage = None
+        error = None
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                text = _chunk_text(chunk)
+                if text:
+                    chunks.append([round(time.perf_counter() - started, 4), text])
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            entry['chunks'] = chunks
+            entry['usage'] = _usage(usage)
+            self._record(entry, started, error=error)
+
+    def _record(self, entry: Dict, started: float, error: Optional[BaseException] = None):
+        entry['latency'] = round(time.perf_counter() - started, 4)
+        if error is not None:
+            classified = classify_error(error, entry['model'] or '')
+            entry['error'] = [type(classified).__name__, classified.message,
+                              getattr(classified, 'retry_after', None)]
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            # 每条记录后刷新，程序中途退出时已录制的部分仍可读取
+            self._file.flush()
+            self.recorded += 1
+
+    def client(self) -> CassetteClient:
+        """
+        回放模式：不访问网络的客户端
+
+        Returns:
+            从 cassette 中返回响应的客户端
+        """
+        def create(**params):
+            entry = self._lookup(params)
+            if params.get('stream'):
+                return self._replay_stream(entry)
+            self._wait(entry['latency'])
+            if entry.get('error'):
+                raise self._error(entry)
+            choices = [SimpleNamespace(index=index, message=SimpleNamespace(role='assistant', content=content),
+                                       finish_reason=finish_reason)
+                       for index, (content, finish_reason) in enumerate(entry.get('choices', []))]
+            return SimpleNamespace(model=entry['model'], choices=choices, usage=_usage_object(entry.get('usage')))
+
+        return CassetteClient(create)
+
+    def _lookup(self, params: Dict) -> Dict:
+        """按完整键、再按提示词键查找录制记录"""
+        keys = request_keys(params)
+        with self._lock:
+            for key in keys:
+                queue = self._entries.get(key)
+                if queue:
+                    entry = queue.popleft()
+                    self._last[key] = entry
+                    self.replayed += 1
+                    return entry
+            for key in keys:
+                if key in self._last:
+                    self.replayed += 1
+                    return self._last[key]
+            self.missed += 1
+        raise CassetteMissError(f"No recorded response for this request in {self.path} (model {params.get('model')})",
+                                "请先用录制模式运行一次，或检查提示词是否有变化")
+
+    def _replay_stream(self, entry: Dict) -> Iterator:
+        started = time.perf_counter()
+        for offset, text in entry.get('chunks', []):
+            self._wait(offset - (time.perf_counter() - started))
+            yield SimpleNamespace(model=entry['model'], usage=None,
+                                  choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=text),
+                                                           finish_reason=None)])
+        self._wait(entry['latency'] - (time.perf_counter() - started))
+        if entry.get('error'):
+            raise self._error(entry)
+        if entry.get('usage'):
+            yield SimpleNamespace(model=entry['model'], choices=[], usage=_usage_object(entry['usage']))
+
+    def _wait(self, seconds: float):
+        if self.timing == 'original' and seconds > 0:
+            time.sleep(seconds)
+
+    @staticmethod
+    def _error(entry: Dict) -> errors.GenerationError:
+        """还原录制时的错误（按分类后的错误类型）"""
+        name, message, retry_after = entry['error']
+        cls = getattr(errors, name, None)
+        if not (isinstance(cls, type) and issubclass(cls, errors.GenerationError)):
+            cls = errors.TransientError
+        if issubclass(cls, RateLimitedError):
+            return cls(message, retry_after=retry_after)
+        if cls is errors.BudgetExceededError:
+            return errors.TransientError(message)
+        return cls(message)
+
+    def stats(self) -> Dict:
+        """
+        录制/回放统计
+
+        Returns:
+            包含 mode、path、recorded、replayed、missed 的字典
+        """
+        with self._lock:
+            return {'mode': self.mode, 'path': self.path, 'recorded': self.recorded,
+                    'replayed': self.replayed, 'missed': self.missed}
+
+    def close(self):
+        """结束录制（写入 gzip 文件尾）"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,157 @@
+"""
+自适应并发模块
+批量生成时不使用固定的并发数，而是按 AIMD（加性增、乘性减）自动调整同时进行的API请求数：
+延迟和错误率正常时每完成一轮请求加1，遇到429限流、超时或最近请求的p95延迟超过目标时减半。
+服务商的承载能力一天中会变化，没有一个固定的线程数适合每一次运行。
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 并发限制器
+
+    acquire() 在同时进行的请求数达到当前上限时阻塞，release() 报告请求结果并调整上限。
+    减小上限后，在那之前发出的请求再报告拥塞不会重复减小（它们是按旧上限发出的）。
+    """
+
+    def __init__(self, initial: int = 2, minimum: int = 1, maximum: int = 16, target_p95: float = 30.0,
+                 decrease: float = 0.5, window: int = 20):
+        """
+        Args:
+            initial: 初始上限
+            minimum: 上限的最小值
+            maximum: 上限的最大值（通常等于工作线程数）
+            target_p95: 目标p95延迟（秒），超过时减小上限
+            decrease: 减小时乘以的系数
+            window: 计算p95使用的最近请求数
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.target_p95 = target_p95
+        self.decrease = decrease
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.reason = "initial"
+        self._latencies = deque(maxlen=max(5, window))
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls, maximum: int) -> 'AdaptiveLimiter':
+        """
+        从环境变量创建（ADAPTIVE_INITIAL、ADAPTIVE_MIN、ADAPTIVE_TARGET_P95）
+
+        Args:
+            maximum: 上限的最大值
+
+        Returns:
+            AdaptiveLimiter 实例
+        """
+        return cls(
+            initial=int(os.getenv('ADAPTIVE_INITIAL', '2')),
+            minimum=int(os.getenv('ADAPTIVE_MIN', '1')),
+            maximum=maximum,
+            target_p95=float(os.getenv('ADAPTIVE_TARGET_P95', '30')),
+        )
+
+    def acquire(self) -> float:
+        """
+        占用一个并发名额（达到上限时阻塞）
+
+        Returns:
+            凭据（发出时间），传给 release()
+        """
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def p95(self) -> Optional[float]:
+        """最近请求的p95延迟（秒），样本不足时返回 None"""
+        with self._condition:
+            return self._p95()
+
+    def _p95(self) -> Optional[float]:
+        if len(self._latencies) < 5:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)]
+
+    def release(self, ticket: float, latency: Optional[float] = None, congested: str = "") -> Optional[str]:
+        """
+        释放名额并按结果调整上限
+
+        Args:
+            ticket: acquire() 返回的凭据
+            latency: 成功时的请求耗时（秒）
+            congested: 拥塞原因（如 "429 rate limited"、"timeout"），为空表示没有拥塞
+
+        Returns:
+            上限发生变化时返回说明（如 "4 → 2: 429 rate limited"），否则返回 None
+        """
+        with self._condition:
+            self.in_flight -= 1
+            old = self.limit
+            if congested:
+                if ticket >= self._last_decrease:
+                    self._cut(congested)
+            elif latency is not None:
+                self._latencies.append(latency)
+                p95 = self._p95()
+                if p95 is not None and p95 > self.target_p95:
+                    # 仍然超过目标：上次减小之后发出的请求才再减小，更早的请求既不减小也不计入成功
+                    if ticket >= self._last_decrease:
+                        self._cut(f"p95 {p95:.1f}s > target {self.target_p95:.0f}s")
+                else:
+                    # 每完成一轮（当前上限个）正常请求加1
+                    self._successes += 1
+                    if self._successes >= self.limit and self.limit < self.maximum:
+                        self.limit += 1
+                        self.increases += 1
+                        self._successes = 0
+                        self.reason = "healthy" if p95 is None else f"healthy (p95 {p95:.1f}s)"
+            self._condition.notify_all()
+            if self.limit != old:
+                return f"{old} → {self.limit}: {self.reason}"
+            return None
+
+    def _cut(self, reason: str):
+        """乘性减小上限（调用方需持有锁）"""
+        self.limit = max(self.minimum, int(self.limit * self.decrease))
+        self.decreases += 1
+        self.reason = reason
+        self._successes = 0
+        self._latencies.clear()
+        self._last_decrease = time.monotonic()
+
+    def stats(self) -> Dict:
+        """
+        当前状态
+
+        Returns:
+            包含 limit、in_flight、minimum、maximum、p95_s、target_p95_s、increases、decreases、reason 的字典
+        """
+        with self._condition:
+            p95 = self._p95()
+            return {
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'minimum': self.minimum,
+                'maximum': self.maximum,
+                'p95_s': round(p95, 3) if p95 is not None else None,
+                'target_p95_s': self.target_p95,
+                'increases': self.increases,
+                'decreases': self.decreases,
+                'reason': self.reason,
+            }
@@ -0,0 +1,192 @@
+"""
+错误类型模块
+定义文章生成过程中的分类错误，区分可重试的临时错误与应立即失败的永久错误
+"""
+
+from typing import Optional
+
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AuthenticationError,
+    BadRequestError,
+    NotFoundError,
+    PermissionDeniedError,
+    RateLimitError,
+)
+
+
+class GenerationError(Exception):
+    """文章生成错误基类"""
+
+    # 是否值得重试
+    retryable = False
+    # 是否意味着同一批次的其他请求也必然失败（应终止整个批次）
+    batch_fatal = False
+
+    def __init__(self, message: str, hint: str = "", cause: Optional[BaseException] = None):
+        """
+        Args:
+            message: 错误描述
+            hint: 给用户的排查建议
+            cause: 原始异常
+        """
+        super().__init__(message)
+        self.message = message
+        self.hint = hint
+        self.cause = cause
+
+    def __str__(self) -> str:
+        if self.hint:
+            return f"{self.message}\n\n{self.hint}"
+        return self.message
+
+
+class TransientError(GenerationError):
+    """临时错误（网络、超时、服务端5xx），可以退避后重试"""
+
+    retryable = True
+
+
+class RateLimitedError(TransientError):
+    """被服务端限流（429）"""
+
+    def __init__(self, message: str, hint: str = "", cause: Optional[BaseException] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message, hint, cause)
+        self.retry_after = retry_after
+
+
+class PermanentError(GenerationError):
+    """永久错误，重试无意义"""
+
+
+class AuthError(PermanentError):
+    """API密钥无效或无权限"""
+
+    batch_fatal = True
+
+
+class ModelError(PermanentError):
+    """模型名称错误或不可用"""
+
+    batch_fatal = True
+
+
+class InvalidRequestError(PermanentError):
+    """请求参数错误（只影响当前请求）"""
+
+
+class EmptyResponseError(TransientError):
+    """API返回了空内容"""
+
+
+class CircuitOpenError(GenerationError):
+    """断路器处于打开状态，暂停向故障端点发送请求"""
+
+    batch_fatal = True
+
+
+class DeadlineExceededError(GenerationError):
+    """单个请求的总时限（含重试）已用尽"""
+
+
+class BudgetExceededError(GenerationError):
+    """花费达到预算上限"""
+
+    def __init__(self, message: str, scope: str, hint: str = ""):
+        """
+        Args:
+            message: 错误描述
+            scope: 触发的上限类型（run, day, group）
+            hint: 给用户的提示
+        """
+        super().__init__(message, hint)
+        self.scope = scope
+        # 组上限只影响该组，其他上限终止整个批次
+        self.batch_fatal = scope != 'group'
+
+
+NETWORK_HINT = (
+    "可能的原因：\n"
+    "1. 网络连接问题 - 请检查网络连接\n"
+    "2. API服务器无法访问 - 可能需要VPN\n"
+    "3. 防火墙阻止 - 检查防火墙设置\n"
+    "\n建议：尝试使用国内可访问的API服务（如OpenRouter）"
+)
+
+AUTH_HINT = "API密钥错误，请检查.env文件中的API_KEY是否正确"
+
+
+def _retry_after(exc: APIStatusError) -> Optional[float]:
+    """从响应头中读取 Retry-After 秒数"""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def classify_error(exc: BaseException, model_name: str = "") -> GenerationError:
+    """
+    将底层异常归类为 GenerationError 子类
+
+    Args:
+        exc: 原始异常
+        model_name: 当前使用的模型名称（用于错误提示）
+
+    Returns:
+        分类后的错误对象
+    """
+    if isinstance(exc, GenerationError):
+        return exc
+
+    message = f"Error generating article: {type(exc).__name__}: {exc}"
+    model_hint = f"模型名称可能不正确，当前使用: {model_name}"
+
+    if isinstance(exc, APITimeoutError):
+        return TransientError(message, NETWORK_HINT, exc)
+    if isinstance(exc, APIConnectionError):
+        return TransientError(message, NETWORK_HINT, exc)
+    if isinstance(exc, RateLimitError):
+        return RateLimitedError(message, "请求过于频繁，已被服务端限流", exc, _retry_after(exc))
+    if isinstance(exc, (AuthenticationError, PermissionDeniedError)):
+        return AuthError(message, AUTH_HINT, exc)
+    if isinstance(exc, NotFoundError):
+        return ModelError(message, model_hint, exc)
+    if isinstance(exc, BadRequestError):
+        if "model" in str(exc).lower():
+            return ModelError(message, model_hint, exc)
+        return InvalidRequestError(message, "", exc)
+    if isinstance(exc, APIStatusError):
+        status = getattr(exc, 'status_code', 0) or 0
+        if status == 408 or status == 409 or status >= 500:
+            return TransientError(message, "API服务端暂时不可用，稍后会自动重试", exc)
+        return PermanentError(message, "", exc)
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return TransientError(message, NETWORK_HINT, exc)
+
+    return PermanentError(message, "", exc)
+
+
+def congestion_reason(exc: BaseException) -> str:
+    """
+    判断错误是否说明服务端过载（用于自适应并发控制）
+
+    Args:
+        exc: 原始异常或已分类的错误
+
+    Returns:
+        "429 rate limited"、"timeout"，不属于过载时返回空字符串
+    """
+    classified = classify_error(exc)
+    if isinstance(classified, RateLimitedError):
+        return "429 rate limited"
+    if isinstance(exc, (APITimeoutError, TimeoutError)) or "TimeoutError:" in classified.message:
+        return "timeout"
+    return ""
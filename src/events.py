@@ -0,0 +1,190 @@
+"""
+事件模块
+生成过程中的进度以带类型的事件发布到事件总线，由订阅者（命令行输出、GUI、统计、日志）各自处理。
+发布不阻塞：事件放入队列后立即返回，由一个分发线程按发布顺序依次交给订阅者，
+多个工作线程的输出不会交错，慢的订阅者也不会拖慢生成。
+"""
+
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# 事件类型
+QUEUED = 'queued'            # 任务进入批量流水线
+STARTED = 'started'          # 开始调用API
+FIRST_TOKEN = 'first_token'  # 流式响应收到第一个片段
+COMPLETED = 'completed'      # API返回了文章（批量生成时已完成评分和检查）
+FAILED = 'failed'            # 生成失败（重试之后）
+RETRIED = 'retried'          # 临时错误，即将重试
+SAVED = 'saved'              # 文章已写入文件
+SKIPPED = 'skipped'          # 上次运行已完成，跳过
+NOTICE = 'notice'            # 其他进度信息（花费、分组完成、并发调整等）
+
+KINDS = (QUEUED, STARTED, FIRST_TOKEN, COMPLETED, FAILED, RETRIED, SAVED, SKIPPED, NOTICE)
+
+
+class Event(NamedTuple):
+    """进度事件"""
+
+    kind: str
+    keyword: str = ''
+    group: str = ''
+    model: str = ''
+    # 说明文字（失败和重试的错误信息、NOTICE 的内容）
+    message: str = ''
+    # 其他字段，如 attempt、delay、elapsed、file、score、issues、candidates、n、depth
+    data: Dict = {}
+    timestamp: float = 0.0
+
+
+class EventBus:
+    """
+    事件总线
+
+    publish() 只把事件放入队列；分发线程在第一次发布时启动，订阅者抛出的异常会被打印并忽略。
+    """
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._subscribers: List[tuple] = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, handler: Callable[[Event], None], kinds: Optional[tuple] = None) -> Callable[[], None]:
+        """
+        订阅事件
+
+        Args:
+            handler: 处理函数（在分发线程中调用，GUI 需要自行转到界面线程）
+            kinds: 只接收这些类型的事件（默认全部）
+
+        Returns:
+            取消订阅的函数
+        """
+        entry = (handler, frozenset(kinds) if kinds else None)
+        with self._lock:
+            self._subscribers = self._subscribers + [entry]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [item for item in self._subscribers if item is not entry]
+
+        return unsubscribe
+
+    def publish(self, kind: str, keyword: str = '', group: Optional[str] = '', model: str = '',
+                message: str = '', **data):
+        """
+        发布事件（不阻塞）
+
+        Args:
+            kind: 事件类型
+            keyword: 主题关键词
+            group: 所属主题组
+            model: 模型名称
+            message: 说明文字
+            **data: 其他字段
+        """
+        event = Event(kind, keyword, group or '', model, message, data, time.time())
+        with self._lock:
+            if not self._subscribers:
+                return
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name='event-bus', daemon=True)
+                self._thread.start()
+        self._queue.put(event)
+
+    def _dispatch(self):
+        while True:
+            event = self._queue.get()
+            with self._lock:
+                subscribers = self._subscribers
+            for handler, kinds in subscribers:
+                if kinds is not None and event.kind not in kinds:
+                    continue
+                try:
+                    handler(event)
+                except Exception as e:
+                    print(f"⚠️  Event handler failed: {type(e).__name__}: {e}", file=sys.stderr)
+            with self._lock:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        等待已发布的事件分发完毕（如批量生成结束、打印汇总之前）
+
+        Args:
+            timeout: 最长等待秒数
+
+        Returns:
+            是否已全部分发
+        """
+        if threading.current_thread() is self._thread:
+            return self._pending <= 1
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+
+class ConsoleRenderer:
+    """把事件打印为命令行进度信息"""
+
+    def __init__(self, stream=None, max_retries: int = 3):
+        """
+        Args:
+            stream: 输出流（默认为打印时的标准输出，跟随 contextlib.redirect_stdout）
+            max_retries: 重试次数上限（用于显示 "Retry 1/3"）
+        """
+        self.stream = stream
+        self.max_retries = max_retries
+
+    def __call__(self, event: Event):
+        line = self.format(event)
+        if line is not None:
+            # 整行一次写入，不会与其他线程的输出交错
+            stream = self.stream or sys.stdout
+            stream.write(line + "\n")
+            stream.flush()
+
+    def format(self, event: Event) -> Optional[str]:
+        """
+        事件对应的输出文字
+
+        Args:
+            event: 事件
+
+        Returns:
+            要打印的文字，不需要输出时返回 None
+        """
+        data = event.data
+        indent = '  ' * data.get('depth', 0)
+        if event.kind == STARTED:
+            n = data.get('n', 1)
+            line = f"  → Calling API: {event.model}" + (f" (n={n})" if n > 1 else "")
+            if data.get('batch'):
+                kind = 'subtopic ' if data.get('depth', 0) > 0 else ''
+                line = f"\n{indent}Generating {kind}article for: {event.keyword}\n{line}"
+            return line
+        if event.kind == RETRIED:
+            return f"  ↻ Retry {data['attempt']}/{self.max_retries} in {data['delay']:.1f}s: {event.message}"
+        if event.kind == FAILED:
+            return f"  ❌ {event.message}"
+        if event.kind == COMPLETED:
+            lines = []
+            if data.get('candidates', 1) > 1:
+                lines.append(f"  ★ Picked best of {data['candidates']} candidates (score {data['score']:.2f})")
+            if data.get('issues'):
+                lines.append(f"{indent}⚠️  Issues in {event.keyword}: {'; '.join(data['issues'])}")
+            return '\n'.join(lines) or None
+        if event.kind == SAVED:
+            return f"{indent}✓ Saved to: {data['file']}"
+        if event.kind == SKIPPED:
+            return f"{indent}↷ Skipped (done in previous run): {data['filename']}"
+        if event.kind == NOTICE:
+            return event.message
+        return None
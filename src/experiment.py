@@ -0,0 +1,295 @@
+"""
+提示词实验模块
+在一组抽样主题上并发运行几个提示词变体（见 prompts.PROMPT_VARIANTS），统计每个变体的输入/输出token数、
+延迟、首token时间、格式检查通过率、评分和词汇指标，用于判断模板能精简到多小而不影响质量（experiment 子命令）。
+
+每次试验的结果（文章、用量和耗时）按请求内容缓存在 output/.experiments 中，
+增加变体、主题或重复次数后再次运行只请求缺少的部分；缓存命中的试验沿用首次运行时测得的耗时。
+"""
+
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence
+
+from . import events
+from .analyzer import analyze_articles
+from .benchmark import percentile
+from .cache import ArticleCache
+from .errors import EmptyResponseError, GenerationError, classify_error
+from .prompts import PROMPT_VARIANTS, build_messages
+from .scoring import score_article, validate_article
+from .storage import normalize_article
+from .tokens import count_tokens, expected_output_tokens, prompt_tokens
+
+DEFAULT_CACHE_DIR = os.path.join('output', '.experiments')
+# 实验结果不过期（请求内容或参数变化时指纹自然不同）
+CACHE_TTL = 10 * 365 * 24 * 3600
+
+
+def sample_tasks(tasks: List[Dict], size: int, seed: int = 0) -> List[Dict]:
+    """
+    按主题和子主题的比例抽取任务（同一 seed 每次抽到相同的任务）
+
+    Args:
+        tasks: 任务列表（格式见 ArticleGenerator.build_tasks）
+        size: 抽取数量（不超过任务总数）
+        seed: 随机种子
+
+    Returns:
+        抽取的任务（保持原顺序）
+    """
+    if size >= len(tasks):
+        return list(tasks)
+    rng = random.Random(seed)
+    main = [index for index, task in enumerate(tasks) if not task['is_subtopic']]
+    sub = [index for index, task in enumerate(tasks) if task['is_subtopic']]
+    main_size = min(len(main), max(1 if main else 0, round(size * len(main) / len(tasks))))
+    chosen = rng.sample(main, main_size) + rng.sample(sub, min(len(sub), size - main_size))
+    return [tasks[index] for index in sorted(chosen)]
+
+
+def messages_tokens(messages: List[Dict[str, str]]) -> int:
+    """本地估算一组消息的输入token数"""
+    return sum(prompt_tokens(message['content']) for message in messages)
+
+
+def trial_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, repeat: int) -> str:
+    """
+    试验的缓存指纹
+
+    Args:
+        model: 模型名称
+        messages: 请求消息
+        temperature: 温度
+        max_tokens: 最大token数
+        repeat: 第几次重复（同一请求的多次重复分别缓存）
+
+    Returns:
+        十六进制指纹字符串
+    """
+    payload = json.dumps({'model': model, 'messages': messages, 'temperature': temperature,
+                          'max_tokens': max_tokens, 'repeat': repeat,
+                          # 请求流式用量之前缓存的试验只有本地估算，不再复用
+                          'stream_usage': True}, sort_keys=True, ensure_ascii=False)
+    return 'exp-' + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:40]
+
+
+def request_trial(generator, messages: List[Dict[str, str]], model: str, settings, keyword: str = '') -> Dict:
+    """
+    发送一次流式请求（经过生成器的限流、重试、断路器和预算统计）
+
+    Args:
+        generator: ArticleGenerator 实例
+        messages: 请求消息
+        model: 模型名称
+        settings: 配置快照
+        keyword: 主题关键词（用于进度事件）
+
+    Returns:
+        包含 article、latency、ttft、input_tokens、output_tokens、usage（api 或 estimate）的字典
+
+    Raises:
+        GenerationError: 请求失败
+    """
+    client = generator._client_for(settings)
+    reserved = messages_tokens(messages) + expected_output_tokens(settings.article_length, settings.max_tokens)
+
+    def attempt(timeout: float) -> Dict:
+        generator.rate_limiter.acquire(reserved)
+        started = time.perf_counter()
+        first = None
+        parts = []
+        usage = None
+        try:
+            stream = client.chat.completions.create(model=model, messages=messages,
+                                                    temperature=settings.temperature,
+                                                    max_tokens=settings.max_tokens,
+                                                    timeout=timeout, stream=True,
+                                                    # 流式响应默认不带用量，要求在最后一个片段中返回
+                                                    stream_options={'include_usage': True})
+            for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                choices = getattr(chunk, 'choices', None)
+                text = getattr(getattr(choices[0], 'delta', None), 'content', None) if choices else None
+                if text:
+                    if first is None:
+                        first = time.perf_counter()
+                    parts.append(text)
+        except Exception as e:
+            generator.rate_limiter.adjust(reserved, messages_tokens(messages))
+            raise classify_error(e, model) from e
+        article = ''.join(parts)
+        result = {
+            'article': article,
+            'latency': round(time.perf_counter() - started, 3),
+            'ttft': round(first - started, 3) if first is not None else None,
+            'input_tokens': getattr(usage, 'prompt_tokens', 0) or messages_tokens(messages),
+            'output_tokens': getattr(usage, 'completion_tokens', 0) or count_tokens(article),
+            'usage': 'api' if usage is not None else 'estimate',
+        }
+        generator.rate_limiter.adjust(reserved, result['input_tokens'] + result['output_tokens'])
+        if not article.strip():
+            raise EmptyResponseError("Error generating article: API returned empty content")
+        return result
+
+    def on_retry(attempt_number: int, delay: float, error: GenerationError):
+        generator.events.publish(events.RETRIED, keyword, None, model, error.message,
+                                 attempt=attempt_number, delay=delay, error=type(error).__name__)
+
+    generator.budget.before_request(model)
+    result = generator.retry_policy.call(attempt, generator.circuit_breaker, model, on_retry)
+    generator.budget.record(model, SimpleNamespace(prompt_tokens=result['input_tokens'],
+                                                   completion_tokens=result['output_tokens']))
+    return result
+
+
+def evaluate_article(article: str, article_length: int) -> Dict:
+    """
+    检查和评分一篇文章
+
+    Args:
+        article: 文章内容
+        article_length: 目标字数
+
+    Returns:
+        包含 passed、issues、score、words、cet6_types、transitions、root_ttr、cet6_coverage、regenerate 的字典
+    """
+    article = normalize_article(article)
+    issues = validate_article(article)
+    score = score_article(article, article_length)
+    report = analyze_articles([article])[0] if article else None
+    return {
+        'passed': not issues,
+        'issues': issues,
+        'score': score['score'],
+        'words': score['word_count'],
+        'cet6_types': report['cet6_types'] if report else 0,
+        'transitions': report['transitions'] if report else 0,
+        'root_ttr': report['root_ttr'] if report else 0.0,
+        'cet6_coverage': report['coverage'].get('cet6', 0.0) if report else 0.0,
+        'regenerate': bool(report['regenerate']) if report else True,
+    }
+
+
+def run_experiment(generator, tasks: List[Dict], variants: Sequence[str] = PROMPT_VARIANTS, repeats: int = 1,
+                   concurrency: int = 4, cache: Optional[ArticleCache] = None,
+                   on_trial: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """
+    在每个任务上运行每个变体 repeats 次
+
+    Args:
+        generator: ArticleGenerator 实例（使用其客户端、配置、限流器、重试策略和预算）
+        tasks: 任务列表（格式见 ArticleGenerator.build_tasks）
+        variants: 变体名称
+        repeats: 每个任务和变体的重复次数
+        concurrency: 并发请求数
+        cache: 试验结果缓存（None 表示不使用缓存）
+        on_trial: 每次试验完成时的回调（在工作线程中调用）
+
+    Returns:
+        试验结果列表，每项包含 variant、keyword、repeat、ok、cached、input_tokens、prompt_tokens（本地估算）、
+        output_tokens、usage（用量来源：api 或 estimate）、latency、ttft 和 evaluate_article 的各字段；
+        失败时包含 error 和 message
+    """
+    settings = generator.settings
+    model = settings.model_name
+    trials = [(variant, task, repeat) for task in tasks for variant in variants for repeat in range(repeats)]
+
+    def run(trial) -> Dict:
+        variant, task, repeat = trial
+        messages = build_messages(variant, task['keyword'], task['description'], task['is_subtopic'],
+                                  task['main_keyword'], settings.article_length)
+        result = {'variant': variant, 'keyword': task['keyword'], 'repeat': repeat,
+                  'prompt_tokens': messages_tokens(messages), 'cached': False}
+        key = trial_key(model, messages, settings.temperature, settings.max_tokens, repeat)
+        entry = cache.get(key) if cache else None
+        if entry:
+            response = {name: entry[name] for name in ('latency', 'ttft', 'input_tokens', 'output_tokens', 'usage')}
+            response['article'] = entry['article']
+            result['cached'] = True
+        else:
+            try:
+                response = request_trial(generator, messages, model, settings, task['keyword'])
+            except GenerationError as e:
+                result.update(ok=False, error=type(e).__name__, message=e.message)
+                if on_trial:
+                    on_trial(result)
+                return result
+            if cache:
+                cache.put(key, task['keyword'], response['article'], variant=variant,
+                          **{name: response[name] for name in ('latency', 'ttft', 'input_tokens',
+                                                               'output_tokens', 'usage')})
+        result['ok'] = True
+        result.update({name: response[name] for name in ('input_tokens', 'output_tokens', 'usage', 'latency', 'ttft')})
+        result.update(evaluate_article(response['article'], settings.article_length))
+        if on_trial:
+            on_trial(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return list(executor.map(run, trials))
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def _usage_source(trials: List[Dict]) -> Optional[str]:
+    sources = {trial.get('usage', 'estimate') for trial in trials}
+    if not sources:
+        return None
+    return sources.pop() if len(sources) == 1 else 'mixed'
+
+
+def summarize_variants(trials: List[Dict], variants: Sequence[str] = PROMPT_VARIANTS) -> List[Dict]:
+    """
+    按变体汇总试验结果
+
+    Args:
+        trials: run_experiment 的返回值
+        variants: 变体顺序
+
+    Returns:
+        每个变体一项，包含 variant、trials、ok、cached、input_tokens、output_tokens（平均）、
+        usage（用量来源：api、estimate 或 mixed，没有成功的试验时为 None）、
+        latency_p50、latency_p95、ttft_p50、pass_rate、score、cet6_types、transitions、cet6_coverage、
+        regenerate_rate 以及相对第一个变体的 input_change（输入token变化比例）
+    """
+    rows = []
+    for variant in variants:
+        group = [trial for trial in trials if trial['variant'] == variant]
+        ok = [trial for trial in group if trial['ok']]
+        row = {
+            'variant': variant,
+            'trials': len(group),
+            'ok': len(ok),
+            'cached': sum(1 for trial in group if trial['cached']),
+            'prompt_tokens': _mean([trial['prompt_tokens'] for trial in group]),
+            'input_tokens': _mean([trial['input_tokens'] for trial in ok]),
+            'output_tokens': _mean([trial['output_tokens'] for trial in ok]),
+            'usage': _usage_source(ok),
+            'latency_p50': percentile([trial['latency'] for trial in ok], 50),
+            'latency_p95': percentile([trial['latency'] for trial in ok], 95),
+            'ttft_p50': percentile([trial['ttft'] for trial in ok if trial['ttft'] is not None], 50),
+            'pass_rate': _mean([1.0 if trial['passed'] else 0.0 for trial in ok]),
+            'score': _mean([trial['score'] for trial in ok]),
+            'cet6_types': _mean([trial['cet6_types'] for trial in ok]),
+            'transitions': _mean([trial['transitions'] for trial in ok]),
+            'cet6_coverage': _mean([trial['cet6_coverage'] for trial in ok]),
+            'regenerate_rate': _mean([1.0 if trial['regenerate'] else 0.0 for trial in ok]),
+        }
+        for name, value in row.items():
+            if isinstance(value, float):
+                row[name] = round(value, 4)
+        rows.append(row)
+
+    baseline = rows[0]['input_tokens'] if rows else None
+    for row in rows:
+        row['input_change'] = round(row['input_tokens'] / baseline - 1, 4) \
+            if baseline and row['input_tokens'] is not None else None
+    return rows
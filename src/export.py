@@ -0,0 +1,481 @@
+"""
+导出模块
+将已生成的文章导出为课堂讲义：合并的 Markdown 文件、按组的 DOCX 文件和可打印的 PDF 文件，
+每组附目录（分组来自 config/topics.json）
+
+文章的读取和排版在进程池中进行，主进程只按顺序写出结果，同时在途的文章数有上限，
+导出上千篇文章时不会一次性把整个语料读入内存。
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .generator import ArticleGenerator
+from .history import scan_articles
+from .pipeline import process_context
+from .storage import read_article
+
+FORMATS = ('md', 'docx', 'pdf')
+OTHER_GROUP = 'Other Articles'
+
+# PDF 版式（单位：pt，A4）
+PAGE_WIDTH, PAGE_HEIGHT = 595.27, 841.89
+MARGIN = 56
+FOOTER = 24
+PDF_STYLES = {
+    # 类型: (字体, 字号, 行高)
+    'title': ('Times-Bold', 16, 24),
+    'topic': ('Times-Italic', 10, 18),
+    'body': ('Times-Roman', 11, 15),
+    'blank': ('Times-Roman', 11, 8),
+    'heading': ('Times-Bold', 18, 30),
+    'toc': ('Times-Roman', 11, 17),
+}
+# 每个 DOCX 文件最多包含的文章数（超过时按卷拆分，限制单个工作进程的内存并让大组也能并行）
+DOCX_VOLUME_SIZE = 500
+# 非拉丁字符（如中文分组名）使用 reportlab 内置的 CID 字体
+CJK_FONT = 'STSong-Light'
+
+
+def collect_groups(output_dir: str = "output", topics_path: Optional[str] = "config/topics.json",
+                   results: Optional[Dict[str, List[str]]] = None) -> List[Dict]:
+    """
+    确定要导出的文章及其分组
+
+    Args:
+        output_dir: 文章目录
+        topics_path: 主题配置文件（用于分组名称和文章顺序，不存在时所有文章归入同一组）
+        results: generate_all_articles 的返回值 {分组: [文件名]}（提供时只导出这些文章）
+
+    Returns:
+        分组列表，每项包含 key、name、files（相对于 output_dir 的路径，按主题配置中的顺序）
+    """
+    names: Dict[str, str] = {}
+    tasks: List[Dict] = []
+    if topics_path and os.path.exists(topics_path):
+        topics = ArticleGenerator.load_topics(topics_path)
+        names = {key: data.get('name', key) for key, data in topics.items()}
+        tasks = ArticleGenerator.build_tasks(topics)
+
+    if results is not None:
+        found = {path for files in results.values() for path in files}
+    else:
+        found = set(scan_articles(output_dir))
+
+    # 按主题配置中的顺序排列（并发生成时 results 中的顺序是完成顺序）
+    grouped: Dict[str, List[str]] = {key: [] for key in names}
+    known = set()
+    for task in tasks:
+        known.add(task['filename'])
+        if task['filename'] in found:
+            grouped[task['group']].append(task['filename'])
+
+    # 不在主题配置中的文章（如 --stdin 生成的）放在最后
+    if results is not None:
+        for key, files in results.items():
+            grouped.setdefault(key, []).extend(path for path in files if path not in known)
+    else:
+        grouped.setdefault('', []).extend(sorted(path for path in found if path not in known))
+
+    return [{'key': key, 'name': names.get(key) or key or OTHER_GROUP, 'files': files}
+            for key, files in grouped.items() if files]
+
+
+def bounded_map(executor: Executor, func: Callable, items: Iterable, window: int) -> Iterator:
+    """
+    按顺序返回 func(item) 的结果，同时提交的任务不超过 window 个
+
+    与 executor.map 不同，不会一次性提交全部任务，结果也不会在内存中堆积。
+
+    Args:
+        executor: 线程池或进程池
+        func: 可被 pickle 的模块级函数
+        items: 参数序列
+        window: 最多同时提交的任务数
+
+    Yields:
+        结果
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _read(path: str) -> Dict[str, str]:
+    """读取文章，标题为空时使用主题"""
+    article = read_article(path)
+    article['title'] = article['title'] or article['topic'] or os.path.basename(path)
+    return article
+
+
+# ---------- Markdown ----------
+
+def render_markdown_article(item) -> Dict:
+    """
+    渲染一篇文章的 Markdown（在工作进程中运行）
+
+    Args:
+        item: (文件路径, 锚点)
+
+    Returns:
+        包含 title 和 text 的字典
+    """
+    path, anchor = item
+    article = _read(path)
+    text = f'<a id="{anchor}"></a>\n\n### {article["title"]}\n\n'
+    if article['topic']:
+        text += f"*Topic: {article['topic']}*\n\n"
+    text += article['body'].strip() + "\n\n---\n\n"
+    return {'title': article['title'], 'text': text}
+
+
+def export_markdown(groups: List[Dict], output_dir: str, out_path: str,
+                    executor: Executor, window: int, title: str = "Article Collection") -> str:
+    """
+    导出为一个合并的 Markdown 文件（每组开头有目录）
+
+    每组的正文先写入临时文件，同时收集目录；一组结束后依次写出分组标题、目录和正文。
+
+    Args:
+        groups: collect_groups 返回的分组
+        output_dir: 文章目录
+        out_path: 输出文件路径
+        executor: 进程池
+        window: 同时处理的文章数上限
+        title: 文档标题
+
+    Returns:
+        输出文件路径
+    """
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    tmp_path = out_path + '.tmp'
+    counter = 0
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write(f"# {title}\n\n")
+        out.write("".join(f"- [{group['name']}](#group-{index})\n" for index, group in enumerate(groups, 1)))
+        out.write("\n")
+
+        for group_index, group in enumerate(groups, 1):
+            items = []
+            for path in group['files']:
+                counter += 1
+                items.append((os.path.join(output_dir, path), f"article-{counter}"))
+
+            toc = []
+            with tempfile.TemporaryFile('w+', encoding='utf-8') as body:
+                for (_, anchor), rendered in zip(items, bounded_map(executor, render_markdown_article, items, window)):
+                    toc.append(f"{len(toc) + 1}. [{rendered['title']}](#{anchor})\n")
+                    body.write(rendered['text'])
+
+                out.write(f'<a id="group-{group_index}"></a>\n\n## {group["name"]}\n\n')
+                out.write("".join(toc))
+                out.write("\n")
+                body.seek(0)
+                shutil.copyfileobj(body, out)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+# ---------- DOCX ----------
+
+def render_docx_group(item) -> str:
+    """
+    把一组文章写成一个 DOCX 文件（在工作进程中运行，每个进程只持有一组文章）
+
+    Args:
+        item: (分组, 文章目录, 输出文件路径)
+
+    Returns:
+        输出文件路径
+    """
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+
+    group, output_dir, out_path = item
+    document = Document()
+    document.add_heading(group['name'], level=0)
+    if group.get('volume'):
+        document.add_paragraph(f"Volume {group['volume']}")
+
+    # 先读取标题生成目录（只保留标题，正文在下面逐篇读取）
+    paths = [os.path.join(output_dir, path) for path in group['files']]
+    document.add_heading("Contents", level=1)
+    for path in paths:
+        document.add_paragraph(_read(path)['title'], style='List Number')
+
+    for path in paths:
+        article = _read(path)
+        document.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+        document.add_heading(article['title'], level=1)
+        if article['topic']:
+            document.add_paragraph().add_run(f"Topic: {article['topic']}").italic = True
+        for paragraph in article['body'].split('\n\n'):
+            if paragraph.strip():
+                document.add_paragraph(' '.join(paragraph.split()))
+
+    tmp_path = out_path + '.tmp'
+    document.save(tmp_path)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def export_docx(groups: List[Dict], output_dir: str, out_dir: str, executor: Executor) -> List[str]:
+    """
+    每组导出一个 DOCX 文件（超过 DOCX_VOLUME_SIZE 篇的组拆分为多卷）
+
+    Args:
+        groups: collect_groups 返回的分组
+        output_dir: 文章目录
+        out_dir: 输出目录
+        executor: 进程池
+
+    Returns:
+        输出文件路径列表
+    """
+    import docx  # noqa: F401  提前检查依赖，未安装时抛出 ImportError
+
+    os.makedirs(out_dir, exist_ok=True)
+    items = []
+    for index, group in enumerate(groups, 1):
+        name = f"{index:02d}_{group['key'] or 'other'}"
+        files = group['files']
+        if len(files) <= DOCX_VOLUME_SIZE:
+            items.append((group, output_dir, os.path.join(out_dir, f"{name}.docx")))
+            continue
+        for volume, start in enumerate(range(0, len(files), DOCX_VOLUME_SIZE), 1):
+            part = {**group, 'files': files[start:start + DOCX_VOLUME_SIZE], 'volume': volume}
+            items.append((part, output_dir, os.path.join(out_dir, f"{name}_vol{volume}.docx")))
+    return list(executor.map(render_docx_group, items))
+
+
+# ---------- PDF ----------
+
+def _register_fonts():
+    """注册中文 CID 字体（每个进程只需注册一次）"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+    if CJK_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(CJK_FONT))
+
+
+def _font(kind: str, text: str) -> str:
+    """按文字内容选择字体"""
+    if any(ord(char) > 255 for char in text):
+        return CJK_FONT
+    return PDF_STYLES[kind][0]
+
+
+def _wrap(kind: str, text: str, width: float) -> List[str]:
+    from reportlab.lib.utils import simpleSplit
+
+    return simpleSplit(text, _font(kind, text), PDF_STYLES[kind][1], width) or ['']
+
+
+def layout_pdf_article(path: str) -> Dict:
+    """
+    对一篇文章排版并分页（在工作进程中运行）
+
+    Args:
+        path: 文章文件路径
+
+    Returns:
+        包含 title 和 pages（每页为 [(类型, 文字)] 列表）的字典
+    """
+    _register_fonts()
+    article = _read(path)
+    width = PAGE_WIDTH - 2 * MARGIN
+    lines = [('title', line) for line in _wrap('title', article['title'], width)]
+    if article['topic']:
+        lines.append(('topic', f"Topic: {article['topic']}"))
+    for paragraph in article['body'].split('\n\n'):
+        if paragraph.strip():
+            lines.append(('blank', ''))
+            lines += [('body', line) for line in _wrap('body', ' '.join(paragraph.split()), width)]
+
+    available = PAGE_HEIGHT - 2 * MARGIN - FOOTER
+    pages, page, used = [], [], 0.0
+    for kind, text in lines:
+        height = PDF_STYLES[kind][2]
+        if page and used + height > available:
+            pages.append(page)
+            page, used = [], 0.0
+            if kind == 'blank':
+                continue
+        page.append((kind, text))
+        used += height
+    if page:
+        pages.append(page)
+    return {'title': article['title'], 'pages': pages}
+
+
+def count_pdf_pages(path: str) -> int:
+    """文章排版后的页数（第一遍计算目录页码用）"""
+    return len(layout_pdf_article(path)['pages'])
+
+
+def _toc_lines_per_page() -> int:
+    first = PAGE_HEIGHT - 2 * MARGIN - FOOTER - PDF_STYLES['heading'][2] - PDF_STYLES['blank'][2]
+    return max(1, int(first // PDF_STYLES['toc'][2]))
+
+
+def export_pdf(groups: List[Dict], output_dir: str, out_path: str, executor: Executor, window: int,
+               title: str = "Article Collection") -> str:
+    """
+    导出为一个可打印的 PDF 文件（每组先有一页目录，书签按分组和文章分两级）
+
+    分两遍进行：第一遍在进程池中计算每篇文章的页数以确定目录页码，
+    第二遍在进程池中排版、主进程按顺序绘制，每次只持有 window 篇文章的排版结果。
+
+    Args:
+        groups: collect_groups 返回的分组
+        output_dir: 文章目录
+        out_path: 输出文件路径
+        executor: 进程池
+        window: 同时处理的文章数上限
+        title: 文档标题
+
+    Returns:
+        输出文件路径
+    """
+    from reportlab.pdfgen import canvas
+
+    _register_fonts()
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+
+    # 第一遍：页数 -> 每篇文章的起始页码
+    toc_per_page = _toc_lines_per_page()
+    plan = []
+    page_number = 1
+    for group in groups:
+        paths = [os.path.join(output_dir, path) for path in group['files']]
+        toc_pages = math.ceil(len(paths) / toc_per_page)
+        starts = []
+        page_number += toc_pages
+        for count in bounded_map(executor, count_pdf_pages, paths, window):
+            starts.append(page_number)
+            page_number += count
+        plan.append((group, paths, toc_pages, starts))
+
+    tmp_path = out_path + '.tmp'
+    pdf = canvas.Canvas(tmp_path, pagesize=(PAGE_WIDTH, PAGE_HEIGHT))
+    pdf.setTitle(title)
+    width = PAGE_WIDTH - 2 * MARGIN
+
+    def footer(number: int):
+        pdf.setFont(PDF_STYLES['body'][0], 9)
+        pdf.drawCentredString(PAGE_WIDTH / 2, MARGIN / 2, str(number))
+
+    def draw(kind: str, text: str, y: float) -> float:
+        font, size, leading = PDF_STYLES[kind]
+        pdf.setFont(_font(kind, text), size)
+        pdf.drawString(MARGIN, y - size, text)
+        return y - leading
+
+    current = 1
+    article_number = 0
+    for group_index, (group, paths, toc_pages, starts) in enumerate(plan):
+        # 目录页（指向文章的链接目标在后面定义，reportlab 允许向后引用）
+        group_key = f"group-{group_index}"
+        pdf.bookmarkPage(group_key)
+        pdf.addOutlineEntry(group['name'], group_key, level=0)
+        titles = bounded_map(executor, _read_title, paths, window)
+        for toc_page in range(toc_pages):
+            y = PAGE_HEIGHT - MARGIN
+            if toc_page == 0:
+                y = draw('heading', group['name'], y) - PDF_STYLES['blank'][2]
+            for offset in range(toc_page * toc_per_page, min(len(paths), (toc_page + 1) * toc_per_page)):
+                label = _wrap('toc', f"{offset + 1}. {next(titles)}", width - 40)[0]
+                key = f"article-{article_number + offset + 1}"
+                font, size, leading = PDF_STYLES['toc']
+                pdf.setFont(_font('toc', label), size)
+                pdf.drawString(MARGIN, y - size, label)
+                pdf.drawRightString(PAGE_WIDTH - MARGIN, y - size, str(starts[offset]))
+                pdf.linkRect("", key, (MARGIN, y - leading, PAGE_WIDTH - MARGIN, y))
+                y -= leading
+            footer(current)
+            pdf.showPage()
+            current += 1
+
+        # 文章页
+        for layout in bounded_map(executor, layout_pdf_article, paths, window):
+            article_number += 1
+            key = f"article-{article_number}"
+            pdf.bookmarkPage(key)
+            pdf.addOutlineEntry(layout['title'], key, level=1)
+            for page in layout['pages']:
+                y = PAGE_HEIGHT - MARGIN
+                for kind, text in page:
+                    y = draw(kind, text, y)
+                footer(current)
+                pdf.showPage()
+                current += 1
+
+    pdf.save()
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _read_title(path: str) -> str:
+    """读取文章标题（在工作进程中运行）"""
+    return _read(path)['title']
+
+
+def export_corpus(formats: Iterable[str], output_dir: str = "output", out_dir: Optional[str] = None,
+                  topics_path: Optional[str] = "config/topics.json",
+                  results: Optional[Dict[str, List[str]]] = None,
+                  workers: Optional[int] = None, title: str = "Article Collection") -> Dict[str, List[str]]:
+    """
+    导出文章
+
+    Args:
+        formats: 导出格式（md、docx、pdf）
+        output_dir: 文章目录
+        out_dir: 导出目录（默认 output_dir/export）
+        topics_path: 主题配置文件（用于分组和目录）
+        results: generate_all_articles 的返回值（提供时只导出本次生成的文章）
+        workers: 工作进程数（默认CPU核数）
+        title: 文档标题
+
+    Returns:
+        {格式: [输出文件路径]}，缺少依赖而跳过的格式对应空列表
+
+    Raises:
+        ValueError: 不支持的导出格式
+    """
+    formats = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unsupported export format(s): {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+
+    out_dir = out_dir or os.path.join(output_dir, 'export')
+    groups = collect_groups(output_dir, topics_path, results)
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    files: Dict[str, List[str]] = {}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=process_context()) as executor:
+        for fmt in formats:
+            try:
+                if fmt == 'md':
+                    files[fmt] = [export_markdown(groups, output_dir, os.path.join(out_dir, 'articles.md'),
+                                                  executor, window, title)]
+                elif fmt == 'docx':
+                    files[fmt] = export_docx(groups, output_dir, out_dir, executor)
+                elif fmt == 'pdf':
+                    files[fmt] = [export_pdf(groups, output_dir, os.path.join(out_dir, 'articles.pdf'),
+                                             executor, window, title)]
+            except ImportError as e:
+                package = {'docx': 'python-docx', 'pdf': 'reportlab'}.get(fmt, e.name)
+                print(f"⚠️  Skipping {fmt.upper()} export: {package} is not installed (pip install {package})")
+                files[fmt] = []
+    return files
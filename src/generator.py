@@ -7,42 +7,371 @@ import os
 import json
 import time
 import re
-from typing import Dict, List, Optional
+import threading
+import hashlib
+import contextlib
+import itertools
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 from openai import OpenAI
 from dotenv import load_dotenv
-from .prompts import generate_prompt, generate_subtopic_prompt
+from .prompts import PROMPT_TEMPLATE_VERSION, generate_prompt, generate_subtopic_prompt
+from .errors import BudgetExceededError, EmptyResponseError, GenerationError, classify_error, congestion_reason
+from .resilience import CircuitBreaker, RetryPolicy
+from .budget import BudgetManager
+from .ratelimit import RateLimiter
+from .router import ModelRouter
+from .cassette import Cassette
+from .storage import safe_name, save_article
+from .scoring import SignatureIndex, postprocess_article, score_article, validate_article
+from .pipeline import Pipeline, process_context
+from .scheduler import group_sizes, order_tasks
+from .concurrency import AdaptiveLimiter
+from . import events
+from .events import ConsoleRenderer, EventBus
+from .metrics import Metrics
+from .tokens import count_tokens, expected_output_tokens, prompt_tokens
+from .profiling import NULL_PROFILER
+from .settings import ENV_NAMES, Settings, SettingsManager
+from .search import index_saved, open_index
+from .manifest import Manifest, describe_changes, fingerprint, topics_key
+
+
+def _chunk_text(chunk) -> str:
+    """取出流式响应片段中的文本"""
+    choices = getattr(chunk, 'choices', None)
+    if not choices:
+        return ""
+    delta = getattr(choices[0], 'delta', None)
+    return getattr(delta, 'content', None) or ""
+
+
+def _usage_tokens(usage) -> int:
+    """响应用量中的总token数（输入 + 输出）"""
+    return (getattr(usage, 'prompt_tokens', 0) or 0) + (getattr(usage, 'completion_tokens', 0) or 0)
+
+
+def _setting(name: str) -> property:
+    """当前配置快照中某一项的属性（赋值时替换快照）"""
+    return property(lambda self: getattr(self.settings, name),
+                    lambda self, value: self.settings_manager.update(**{name: value}))
 
 
 class ArticleGenerator:
     """文章生成器类"""
 
-    def __init__(self):
-        """初始化生成器，加载配置"""
+    def __init__(self, output_dir: str = "output"):
+        """
+        初始化生成器，加载配置
+
+        Args:
+            output_dir: 输出目录（每日花费账本保存在其中）
+        """
         # 从 config/.env 文件加载环境变量
         env_path = os.path.join('config', '.env')
         load_dotenv(dotenv_path=env_path)
 
-        self.api_key = os.getenv('API_KEY')
-        self.api_base_url = os.getenv('API_BASE_URL', 'https://api.openai.com/v1')
-        self.model_name = os.getenv('MODEL_NAME', 'gpt-4o-mini')
-        self.article_length = int(os.getenv('ARTICLE_LENGTH', '200'))
-        self.temperature = float(os.getenv('TEMPERATURE', '0.7'))
-        self.max_tokens = int(os.getenv('MAX_TOKENS', '400'))
-
-        if not self.api_key:
-            raise ValueError("API_KEY not found in config/.env file")
-
-        # 初始化OpenAI客户端
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.api_base_url,
-            timeout=60.0,  # 设置60秒超时
-            max_retries=2  # 最多重试2次
+        # 生成相关配置（不可变快照，修改时整体替换，见 settings.py）
+        self.settings_manager = SettingsManager(env_path)
+        self.settings_manager.subscribe(self._on_settings_changed)
+
+        # 重试与断路器配置
+        self.retry_policy = RetryPolicy(
+            max_retries=int(os.getenv('MAX_RETRIES', '3')),
+            base_delay=float(os.getenv('RETRY_BASE_DELAY', '1.0')),
+            max_delay=float(os.getenv('RETRY_MAX_DELAY', '30')),
+            deadline=float(os.getenv('REQUEST_DEADLINE', '180')),
+            attempt_timeout=60.0  # 单次请求60秒超时
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('CIRCUIT_RESET_TIMEOUT', '60'))
+        )
+
+        # 预算管理（花费上限、限速、降级）
+        self.budget = BudgetManager.from_env(ledger_dir=output_dir)
+
+        # 请求限流（所有线程共享，替代固定的 sleep）
+        self.rate_limiter = RateLimiter.from_env()
+
+        # 分层模型池路由（没有 config/models.json 时为 None，所有请求使用 MODEL_NAME）
+        self.router = ModelRouter.from_env()
+
+        # 最近生成的文章（用于候选文章的差异度评分）和未被选中的候选文章
+        self._recent_articles = deque(maxlen=20)
+        self.alternates: Dict[str, List[str]] = {}
+        self._articles_lock = threading.Lock()
+
+        # 本次批量运行中失败的任务与结束状态（completed, paused, aborted）
+        self.last_run_failures: List[Dict] = []
+        self.last_run_status = 'idle'
+        self.last_run_changes: Optional[Dict] = None
+
+        # 批量生成的后处理进程数（0 表示在线程中处理）和最近一次运行的各阶段统计
+        self.postprocess_workers = int(os.getenv('POSTPROCESS_WORKERS', str(min(4, os.cpu_count() or 1))))
+        self.last_pipeline_stats: List[Dict] = []
+
+        # 批量任务的顺序（scheduled 按 scheduler.py 的策略排序，file 按主题配置中的顺序）和最近一次运行中各组的完成时间
+        self.task_order = os.getenv('TASK_ORDER', 'scheduled').strip().lower()
+        self.last_group_times: Dict[str, float] = {}
+
+        # 自适应并发控制（只在 run_tasks(adaptive=True) 期间存在）和最近一次运行结束时的状态
+        self.adaptive_limiter: Optional[AdaptiveLimiter] = None
+        self.last_concurrency_stats: Dict = {}
+
+        # 进度事件（默认由 ConsoleRenderer 打印到标准输出，GUI等可以另外订阅，见 events.py）
+        self.events = EventBus()
+        self.events.subscribe(ConsoleRenderer(max_retries=self.retry_policy.max_retries))
+
+        # 性能分析器（默认不记录，见 enable_profiling）
+        self.profiler = NULL_PROFILER
+
+        # 运行指标（默认不统计，见 enable_metrics）和正在运行的批量流水线（用于导出队列深度）
+        self.metrics: Optional[Metrics] = None
+        self.active_pipeline: Optional[Pipeline] = None
+
+        # 请求录制/回放（CASSETTE_MODE=record 或 replay，见 cassette.py）
+        self.cassette = Cassette.from_env()
+
+        # OpenAI客户端（重试由 retry_policy 统一处理），按 (地址, 密钥) 缓存，配置热更新时尽量复用
+        self._client_lock = threading.Lock()
+        self._client = (None, None)
+        self._client_for(self.settings)
+
+    # 当前快照中的配置（赋值时替换快照，不写入 .env 文件）
+    api_key = _setting('api_key')
+    api_base_url = _setting('api_base_url')
+    model_name = _setting('model_name')
+    article_length = _setting('article_length')
+    temperature = _setting('temperature')
+    max_tokens = _setting('max_tokens')
+    # 每次请求生成的候选文章数（n>1 时在本地选出最好的一篇）
+    candidates = _setting('candidates')
+
+    @property
+    def settings(self) -> Settings:
+        """当前配置快照"""
+        return self.settings_manager.current
+
+    @property
+    def client(self) -> OpenAI:
+        """当前配置对应的OpenAI客户端"""
+        return self._client_for(self.settings)
+
+    def _client_for(self, settings: Settings) -> OpenAI:
+        """
+        取得与配置快照对应的客户端：地址和密钥不变时复用同一个客户端（保留连接池），否则新建
+
+        Args:
+            settings: 配置快照
+
+        Returns:
+            OpenAI客户端
+        """
+        endpoint, client = self._client
+        if endpoint == settings.endpoint:
+            return client
+        with self._client_lock:
+            if self._client[0] != settings.endpoint:
+                # 旧客户端可能仍被进行中的请求使用，不主动关闭
+                self._client = (settings.endpoint, self._create_client(settings, self.profiler.make_http_client()
+                                                                       if self.profiler.enabled else None))
+            return self._client[1]
+
+    def _create_client(self, settings: Settings, http_client=None) -> OpenAI:
+        """创建OpenAI客户端（回放模式下返回不访问网络的客户端，录制模式下包装真实客户端）"""
+        if self.cassette and self.cassette.mode == 'replay':
+            return self.cassette.client()
+        params = {'http_client': http_client} if http_client is not None else {}
+        client = OpenAI(
+            api_key=settings.api_key,
+            base_url=settings.api_base_url,
+            timeout=60.0,
+            max_retries=0,
+            **params
         )
+        return self.cassette.wrap(client) if self.cassette else client
+
+    def _on_settings_changed(self, old: Settings, new: Settings):
+        """配置变化时打印变化的项"""
+        changes = ', '.join(f"{ENV_NAMES[name]} {'***' if name == 'api_key' else before} → "
+                            f"{'***' if name == 'api_key' else after}"
+                            for name, (before, after) in old.changes(new).items())
+        reconnect = " (new connection)" if old.endpoint != new.endpoint else ""
+        print(f"🔄 Settings updated: {changes}{reconnect}")
+
+    def watch_settings(self):
+        """在后台定时检查 config/.env，文件修改后自动应用（SETTINGS_WATCH_INTERVAL 秒，0 表示不检查）"""
+        self.settings_manager.watch(float(os.getenv('SETTINGS_WATCH_INTERVAL', '2')))
+
+    def enable_profiling(self, profiler):
+        """
+        启用性能分析：记录各阶段耗时，并改用带连接追踪的HTTP客户端
+
+        Args:
+            profiler: profiling.Profiler 实例
+        """
+        self.profiler = profiler
+        http_client = profiler.make_http_client()
+        if http_client is not None:
+            with self._client_lock:
+                self._client = (self.settings.endpoint, self._create_client(self.settings, http_client))
+
+    def enable_metrics(self) -> Metrics:
+        """
+        启用运行指标统计（多次调用返回同一个实例）
+
+        Returns:
+            metrics.Metrics 实例
+        """
+        if self.metrics is None:
+            self.metrics = Metrics(self)
+            if self.cassette and self.cassette.mode == 'replay':
+                self.metrics.add_cache('cassette', self.cassette, hits='replayed', misses='missed')
+        return self.metrics
 
     
+    def render_prompt(self, keyword: str, description: str = "", is_subtopic: bool = False,
+                      main_keyword: str = "", settings: Optional[Settings] = None) -> str:
+        """
+        生成提示词
+
+        Args:
+            keyword: 主题关键词
+            description: 主题描述
+            is_subtopic: 是否为子主题
+            main_keyword: 主主题关键词（仅当is_subtopic=True时使用）
+            settings: 配置快照（默认使用当前快照）
+
+        Returns:
+            完整的提示词
+        """
+        settings = settings or self.settings
+        with self.profiler.span('prompt.render', keyword=keyword):
+            if is_subtopic and main_keyword:
+                return generate_subtopic_prompt(main_keyword, keyword, settings.article_length)
+            return generate_prompt(keyword, description, settings.article_length)
+
+    def request_key(self, prompt: str, model: Optional[str] = None, settings: Optional[Settings] = None) -> str:
+        """
+        计算请求指纹（相同提示词和参数的请求指纹相同）
+
+        Args:
+            prompt: 提示词
+            model: 模型名称（默认使用当前模型）
+            settings: 配置快照（默认使用当前快照）
+
+        Returns:
+            十六进制指纹字符串
+        """
+        settings = settings or self.settings
+        payload = json.dumps({
+            'model': model or settings.model_name,
+            'prompt': prompt,
+            'temperature': settings.temperature,
+            'max_tokens': settings.max_tokens,
+            'candidates': settings.candidates,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _prepare(self, group: Optional[str], settings: Settings, is_subtopic: bool = False, keyword: str = '') -> str:
+        """请求前按路由规则选择模型并做预算检查，返回实际使用的模型"""
+        model = settings.model_name
+        if self.router:
+            model = self.router.route(is_subtopic, settings.article_length, group, default=model)
+        try:
+            return self.budget.before_request(model, group)
+        except BudgetExceededError as e:
+            self.events.publish(events.NOTICE, keyword, group, model, f"  ⏸ {e.message}")
+            raise
+
+    def _complete(self, prompt: str, model: str, group: Optional[str], settings: Settings,
+                  n: int = 1, keyword: str = '') -> List[str]:
+        """
+        调用API（按重试策略），返回 n 个非空结果
+
+        Args:
+            prompt: 提示词
+            model: 模型名称
+            group: 所属主题组
+            settings: 配置快照（重试时也使用同一快照和客户端）
+            n: 候选数量
+            keyword: 主题关键词（用于进度事件）
+
+        Returns:
+            文章内容列表
+
+        Raises:
+            GenerationError: 生成失败
+        """
+        client = self._client_for(settings)
+        limiter = self.router.limiter(model, self.rate_limiter) if self.router else self.rate_limiter
+        slot = self.router.slot if self.router else lambda model: contextlib.nullcontext()
+
+        reserved = self.estimate_request_tokens(prompt, settings, n)
+
+        def call(timeout: float) -> List[str]:
+            with self.profiler.span('ratelimit.wait'):
+                limiter.acquire(reserved)
+            params = {}
+            if n > 1:
+                params['n'] = n
+            with slot(model), self.profiler.span('api.completion', model=model, n=n):
+                adaptive = self.adaptive_limiter
+                ticket = adaptive.acquire() if adaptive else None
+                started = time.perf_counter()
+                try:
+                    response = client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=settings.temperature,
+                        max_tokens=settings.max_tokens,
+                        timeout=timeout,
+                        **params
+                    )
+                except Exception as e:
+                    self._observe(model, adaptive, ticket, None, e)
+                    raise
+                self._observe(model, adaptive, ticket, time.perf_counter() - started)
+            usage = getattr(response, 'usage', None)
+            self.budget.record(model, usage, group)
+            if usage is not None:
+                limiter.adjust(reserved, _usage_tokens(usage))
+            contents = [choice.message.content.strip() for choice in (response.choices or [])
+                        if choice.message.content and choice.message.content.strip()]
+            if not contents:
+                raise EmptyResponseError("Error generating article: API returned empty content")
+            return contents
+
+        def on_retry(attempt: int, delay: float, error: GenerationError):
+            self.events.publish(events.RETRIED, keyword, group, model, error.message,
+                                attempt=attempt, delay=delay, error=type(error).__name__)
+
+        try:
+            return self.retry_policy.call(call, self.circuit_breaker, model, on_retry)
+        except GenerationError as e:
+            self.events.publish(events.FAILED, keyword, group, model, e.message, error=type(e).__name__)
+            raise
+
+    def _observe(self, model: str, adaptive: Optional[AdaptiveLimiter], ticket: Optional[float],
+                 elapsed: Optional[float], error: Optional[BaseException] = None):
+        """把一次API请求的耗时或错误报告给模型路由和自适应并发控制"""
+        if self.router:
+            self.router.record_latency(model, elapsed)
+        if adaptive is None:
+            return
+        change = adaptive.release(ticket, elapsed, congestion_reason(error) if error is not None else "")
+        if change:
+            self.events.publish(events.NOTICE, model=model, message=f"⇅ Concurrency {change}",
+                                concurrency=adaptive.limit)
+
     def generate_article(self, keyword: str, description: str = "", is_subtopic: bool = False, 
-                        main_keyword: str = "") -> str:
+                        main_keyword: str = "", group: Optional[str] = None,
+                        candidates: Optional[int] = None) -> str:
         """
         生成单篇文章
         
@@ -51,51 +380,199 @@ class ArticleGenerator:
             description: 主题描述
             is_subtopic: 是否为子主题
             main_keyword: 主主题关键词（仅当is_subtopic=True时使用）
+            group: 所属主题组（用于按组统计花费）
+            candidates: 一次请求生成的候选数（默认使用 CANDIDATES 配置），
+                        大于1时返回评分最高的一篇，其余保存在 self.alternates[keyword]
         
         Returns:
             生成的文章内容
+
+        Raises:
+            GenerationError: 生成失败（临时错误已按策略重试）
+            BudgetExceededError: 已达到花费上限
         """
-        try:
-            # 生成提示词
-            if is_subtopic and main_keyword:
-                prompt = generate_subtopic_prompt(main_keyword, keyword, self.article_length)
-            else:
-                prompt = generate_prompt(keyword, description, self.article_length)
+        # 整个请求使用同一份配置快照（期间配置被修改也不受影响）
+        settings = self.settings
+        n = candidates or settings.candidates
+        if n > 1:
+            return self.generate_candidates(keyword, description, is_subtopic, main_keyword, group, n,
+                                            settings=settings)[0]['article']
+
+        # 生成提示词
+        prompt = self.render_prompt(keyword, description, is_subtopic, main_keyword, settings)
+
+        # 选择模型并做预算检查（可能限速或降级模型）
+        model = self._prepare(group, settings, is_subtopic, keyword)
+
+        self.events.publish(events.STARTED, keyword, group, model, n=1)
+        started = time.monotonic()
+        article = self._complete(prompt, model, group, settings, keyword=keyword)[0]
+        issues = validate_article(article)
+        if self.router:
+            self.router.record_quality(model, not issues)
+        self._remember(keyword, article)
+        self.events.publish(events.COMPLETED, keyword, group, model, words=len(article.split()),
+                            elapsed=round(time.monotonic() - started, 3))
+        return article
+
+    def generate_candidates(self, keyword: str, description: str = "", is_subtopic: bool = False,
+                            main_keyword: str = "", group: Optional[str] = None, n: int = 3,
+                            settings: Optional[Settings] = None) -> List[Dict]:
+        """
+        一次请求生成多篇候选文章（共享同一份提示词），并在本地评分排序
+
+        评分综合考虑格式、字数与 ARTICLE_LENGTH 的接近程度、词汇水平和与最近文章的差异度（见 scoring.py）。
+        部分API不支持 n 参数，此时只会返回一篇。
+
+        Args:
+            keyword: 主题关键词
+            description: 主题描述
+            is_subtopic: 是否为子主题
+            main_keyword: 主主题关键词（仅当is_subtopic=True时使用）
+            group: 所属主题组
+            n: 候选数量
+            settings: 配置快照（默认使用当前快照）
+
+        Returns:
+            按得分从高到低排序的候选列表，每项包含 article 和评分明细
+
+        Raises:
+            GenerationError: 生成失败
+        """
+        settings = settings or self.settings
+        prompt = self.render_prompt(keyword, description, is_subtopic, main_keyword, settings)
+        model = self._prepare(group, settings, is_subtopic, keyword)
+
+        self.events.publish(events.STARTED, keyword, group, model, n=n)
+        started = time.monotonic()
+        contents = self._complete(prompt, model, group, settings, n, keyword)
+
+        with self._articles_lock:
+            previous = list(self._recent_articles)
+        ranked = sorted(
+            ({'article': article, **score_article(article, settings.article_length, previous)} for article in contents),
+            key=lambda candidate: candidate['score'],
+            reverse=True
+        )
+        if self.router:
+            self.router.record_quality(model, not ranked[0]['issues'])
+
+        self._remember(keyword, ranked[0]['article'], [candidate['article'] for candidate in ranked[1:]])
+
+        self.events.publish(events.COMPLETED, keyword, group, model, candidates=len(ranked),
+                            score=ranked[0]['score'], words=len(ranked[0]['article'].split()),
+                            elapsed=round(time.monotonic() - started, 3))
+        return ranked
 
-            print(f"  → Calling API: {self.model_name}")
+    def _remember(self, keyword: str, article: str, alternates: Optional[List[str]] = None):
+        """
+        记录最近生成的文章（用于差异度评分）和未被选中的候选文章
+
+        Args:
+            keyword: 主题关键词
+            article: 选中的文章
+            alternates: 未被选中的候选（为 None 时不记录）
+        """
+        with self._articles_lock:
+            self._recent_articles.append(article)
+            if alternates is not None:
+                self.alternates[keyword] = alternates
+                # 只保留最近的备选，避免长时间运行时无限增长
+                while len(self.alternates) > 100:
+                    del self.alternates[next(iter(self.alternates))]
+
+    def stream_article(self, keyword: str, description: str = "", is_subtopic: bool = False,
+                       main_keyword: str = "", group: Optional[str] = None) -> Iterator[str]:
+        """
+        流式生成单篇文章
+
+        只在收到第一个片段之前按策略重试；开始输出后出错直接抛出，避免重复输出内容。
+
+        Args:
+            keyword: 主题关键词
+            description: 主题描述
+            is_subtopic: 是否为子主题
+            main_keyword: 主主题关键词（仅当is_subtopic=True时使用）
+            group: 所属主题组（用于按组统计花费）
 
-            # 调用API
-            response = self.client.chat.completions.create(
-                model=self.model_name,
+        Yields:
+            文章文本片段
+
+        Raises:
+            GenerationError: 生成失败
+        """
+        settings = self.settings
+        prompt = self.render_prompt(keyword, description, is_subtopic, main_keyword, settings)
+        model = self._prepare(group, settings, is_subtopic, keyword)
+        client = self._client_for(settings)
+        # 流式请求只使用模型自己的限流器，不占并发名额（输出时间由调用方的读取速度决定）
+        limiter = self.router.limiter(model, self.rate_limiter) if self.router else self.rate_limiter
+        reserved = self.estimate_request_tokens(prompt, settings)
+
+        def open_stream(timeout: float):
+            with self.profiler.span('ratelimit.wait'):
+                limiter.acquire(reserved)
+            started[0] = time.perf_counter()
+            stream = iter(client.chat.completions.create(
+                model=model,
                 messages=[
                     {"role": "user", "content": prompt}
                 ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
+                temperature=settings.temperature,
+                max_tokens=settings.max_tokens,
+                timeout=timeout,
+                stream=True
+            ))
+            # 读取到第一个有内容的片段才算连接成功
+            pending = []
+            for chunk in stream:
+                pending.append(chunk)
+                if _chunk_text(chunk):
+                    now = time.perf_counter()
+                    self.profiler.record('api.ttft', started[0], now, model=model)
+                    self.events.publish(events.FIRST_TOKEN, keyword, group, model, ttft=round(now - started[0], 3))
+                    return stream, pending
+            raise EmptyResponseError("Error generating article: API returned empty content")
 
-            article = response.choices[0].message.content.strip()
-            return article
+        def on_retry(attempt: int, delay: float, error: GenerationError):
+            self.events.publish(events.RETRIED, keyword, group, model, error.message,
+                                attempt=attempt, delay=delay, error=type(error).__name__)
 
+        self.events.publish(events.STARTED, keyword, group, model, n=1, stream=True)
+        started = [time.perf_counter()]
+        try:
+            stream, pending = self.retry_policy.call(open_stream, self.circuit_breaker, model, on_retry)
+        except GenerationError as e:
+            self.events.publish(events.FAILED, keyword, group, model, e.message, error=type(e).__name__)
+            raise
+
+        usage = None
+        produced = []
+        try:
+            for chunk in itertools.chain(pending, stream):
+                usage = getattr(chunk, 'usage', None) or usage
+                text = _chunk_text(chunk)
+                if text:
+                    produced.append(text)
+                    yield text
         except Exception as e:
-            error_msg = f"Error generating article: {type(e).__name__}: {str(e)}"
-            print(f"  ❌ {error_msg}")
-
-            # 提供更详细的错误信息
-            if "Connection" in str(e) or "timeout" in str(e).lower():
-                error_msg += "\n\n可能的原因：\n"
-                error_msg += "1. 网络连接问题 - 请检查网络连接\n"
-                error_msg += "2. API服务器无法访问 - 可能需要VPN\n"
-                error_msg += "3. 防火墙阻止 - 检查防火墙设置\n"
-                error_msg += "\n建议：尝试使用国内可访问的API服务（如OpenRouter）"
-            elif "API key" in str(e) or "Unauthorized" in str(e):
-                error_msg += "\n\nAPI密钥错误，请检查.env文件中的API_KEY是否正确"
-            elif "model" in str(e).lower():
-                error_msg += f"\n\n模型名称可能不正确，当前使用: {self.model_name}"
-
-            return error_msg
+            error = classify_error(e, model)
+            self.events.publish(events.FAILED, keyword, group, model, error.message, error=type(error).__name__)
+            raise error from e
+        else:
+            self.events.publish(events.COMPLETED, keyword, group, model, words=len(''.join(produced).split()),
+                                elapsed=round(time.perf_counter() - started[0], 3))
+        finally:
+            if usage is None:
+                # 流式响应通常不含用量，在本地估算
+                usage = SimpleNamespace(prompt_tokens=prompt_tokens(prompt),
+                                        completion_tokens=count_tokens(''.join(produced)))
+            self.budget.record(model, usage, group)
+            limiter.adjust(reserved, _usage_tokens(usage))
+            self.profiler.record('api.completion', started[0], time.perf_counter(), model=model, stream=True)
     
-    def load_topics(self, config_path: str = "config/topics.json") -> Dict:
+    @staticmethod
+    def load_topics(config_path: str = "config/topics.json") -> Dict:
         """
         加载主题配置
         
@@ -108,84 +585,514 @@ class ArticleGenerator:
         with open(config_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def generate_all_articles(self, output_dir: str = "output") -> Dict[str, List[str]]:
+    @staticmethod
+    def build_tasks(topics: Dict) -> List[Dict]:
+        """
+        将主题配置展开为任务列表（不需要创建生成器实例，导出等功能也会使用）
+
+        Args:
+            topics: load_topics() 返回的主题配置
+
+        Returns:
+            任务列表（主题在前，其后是它的各级子主题），每个任务包含 group、keyword、description、
+            is_subtopic、main_keyword（上一级主题的关键词）、filename、depth（主题为0）和 priority（组优先级）
+        """
+        tasks = []
+
+        def add(topic: Dict, group_key: str, priority: int, base_name: str, parent: str, depth: int):
+            keyword = topic['keyword']
+            base_name = f"{base_name}_{safe_name(keyword)}"
+            tasks.append({
+                'group': group_key,
+                'keyword': keyword,
+                'description': topic.get('description', ''),
+                'is_subtopic': depth > 0,
+                'main_keyword': parent,
+                'filename': f"{base_name}.txt",
+                'depth': depth,
+                'priority': priority,
+            })
+            # 子主题可以继续包含子主题，层数不限
+            for subtopic in topic.get('subtopics', []):
+                add(subtopic, group_key, priority, base_name, keyword, depth + 1)
+
+        for group_key, group_data in topics.items():
+            for topic in group_data['topics']:
+                add(topic, group_key, int(group_data.get('priority', 0)), group_key, "", 0)
+        return tasks
+
+    def estimate_request_tokens(self, prompt: str, settings: Optional[Settings] = None, n: int = 1) -> int:
+        """
+        估算一次请求的token数（输入 + 预计输出 × 候选数，见 tokens.py），用于限流器预扣TPM额度
+
+        响应返回后按实际用量修正（RateLimiter.adjust）。
+
+        Args:
+            prompt: 提示词
+            settings: 配置快照（默认使用当前快照）
+            n: 候选数量
+
+        Returns:
+            预计token数
+        """
+        settings = settings or self.settings
+        return prompt_tokens(prompt) + expected_output_tokens(settings.article_length, settings.max_tokens) * n
+
+    def task_fingerprint(self, task: Dict, settings: Optional[Settings] = None) -> str:
+        """
+        计算任务输入的指纹（用于增量生成）
+
+        包括关键词、描述、上级主题、提示词模板版本、模型和生成参数；启用模型路由时模型取路由规则选中的层级
+        及其中的模型（同一层级内按负载选择哪个模型不影响指纹）。
+
+        Args:
+            task: 任务（格式见 build_tasks）
+            settings: 配置快照（默认使用当前快照）
+
+        Returns:
+            十六进制指纹字符串
+        """
+        settings = settings or self.settings
+        model = settings.model_name
+        if self.router:
+            tier = self.router.tier(task['is_subtopic'], settings.article_length, task['group'] or None)
+            if tier is not None:
+                model = {'tier': tier, 'models': self.router.tier_models(tier)}
+        return fingerprint({
+            'keyword': task['keyword'],
+            'description': task['description'],
+            'parent': task['main_keyword'] if task['is_subtopic'] else '',
+            'template': PROMPT_TEMPLATE_VERSION,
+            'model': model,
+            'temperature': settings.temperature,
+            'max_tokens': settings.max_tokens,
+            'article_length': settings.article_length,
+            'candidates': settings.candidates,
+        })
+
+    def estimate_task_tokens(self, task: Dict, settings: Optional[Settings] = None) -> int:
+        """
+        估算一个任务的token数（输入 + 预计输出 × 候选数），用于调度排序和运行计划
+
+        Args:
+            task: 任务（格式见 build_tasks）
+            settings: 配置快照（默认使用当前快照）
+
+        Returns:
+            预计token数
+        """
+        settings = settings or self.settings
+        prompt = self.render_prompt(task['keyword'], task['description'], task['is_subtopic'],
+                                    task['main_keyword'], settings)
+        return self.estimate_request_tokens(prompt, settings, settings.candidates)
+
+    def run_tasks(self, tasks: Iterable[Dict], output_dir: str = "output", concurrency: int = 1,
+                  skip: Optional[set] = None,
+                  on_result: Optional[Callable[[Dict], None]] = None, adaptive: bool = False) -> List[Dict]:
+        """
+        以流水线方式执行生成任务并保存文章
+
+        任务依次经过由有界队列连接的几个阶段：渲染提示词 → 调用API（concurrency 个线程）→
+        后处理（格式整理、检查、评分和去重签名，在进程池中运行，不与网络请求争抢GIL）→ 写文件。
+        下游处理不过来时上游阻塞，任务按需从 tasks 中读取（可以是逐行读取标准输入的生成器）。
+        tasks 为列表时先按调度策略排序（见 scheduler.py，TASK_ORDER=file 时保持原顺序），
+        每组全部完成时打印该组的耗时，保存在 self.last_group_times。
+        adaptive 为 True 时 concurrency 是上限，实际同时进行的请求数按 AIMD 自动调整（见 concurrency.py），
+        结束时的状态保存在 self.last_concurrency_stats。
+        遇到需要终止批次的错误（鉴权、模型、断路器、预算）时停止读取新任务并重新抛出。
+        各阶段的统计保存在 self.last_pipeline_stats。
+
+        Args:
+            tasks: 任务序列（格式见 build_tasks）
+            output_dir: 输出目录
+            concurrency: 并发数
+            skip: 需要跳过的文件名集合（已完成的任务）
+            on_result: 每个任务完成时的回调（在写文件线程中调用）
+            adaptive: 是否自动调整并发数
+
+        Returns:
+            任务结果列表，每项包含 keyword、group、status（ok/failed/skipped）、file 等字段
+
+        Raises:
+            GenerationError: 需要终止批次的错误
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        skip = skip or set()
+        concurrency = max(1, concurrency)
+        search_index = open_index(output_dir)
+        duplicates = SignatureIndex()
+        results = []
+        fatal = []
+        pipeline = Pipeline(self.profiler)
+        pool = [self._create_postprocess_pool()]
+        self.adaptive_limiter = AdaptiveLimiter.from_env(concurrency) if adaptive else None
+        self.last_concurrency_stats = {}
+
+        # 每组剩余的任务数（只统计列表形式的任务）
+        pending = {}
+        started = time.monotonic()
+        self.last_group_times = {}
+        if isinstance(tasks, list):
+            pending = group_sizes(tasks)
+            if self.task_order != 'file':
+                with self.profiler.span('tasks.schedule', count=len(tasks)):
+                    settings = self.settings
+                    tasks = order_tasks(tasks, lambda task: self.estimate_task_tokens(task, settings))
+
+        def render(task: Dict) -> Dict:
+            job = {
+                'task': task,
+                'depth': task.get('depth', 1 if task['is_subtopic'] else 0),
+                'result': {
+                    'keyword': task['keyword'],
+                    'group': task['group'],
+                    'file': os.path.join(output_dir, task['filename']),
+                },
+            }
+            if task['filename'] in skip:
+                self.events.publish(events.SKIPPED, task['keyword'], task['group'], filename=task['filename'],
+                                    depth=job['depth'])
+                job['result']['status'] = 'skipped'
+                return job
+            self.events.publish(events.QUEUED, task['keyword'], task['group'], filename=task['filename'],
+                                depth=job['depth'])
+            # 任务在之后的阶段都使用这份配置快照
+            job['settings'] = self.settings
+            job['prompt'] = self.render_prompt(task['keyword'], task['description'],
+                                               task['is_subtopic'], task['main_keyword'], job['settings'])
+            return job
+
+        def fail(job: Dict, error: Exception):
+            """意外错误（写文件失败、非 GenerationError 的异常）只让这一篇失败，不影响批次中的其他任务"""
+            task = job['task']
+            message = f"{type(error).__name__}: {error}"
+            job['result'].update(status='failed', error=type(error).__name__, message=message, fatal=False,
+                                 elapsed=round(time.monotonic() - job.get('started', started), 3))
+            self.events.publish(events.FAILED, task['keyword'], task['group'], job.get('model', ''), message,
+                                error=type(error).__name__)
+
+        def guarded(func: Callable[[Dict], Optional[Dict]]) -> Callable[[Dict], Optional[Dict]]:
+            def run(job: Dict) -> Optional[Dict]:
+                try:
+                    return func(job)
+                except Exception as e:
+                    fail(job, e)
+                    return job
+            return run
+
+        def call_api(job: Dict) -> Optional[Dict]:
+            if 'status' in job['result']:
+                return job
+            if pipeline.stopped:
+                # 批次已终止，还没开始的任务不再调用API
+                return None
+            task, result, settings = job['task'], job['result'], job['settings']
+            group = task['group'] or None
+            n = settings.candidates
+            job['started'] = time.monotonic()
+            try:
+                model = job['model'] = result['model'] = self._prepare(group, settings, task['is_subtopic'],
+                                                                       task['keyword'])
+                self.events.publish(events.STARTED, task['keyword'], group, model, n=n, depth=job['depth'],
+                                    batch=True)
+                job['contents'] = self._complete(job['prompt'], model, group, settings, n, task['keyword'])
+            except GenerationError as e:
+                result.update(status='failed', error=type(e).__name__, message=e.message,
+                              fatal=e.batch_fatal, elapsed=round(time.monotonic() - job['started'], 3))
+                if e.batch_fatal:
+                    fatal.append(e)
+                    pipeline.stop()
+            return job
+
+        def postprocess(job: Dict) -> Dict:
+            if 'status' in job['result']:
+                return job
+            with self._articles_lock:
+                previous = list(self._recent_articles)
+            args = (job['contents'], job['settings'].article_length, previous)
+            executor = pool[0]
+            if executor is not None:
+                try:
+                    job['post'] = executor.submit(postprocess_article, *args).result()
+                    return job
+                except BrokenExecutor as e:
+                    if pool[0] is executor:
+                        pool[0] = None
+                        print(f"⚠️  Post-processing pool failed, continuing in-process: {e}")
+            job['post'] = postprocess_article(*args)
+            return job
+
+        def save(job: Dict):
+            """整理、记录并写入一篇完成的文章"""
+            task, result = job['task'], job['result']
+            post = job['post']
+            article = post['article']
+            self._remember(task['keyword'], article,
+                           post['alternates'] if job['settings'].candidates > 1 else None)
+
+            issues = list(post['issues'])
+            if self.router:
+                self.router.record_quality(job['model'], not issues)
+            duplicate = duplicates.add(task['filename'], post['signature'])
+            if duplicate:
+                issues.append(f"near-duplicate of {duplicate[0]} ({duplicate[1]:.0%} similar)")
+            self.events.publish(events.COMPLETED, task['keyword'], task['group'], job['model'],
+                                candidates=post['candidates'], score=post['score'], issues=issues,
+                                words=len(article.split()), depth=job['depth'],
+                                elapsed=round(time.monotonic() - job['started'], 3))
+
+            with self.profiler.span('file.write', file=task['filename']):
+                save_article(result['file'], task['keyword'], article)
+            with self.profiler.span('search.index'):
+                index_saved(search_index, result['file'], task['keyword'], article)
+            result.update(status='ok', words=len(article.split()), score=post['score'], issues=issues,
+                          elapsed=round(time.monotonic() - job['started'], 3))
+            self.events.publish(events.SAVED, task['keyword'], task['group'], job['model'],
+                                file=result['file'], depth=job['depth'], elapsed=result['elapsed'])
+
+        def sink(job: Dict):
+            task, result = job['task'], job['result']
+            if 'status' not in result:
+                try:
+                    save(job)
+                except Exception as e:
+                    fail(job, e)
+            results.append(result)
+            group = task.get('group') or ''
+            if group in pending:
+                pending[group] -= 1
+                if pending[group] == 0 and group:
+                    self.last_group_times[group] = round(time.monotonic() - started, 3)
+                    self.events.publish(events.NOTICE, group=group,
+                                        message=f"🏁 Group {group} finished in {self.last_group_times[group]:.1f}s",
+                                        elapsed=self.last_group_times[group])
+            if on_result:
+                on_result(result)
+
+        pipeline.add_stage('render', render, workers=1, queue_size=concurrency)
+        pipeline.add_stage('api', guarded(call_api), workers=concurrency, queue_size=concurrency * 2)
+        pipeline.add_stage('postprocess', guarded(postprocess), workers=self.postprocess_workers if pool[0] is not None else 1, queue_size=concurrency * 2)
+        pipeline.add_stage('sink', sink, workers=1, queue_size=concurrency * 2)
+
+        self.active_pipeline = pipeline
+        try:
+            pipeline.run(tasks)
+        finally:
+            self.active_pipeline = None
+            self.last_pipeline_stats = pipeline.stats()
+            if self.adaptive_limiter:
+                self.last_concurrency_stats = self.adaptive_limiter.stats()
+                self.adaptive_limiter = None
+            if pool[0] is not None:
+                pool[0].shutdown()
+            if search_index:
+                search_index.close()
+            # 批次结束或暂停时写入花费账本
+            self.budget.flush()
+            # 之后的输出（汇总等）排在本批次的进度信息之后
+            self.events.flush()
+        if fatal:
+            raise fatal[0]
+        return results
+
+    def _create_postprocess_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        创建后处理进程池（POSTPROCESS_WORKERS=0 或无法创建时返回 None，在线程中处理）
+
+        工作进程用 forkserver/spawn 方式启动（见 pipeline.process_context），避免在已有多个线程时 fork。
+        """
+        if self.postprocess_workers <= 0:
+            return None
+        try:
+            return ProcessPoolExecutor(max_workers=self.postprocess_workers, mp_context=process_context())
+        except (OSError, ValueError, NotImplementedError) as e:
+            print(f"⚠️  Post-processing pool unavailable, running in-process: {e}")
+            return None
+
+    def generate_all_articles(self, output_dir: str = "output", resume: bool = True, concurrency: int = 1,
+                              topics_path: str = "config/topics.json",
+                              on_result: Optional[Callable[[Dict], None]] = None,
+                              adaptive: bool = False, incremental: bool = False,
+                              prune: bool = False) -> Dict[str, List[str]]:
         """
         生成所有主题的文章
+
+        生成失败的主题不会写入文件，而是记录到 self.last_run_failures；
+        遇到鉴权错误、模型错误或断路器打开时终止整个批次。
+        达到花费上限时暂停并写入检查点，下次运行时跳过已完成的文章。
+        每篇文章保存时把输入指纹记录到输出目录的生成清单（见 manifest.py）；incremental 为 True 时
+        只生成新增、输入有变化或文件丢失的文章，比较结果保存在 self.last_run_changes；
+        由同一主题文件生成、但已从中移除的文章只报告，prune 为 True 时才删除。
         
         Args:
             output_dir: 输出目录
+            resume: 是否从上次暂停的检查点继续
+            concurrency: 并发请求数
+            topics_path: 主题配置文件路径
+            on_result: 每篇文章完成时的回调（见 run_tasks）
+            adaptive: 是否自动调整并发数（concurrency 为上限）
+            incremental: 是否只重新生成输入有变化的文章
+            prune: 增量生成时是否删除已从主题配置中移除的文章
         
         Returns:
-            生成结果字典
+            生成结果字典（仅包含成功保存的文件和未变化而跳过的文件）
         """
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
         
         # 加载主题
-        topics = self.load_topics()
-        results = {}
-        
-        # 遍历所有组
-        for group_key, group_data in topics.items():
-            group_name = group_data['name']
-            print(f"\n{'='*60}")
-            print(f"Processing {group_name}")
-            print(f"{'='*60}")
-            
-            group_results = []
-            
-            # 遍历该组的所有主题
-            for topic in group_data['topics']:
-                keyword = topic['keyword']
-                description = topic.get('description', '')
-                
-                print(f"\nGenerating article for: {keyword}")
-                article = self.generate_article(keyword, description)
-                
-                # 保存文章
-                filename = f"{group_key}_{keyword.replace('/', '_').replace(' ', '_')}.txt"
-                filepath = os.path.join(output_dir, filename)
-
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(f"Topic: {keyword}\n")
-                    f.write(f"{'='*60}\n\n")
-                    f.write(article)
-
-                group_results.append(filename)
-                print(f"✓ Saved to: {filepath}")
-                
-                # 处理子主题
-                if 'subtopics' in topic:
-                    for subtopic in topic['subtopics']:
-                        sub_keyword = subtopic['keyword']
-                        print(f"  Generating subtopic article for: {sub_keyword}")
-                        
-                        sub_article = self.generate_article(
-                            sub_keyword, 
-                            subtopic.get('description', ''),
-                            is_subtopic=True,
-                            main_keyword=keyword
-                        )
-                        
-                        # 保存子主题文章
-                        sub_filename = f"{group_key}_{keyword.replace('/', '_').replace(' ', '_')}_{sub_keyword.replace(' ', '_')}.txt"
-                        sub_filepath = os.path.join(output_dir, sub_filename)
-
-                        with open(sub_filepath, 'w', encoding='utf-8') as f:
-                            f.write(f"Topic: {sub_keyword}\n")
-                            f.write(f"{'='*60}\n\n")
-                            f.write(sub_article)
-
-                        group_results.append(sub_filename)
-                        print(f"  ✓ Saved to: {sub_filepath}")
-                        
-                        # 避免API限流
-                        time.sleep(1)
-                
-                # 避免API限流
-                time.sleep(1)
-            
-            results[group_key] = group_results
+        with self.profiler.span('topics.load', path=topics_path):
+            topics = self.load_topics(topics_path)
+            tasks = self.build_tasks(topics)
+        results = {group_key: [] for group_key in topics}
+        self.last_run_failures = []
+        self.last_run_status = 'completed'
+        self.last_run_changes = None
+
+        # 读取检查点
+        checkpoint_path = os.path.join(output_dir, '.checkpoint.json')
+        completed = set(self._load_checkpoint(checkpoint_path)) if resume else set()
+        if completed:
+            print(f"↺ Resuming from checkpoint: {len(completed)} article(s) already done")
+
+        # 生成清单：记录每篇文章的输入指纹，增量生成时跳过没有变化的文章
+        settings = self.settings
+        manifest = Manifest(output_dir)
+        topics_id = topics_key(topics_path)
+        fingerprints = {task['filename']: self.task_fingerprint(task, settings) for task in tasks}
+        if incremental:
+            changes = self.last_run_changes = manifest.compare(tasks, fingerprints, topics_id)
+            if changes['adopted']:
+                print(f"📋 No manifest yet: treating {len(changes['adopted'])} existing article(s) as up to date")
+            print(f"🔁 Incremental: {describe_changes(changes)}")
+            completed |= changes['up_to_date']
+            changes['removed'] = []
+            if prune:
+                self._remove_orphans(output_dir, manifest, changes['orphans'])
+                changes['removed'] = list(changes['orphans'])
+            elif changes['orphans']:
+                print(f"🗂  Kept {len(changes['orphans'])} article(s) no longer in {topics_path} "
+                      f"(run with --prune to delete them)")
+            manifest.save()
+
+        remaining = [len(tasks) - len(completed & {task['filename'] for task in tasks})]
+        lock = threading.Lock()
+        # 达到组预算上限的组：这些组剩下的文章留给下次运行，需要保留检查点
+        paused_groups = set()
+
+        def record(result: Dict):
+            with lock:
+                filename = os.path.basename(result['file'])
+                if result['status'] in ('ok', 'skipped'):
+                    completed.add(filename)
+                    results[result['group']].append(filename)
+                if result['status'] == 'ok' and filename in fingerprints:
+                    manifest.record(filename, fingerprints[filename], result['keyword'], result['group'], topics_id)
+                if result['status'] == 'skipped':
+                    return
+
+                remaining[0] -= 1
+                if result['status'] == 'failed':
+                    # 暂停（包括单个组达到预算上限）不算失败，由检查点记录进度
+                    if result['error'] == BudgetExceededError.__name__:
+                        if not result['fatal']:
+                            paused_groups.add(result['group'])
+                    else:
+                        self.last_run_failures.append({key: result[key] for key in
+                                                       ('group', 'keyword', 'error', 'message')})
+                else:
+                    estimate = self.budget.estimate_remaining(remaining[0], self.model_name,
+                                                              max_tokens=self.max_tokens)
+                    self.events.publish(events.NOTICE, message=f"💰 Spent ${self.budget.run_cost:.4f} | "
+                                        f"est. to completion ${estimate:.4f} ({remaining[0]} left)",
+                                        spent=self.budget.run_cost, estimate=estimate, remaining=remaining[0])
+
+            if on_result:
+                on_result(result)
+
+        print(f"\n{'='*60}")
+        limit = f"auto (max {max(1, concurrency)})" if adaptive else max(1, concurrency)
+        print(f"Processing {len(tasks)} article(s) from {len(topics)} group(s), concurrency {limit}")
+        print(f"{'='*60}")
+
+        try:
+            self.run_tasks(tasks, output_dir, concurrency, skip=completed, on_result=record, adaptive=adaptive)
+
+        except BudgetExceededError as e:
+            self.last_run_status = 'paused'
+            self._save_checkpoint(checkpoint_path, completed)
+            print(f"\n⏸ Batch paused: {e}")
+            print(f"  Checkpoint saved to: {checkpoint_path} (run again to resume)")
+
+        except GenerationError as e:
+            self.last_run_status = 'aborted'
+            self._save_checkpoint(checkpoint_path, completed)
+            print(f"\n❌ Batch aborted: {e}")
+            print(f"  Checkpoint saved to: {checkpoint_path} (run again to resume)")
+
+        except BaseException:
+            # 意外错误或 Ctrl+C：保留已完成的进度后继续抛出
+            self.last_run_status = 'aborted'
+            self._save_checkpoint(checkpoint_path, completed)
+            print(f"\n❌ Batch aborted, checkpoint saved to: {checkpoint_path} (run again to resume)")
+            raise
+
+        else:
+            if paused_groups:
+                self.last_run_status = 'paused'
+                self._save_checkpoint(checkpoint_path, completed)
+                print(f"\n⏸ Group budget reached for: {', '.join(sorted(paused_groups))}")
+                print(f"  Checkpoint saved to: {checkpoint_path} (run again to resume)")
+            elif os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+
+        finally:
+            manifest.save()
+
+        if self.last_run_failures:
+            print(f"\n⚠️  {len(self.last_run_failures)} article(s) failed and were not saved:")
+            for failure in self.last_run_failures:
+                print(f"  - {failure['keyword']}: {failure['error']}")
+
+        summary = self.budget.summary()
+        print(f"\n💰 Tokens: {summary['prompt_tokens']} in / {summary['completion_tokens']} out | "
+              f"Cost: ${summary['run_cost']:.4f} (today ${summary['daily_cost']:.4f})")
         
         return results
 
+    def _remove_orphans(self, output_dir: str, manifest: Manifest, orphans: List[str]):
+        """删除已从主题配置中移除的文章（文件、搜索索引和清单记录）"""
+        if not orphans:
+            return
+        search_index = open_index(output_dir)
+        try:
+            for filename in orphans:
+                path = os.path.join(output_dir, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+                    print(f"🗑  Removed {filename} (no longer in topics)")
+                if search_index:
+                    search_index.remove(path)
+                manifest.remove(filename)
+        finally:
+            if search_index:
+                search_index.close()
+
+    def _load_checkpoint(self, checkpoint_path: str) -> List[str]:
+        """读取检查点中已完成的文件名"""
+        if not os.path.exists(checkpoint_path):
+            return []
+        try:
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('completed', [])
+        except (OSError, ValueError):
+            return []
+
+    def _save_checkpoint(self, checkpoint_path: str, completed):
+        """保存检查点"""
+        with open(checkpoint_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'completed': sorted(completed),
+                'budget': self.budget.summary(),
+                'paused_at': time.strftime('%Y-%m-%d %H:%M:%S')
+            }, f, ensure_ascii=False, indent=2)
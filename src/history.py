@@ -0,0 +1,178 @@
+"""
+历史文章索引模块
+为 output/ 目录中已生成的文章维护一个持久化索引（路径、主题、修改时间、大小、字数、首行），
+刷新时只比较文件的修改时间和大小，只有新增或变化的文件才会被重新读取
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .storage import read_article
+
+INDEX_NAME = '.history_index.json'
+INDEX_VERSION = 1
+
+
+def scan_articles(output_dir: str) -> Dict[str, os.stat_result]:
+    """
+    列出目录下所有文章文件及其 stat 信息（只做 stat，不读取内容）
+
+    以 . 开头的文件和目录（缓存、检查点、索引等）会被跳过。
+
+    Args:
+        output_dir: 文章目录
+
+    Returns:
+        {相对路径（以 / 分隔）: stat 信息}
+    """
+    found = {}
+    pending = [output_dir]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith('.txt') and entry.is_file():
+                        relative = os.path.relpath(entry.path, output_dir).replace(os.sep, '/')
+                        found[relative] = entry.stat()
+        except OSError:
+            continue
+    return found
+
+
+class HistoryIndex:
+    """
+    历史文章索引
+
+    索引保存在 output_dir/.history_index.json，键为相对于 output_dir 的文件路径。
+    """
+
+    def __init__(self, output_dir: str = "output", index_path: Optional[str] = None):
+        """
+        Args:
+            output_dir: 文章目录
+            index_path: 索引文件路径（默认 output_dir/.history_index.json）
+        """
+        self.output_dir = output_dir
+        self.index_path = index_path or os.path.join(output_dir, INDEX_NAME)
+        self._entries: Dict[str, Dict] = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+            return {}
+        return data.get('entries', {})
+
+    def _save(self, entries: Dict[str, Dict]):
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        tmp_path = f"{self.index_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'entries': entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def _read_entry(self, relative: str, stat: os.stat_result) -> Optional[Dict]:
+        """读取一篇文章并生成索引条目"""
+        try:
+            article = read_article(os.path.join(self.output_dir, relative))
+        except (OSError, UnicodeDecodeError):
+            return None
+        return {
+            'path': relative,
+            'topic': article['topic'],
+            'title': article['title'],
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'words': len(article['body'].split()),
+        }
+
+    def refresh(self) -> Tuple[int, int, int]:
+        """
+        增量刷新索引
+
+        Returns:
+            (新增数, 更新数, 删除数)
+        """
+        found = scan_articles(self.output_dir)
+        with self._lock:
+            entries = dict(self._entries)
+
+        added = updated = 0
+        for relative, stat in found.items():
+            current = entries.get(relative)
+            if current and current['mtime'] == stat.st_mtime and current['size'] == stat.st_size:
+                continue
+            entry = self._read_entry(relative, stat)
+            if entry is None:
+                continue
+            if current:
+                updated += 1
+            else:
+                added += 1
+            entries[relative] = entry
+
+        removed = [relative for relative in entries if relative not in found]
+        for relative in removed:
+            del entries[relative]
+
+        if added or updated or removed or not os.path.exists(self.index_path):
+            self._save(entries)
+        with self._lock:
+            self._entries = entries
+        return added, updated, len(removed)
+
+    def update(self, filepath: str):
+        """
+        更新单个文件的索引条目（保存文章后调用，无需扫描整个目录）
+
+        Args:
+            filepath: 文章文件路径
+        """
+        relative = os.path.relpath(filepath, self.output_dir).replace(os.sep, '/')
+        if relative.startswith('..'):
+            return
+        try:
+            entry = self._read_entry(relative, os.stat(filepath))
+        except OSError:
+            entry = None
+        with self._lock:
+            if entry:
+                self._entries[relative] = entry
+            else:
+                self._entries.pop(relative, None)
+            entries = dict(self._entries)
+        self._save(entries)
+
+    def entries(self, query: str = "") -> List[Dict]:
+        """
+        索引条目（最新的在前）
+
+        Args:
+            query: 按主题、标题或文件名过滤（不区分大小写）
+
+        Returns:
+            条目列表，每项包含 path、topic、title、mtime、size、words
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        query = query.strip().lower()
+        if query:
+            entries = [entry for entry in entries
+                       if query in entry['topic'].lower() or query in entry['title'].lower()
+                       or query in entry['path'].lower()]
+        entries.sort(key=lambda entry: entry['mtime'], reverse=True)
+        return entries
+
+    def full_path(self, entry: Dict) -> str:
+        """条目对应的文件路径"""
+        return os.path.join(self.output_dir, *entry['path'].split('/'))
@@ -0,0 +1,158 @@
+"""
+生成清单模块
+记录每篇文章生成时的输入指纹（关键词、描述、上级主题、提示词模板版本、模型和生成参数），
+保存在输出目录的 .manifest.json 中。增量生成（generate --incremental）时与当前主题配置比较，
+只重新生成新增或输入有变化的文章，类似 make。每条记录还保存生成它的主题文件，
+只有同一主题文件中已移除的文章才算作孤立文件（generate --incremental --prune 时删除）。
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List
+
+MANIFEST_FILE = '.manifest.json'
+MANIFEST_VERSION = 1
+
+# 重新生成的原因
+NEW = 'new'
+CHANGED = 'changed'
+MISSING = 'missing'
+
+
+def topics_key(topics_path: str) -> str:
+    """主题文件在清单中的标识（相对当前目录的规范路径）"""
+    return os.path.normpath(os.path.relpath(os.path.abspath(topics_path))).replace('\\', '/') if topics_path else ''
+
+
+def fingerprint(inputs: Dict) -> str:
+    """
+    计算输入指纹
+
+    Args:
+        inputs: 影响生成结果的输入（可被 JSON 序列化）
+
+    Returns:
+        十六进制指纹字符串
+    """
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class Manifest:
+    """输出目录中的生成清单 {文件名: {fingerprint, keyword, group, topics, generated_at}}"""
+
+    def __init__(self, output_dir: str = "output"):
+        """
+        读取清单（不存在或无法解析时为空）
+
+        Args:
+            output_dir: 输出目录
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILE)
+        self.entries: Dict[str, Dict] = {}
+        self.existed = os.path.exists(self.path)
+        self._dirty = False
+        if self.existed:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    self.entries = data.get('files', {})
+            except (OSError, ValueError, AttributeError):
+                self.entries = {}
+
+    def record(self, filename: str, digest: str, keyword: str = "", group: str = "", topics: str = ""):
+        """记录一篇刚生成的文章（topics 为 topics_key 返回的主题文件标识）"""
+        self.entries[filename] = {
+            'fingerprint': digest,
+            'keyword': keyword,
+            'group': group,
+            'topics': topics,
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self._dirty = True
+
+    def remove(self, filename: str):
+        """删除一条记录"""
+        if self.entries.pop(filename, None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """写入清单（先写临时文件再替换；没有变化时不写）"""
+        if not self._dirty:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def compare(self, tasks: List[Dict], fingerprints: Dict[str, str], topics: str = "") -> Dict:
+        """
+        与当前任务比较，找出需要重新生成的文章和孤立的文章
+
+        清单不存在时（第一次增量生成）已有的文章视为最新，按当前输入记录到清单中。
+        其他主题文件（或旧版清单中没有记录主题文件）的文章不会算作孤立文件。
+
+        Args:
+            tasks: 任务列表（格式见 ArticleGenerator.build_tasks）
+            fingerprints: {文件名: 当前输入指纹}
+            topics: 当前主题文件的标识（topics_key 的返回值）
+
+        Returns:
+            包含 stale（[(任务, 原因)]，原因为 new、changed 或 missing）、up_to_date（文件名集合）、
+            orphans（由同一主题文件生成、但已不在任务中的文件名）、adopted（第一次增量生成时收录的已有文件名）的字典
+        """
+        stale, up_to_date, adopted = [], set(), []
+        for task in tasks:
+            filename = task['filename']
+            entry = self.entries.get(filename)
+            exists = os.path.exists(os.path.join(self.output_dir, filename))
+            if entry is None:
+                if exists and not self.existed:
+                    self.record(filename, fingerprints[filename], task['keyword'], task['group'], topics)
+                    adopted.append(filename)
+                    up_to_date.add(filename)
+                else:
+                    stale.append((task, NEW))
+            elif entry.get('fingerprint') != fingerprints[filename]:
+                stale.append((task, CHANGED))
+            elif not exists:
+                stale.append((task, MISSING))
+            else:
+                up_to_date.add(filename)
+
+        current = {task['filename'] for task in tasks}
+        orphans = [filename for filename, entry in self.entries.items()
+                   if filename not in current and topics and entry.get('topics') == topics]
+        return {'stale': stale, 'up_to_date': up_to_date, 'orphans': orphans, 'adopted': adopted}
+
+
+def stale_counts(changes: Dict) -> Dict[str, int]:
+    """按原因统计需要重新生成的文章数"""
+    counts = {NEW: 0, CHANGED: 0, MISSING: 0}
+    for _, reason in changes['stale']:
+        counts[reason] += 1
+    return counts
+
+
+def describe_changes(changes: Dict) -> str:
+    """
+    一行增量生成的摘要，如 "2 changed, 1 new, 13 up to date, 1 orphaned"
+
+    Args:
+        changes: Manifest.compare 的返回值
+
+    Returns:
+        摘要
+    """
+    counts = stale_counts(changes)
+    parts = [f"{counts[reason]} {reason}" for reason in (CHANGED, NEW, MISSING) if counts[reason]]
+    parts.append(f"{len(changes['up_to_date'])} up to date")
+    if changes['orphans']:
+        parts.append(f"{len(changes['orphans'])} orphaned")
+    return ', '.join(parts)
@@ -0,0 +1,318 @@
+"""
+指标模块
+以 Prometheus 文本格式导出长时间运行（批量生成、HTTP服务）的实时指标：
+按结果统计的请求数、延迟和首token时间直方图、token用量、限流等待时间、流水线队列深度、缓存命中率和每秒文章数。
+
+请求相关的指标来自生成器的进度事件（见 events.py），其余在导出时从生成器的状态中读取。
+可以在本地端口提供 /metrics（METRICS_PORT），或定时写入文件（METRICS_FILE，供 node_exporter 的 textfile 收集器读取）。
+"""
+
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from . import events
+
+PREFIX = 'article_generator'
+
+# 直方图分桶（秒）
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """累计直方图（线程安全由调用方保证）"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """记录一个样本"""
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def lines(self, name: str) -> List[str]:
+        """直方图的导出行（_bucket、_sum、_count）"""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels({"le": _number(bound)})} {cumulative}')
+        lines.append(f'{name}_sum {_number(round(self.total, 6))}')
+        lines.append(f'{name}_count {self.count}')
+        return lines
+
+
+class Metrics:
+    """
+    指标注册表
+
+    创建时订阅生成器的进度事件；render() 在导出时读取生成器的其余状态。
+    """
+
+    def __init__(self, generator):
+        """
+        Args:
+            generator: ArticleGenerator 实例
+        """
+        self.generator = generator
+        self.started = time.time()
+        self.requests: Dict[Tuple[str, str], int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.ttft = Histogram(TTFT_BUCKETS)
+        self.saved = 0
+        self.caches: Dict[str, tuple] = {}
+        self.histograms: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        generator.events.subscribe(self.on_event, kinds=(events.COMPLETED, events.FAILED, events.RETRIED,
+                                                         events.FIRST_TOKEN, events.SAVED))
+
+    def on_event(self, event: events.Event):
+        """记录进度事件"""
+        with self._lock:
+            if event.kind in (events.COMPLETED, events.FAILED, events.RETRIED):
+                key = (event.kind, event.model)
+                self.requests[key] = self.requests.get(key, 0) + 1
+                if event.kind == events.COMPLETED and 'elapsed' in event.data:
+                    self.latency.observe(event.data['elapsed'])
+            elif event.kind == events.FIRST_TOKEN:
+                self.ttft.observe(event.data['ttft'])
+            elif event.kind == events.SAVED:
+                self.saved += 1
+
+    def add_cache(self, name: str, cache, hits: str = 'hits', misses: str = 'misses'):
+        """
+        登记需要统计命中率的缓存
+
+        Args:
+            name: 缓存名称（导出为 cache 标签）
+            cache: 带命中数和未命中数属性的对象（如 ArticleCache、SingleFlight）
+            hits: 命中数的属性名
+            misses: 未命中数的属性名
+        """
+        self.caches[name] = (cache, hits, misses)
+
+    def add_histogram(self, name: str, histogram: Histogram, help_text: str):
+        """
+        登记由其他组件维护的直方图（如界面事件循环延迟）
+
+        Args:
+            name: 指标名称（不含前缀）
+            histogram: 直方图
+            help_text: 指标说明
+        """
+        self.histograms[name] = (histogram, help_text)
+
+    def render(self) -> str:
+        """
+        导出所有指标
+
+        Returns:
+            Prometheus 文本格式
+        """
+        out: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            full = f'{PREFIX}_{name}'
+            out.append(f'# HELP {full} {help_text}')
+            out.append(f'# TYPE {full} {kind}')
+            for labels, value in samples:
+                out.append(f'{full}{_labels(labels)} {_number(value)}')
+
+        generator = self.generator
+        uptime = max(time.time() - self.started, 1e-9)
+        with self._lock:
+            requests = sorted(self.requests.items())
+            latency = list(self.latency.lines(f'{PREFIX}_request_duration_seconds'))
+            ttft = list(self.ttft.lines(f'{PREFIX}_ttft_seconds'))
+            saved = self.saved
+
+        metric('requests_total', 'counter', 'Generation requests by outcome (completed, failed, retried)',
+               [({'outcome': outcome, 'model': model}, count) for (outcome, model), count in requests])
+        out.append(f'# HELP {PREFIX}_request_duration_seconds Time to a finished article, including retries')
+        out.append(f'# TYPE {PREFIX}_request_duration_seconds histogram')
+        out.extend(latency)
+        out.append(f'# HELP {PREFIX}_ttft_seconds Time to first token of streamed articles')
+        out.append(f'# TYPE {PREFIX}_ttft_seconds histogram')
+        out.extend(ttft)
+        for name, (histogram, help_text) in sorted(self.histograms.items()):
+            out.append(f'# HELP {PREFIX}_{name} {help_text}')
+            out.append(f'# TYPE {PREFIX}_{name} histogram')
+            out.extend(histogram.lines(f'{PREFIX}_{name}'))
+
+        budget = generator.budget.summary()
+        metric('tokens_total', 'counter', 'Tokens used',
+               [({'direction': 'in'}, budget['prompt_tokens']), ({'direction': 'out'}, budget['completion_tokens'])])
+        metric('cost_dollars', 'gauge', 'Spend in this run', [({}, budget['run_cost'])])
+
+        limiters = [('global', generator.rate_limiter)]
+        if generator.router:
+            limiters += [(name, model.limiter) for name, model in generator.router.models.items() if model.limiter]
+        metric('ratelimit_wait_seconds_total', 'counter', 'Time spent waiting for the rate limiter',
+               [({'limiter': name}, round(limiter.total_wait, 6)) for name, limiter in limiters])
+
+        pipeline = generator.active_pipeline
+        if pipeline is not None:
+            metric('queue_depth', 'gauge', 'Items waiting in front of each pipeline stage',
+                   [({'stage': stage.name}, stage.inbox.qsize()) for stage in pipeline.stages])
+
+        adaptive = generator.adaptive_limiter
+        if adaptive is not None:
+            state = adaptive.stats()
+            metric('concurrency_limit', 'gauge', 'Adaptive concurrency limit', [({}, state['limit'])])
+            metric('requests_in_flight', 'gauge', 'API requests in flight', [({}, state['in_flight'])])
+
+        ratios = []
+        for name, (cache, hits, misses) in sorted(self.caches.items()):
+            hit, miss = getattr(cache, hits), getattr(cache, misses)
+            ratios.append(({'cache': name}, round(hit / (hit + miss), 6) if hit + miss else 0.0))
+        if ratios:
+            metric('cache_hit_ratio', 'gauge', 'Cache hits / lookups', ratios)
+
+        breaker = generator.circuit_breaker
+        state = breaker.state
+        metric('circuit_state', 'gauge', 'Circuit breaker state (1 for the current state)',
+               [({'state': name}, int(name == state)) for name in (breaker.CLOSED, breaker.OPEN, breaker.HALF_OPEN)])
+        metric('articles_saved_total', 'counter', 'Articles written to disk', [({}, saved)])
+        metric('articles_per_second', 'gauge', 'Articles saved per second since start', [({}, round(saved / uptime, 6))])
+        metric('uptime_seconds', 'gauge', 'Seconds since metrics started', [({}, round(uptime, 3))])
+        return '\n'.join(out) + '\n'
+
+
+class MetricsExporter:
+    """在本地端口提供 /metrics，或定时把指标写入文件"""
+
+    def __init__(self, metrics: Metrics, port: int = 0, host: str = '127.0.0.1',
+                 path: str = '', interval: float = 15.0):
+        """
+        Args:
+            metrics: 指标注册表
+            port: HTTP端口（0 表示不监听）
+            host: 监听地址
+            path: 指标文件路径（空表示不写文件）
+            interval: 写文件的间隔（秒）
+        """
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.path = path
+        self.interval = interval
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, metrics: Metrics, port: Optional[int] = None, path: Optional[str] = None) -> 'MetricsExporter':
+        """
+        按环境变量 METRICS_PORT、METRICS_HOST、METRICS_FILE、METRICS_INTERVAL 创建（参数优先）
+
+        Args:
+            metrics: 指标注册表
+            port: HTTP端口
+            path: 指标文件路径
+
+        Returns:
+            MetricsExporter 实例
+        """
+        return cls(
+            metrics,
+            port=port if port is not None else int(os.getenv('METRICS_PORT', '0') or 0),
+            host=os.getenv('METRICS_HOST', '127.0.0.1'),
+            path=path if path is not None else os.getenv('METRICS_FILE', ''),
+            interval=float(os.getenv('METRICS_INTERVAL', '15')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了端口或文件"""
+        return bool(self.port or self.path)
+
+    def start(self):
+        """
+        启动导出（后台线程）
+
+        Raises:
+            OSError: 端口被占用
+        """
+        if self.port:
+            metrics = self.metrics
+
+            class Handler(BaseHTTPRequestHandler):
+                def log_message(self, format, *args):
+                    pass
+
+                def do_GET(self):
+                    if self.path.split('?')[0] != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = metrics.render().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', CONTENT_TYPE)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+            print(f"📊 Metrics: http://{self.host}:{self._server.server_address[1]}/metrics")
+        if self.path:
+            self._writer = threading.Thread(target=self._write_loop, name='metrics-file', daemon=True)
+            self._writer.start()
+            print(f"📊 Metrics: writing {self.path} every {self.interval:.0f}s")
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        """把当前指标写入文件（先写临时文件再替换，读取方不会读到一半的内容）"""
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.metrics.render())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Cannot write metrics to {self.path}: {e}")
+
+    def stop(self):
+        """停止导出（写文件时最后写入一次）"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._writer is not None:
+            self.write()
+            self._writer = None
@@ -0,0 +1,257 @@
+"""
+流水线模块
+把批量处理拆成由有界队列连接的若干阶段，每个阶段有自己的工作线程数；
+下游处理不过来时队列写满，上游阻塞，背压一直传递到任务源，不会无限读取任务或堆积结果。
+同时统计每个阶段的处理数、忙碌时间、等待输入时间、被下游阻塞的时间和输入队列深度。
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .profiling import NULL_PROFILER
+
+# 队列结束标记
+_DONE = object()
+
+
+def process_context():
+    """
+    进程池使用的 multiprocessing 上下文
+
+    用 forkserver（不支持时用 spawn）启动工作进程：创建进程池时往往已有多个线程（API请求、进度事件），
+    此时 fork 可能把其他线程持有的锁原样复制到子进程中导致死锁。
+
+    Returns:
+        multiprocessing 上下文
+    """
+    return multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+                                       else 'spawn')
+
+
+class StageStats:
+    """单个阶段的统计（线程安全）"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+        self._lock = threading.Lock()
+
+    def sample_depth(self, depth: int):
+        """记录一次输入队列深度（每次入队时采样）"""
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+            self._depth_total += depth
+            self._depth_samples += 1
+
+    def add(self, busy: float = 0.0, starved: float = 0.0, blocked: float = 0.0, items: int = 0):
+        """累加耗时（秒）和处理数"""
+        with self._lock:
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+            self.items += items
+
+    def snapshot(self, elapsed: float) -> Dict:
+        """
+        统计快照
+
+        Args:
+            elapsed: 流水线运行时间（秒），用于计算利用率
+
+        Returns:
+            包含 stage、workers、items、busy_s、starved_s、blocked_s、utilization、queue_max、queue_mean 的字典
+        """
+        with self._lock:
+            capacity = elapsed * self.workers
+            return {
+                'stage': self.name,
+                'workers': self.workers,
+                'items': self.items,
+                'busy_s': round(self.busy, 3),
+                'starved_s': round(self.starved, 3),
+                'blocked_s': round(self.blocked, 3),
+                'utilization': round(self.busy / capacity, 3) if capacity > 0 else 0.0,
+                'queue_max': self.max_depth,
+                'queue_mean': round(self._depth_total / self._depth_samples, 2) if self._depth_samples else 0.0,
+            }
+
+
+class Stage:
+    """流水线阶段"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int, queue_size: int):
+        """
+        Args:
+            name: 阶段名称
+            func: 处理函数，返回值传给下一阶段；返回 None 表示丢弃
+            workers: 工作线程数
+            queue_size: 输入队列容量
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.stats = StageStats(name, self.workers)
+        self.remaining = self.workers
+        self.lock = threading.Lock()
+
+
+class Pipeline:
+    """
+    多阶段流水线
+
+    用法：
+        pipeline = Pipeline()
+        pipeline.add_stage('render', render, workers=1, queue_size=8)
+        pipeline.add_stage('api', call_api, workers=4, queue_size=8)
+        pipeline.add_stage('sink', save, workers=1, queue_size=8)
+        pipeline.run(tasks)
+
+    最后一个阶段的返回值被丢弃。处理函数抛出的异常会停止流水线，并在 run() 结束时重新抛出。
+    """
+
+    def __init__(self, profiler=NULL_PROFILER):
+        """
+        Args:
+            profiler: 性能分析器（每个阶段的处理记录为 stage.<名称>）
+        """
+        self.profiler = profiler
+        self.stages: List[Stage] = []
+        self._stopped = threading.Event()
+        self._errors: List[BaseException] = []
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def add_stage(self, name: str, func: Callable[[Any], Any], workers: int = 1, queue_size: int = 1):
+        """
+        添加阶段（按处理顺序添加）
+
+        Args:
+            name: 阶段名称
+            func: 处理函数
+            workers: 工作线程数
+            queue_size: 输入队列容量
+        """
+        self.stages.append(Stage(name, func, workers, queue_size))
+
+    @property
+    def stopped(self) -> bool:
+        """是否已请求停止"""
+        return self._stopped.is_set()
+
+    def stop(self):
+        """停止从任务源读取新任务（已进入流水线的任务继续处理完）"""
+        self._stopped.set()
+
+    def _put(self, stage: Stage, item, stats: Optional[StageStats] = None):
+        """放入下一阶段的输入队列（队列满时阻塞，阻塞时间计入上游阶段）"""
+        started = time.perf_counter()
+        stage.inbox.put(item)
+        if stats:
+            stats.add(blocked=time.perf_counter() - started)
+        stage.stats.sample_depth(stage.inbox.qsize())
+
+    def _work(self, index: int):
+        """工作线程主循环"""
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        with self.profiler.profile_thread():
+            while True:
+                waited = time.perf_counter()
+                item = stage.inbox.get()
+                started = time.perf_counter()
+                stage.stats.add(starved=started - waited)
+
+                if item is _DONE:
+                    # 让同一阶段的其他线程也能退出，最后一个线程通知下游
+                    stage.inbox.put(_DONE)
+                    with stage.lock:
+                        stage.remaining -= 1
+                        last = stage.remaining == 0
+                    if last and downstream:
+                        downstream.inbox.put(_DONE)
+                    return
+
+                try:
+                    with self.profiler.span(f'stage.{stage.name}'):
+                        output = stage.func(item)
+                except BaseException as e:
+                    self._errors.append(e)
+                    self.stop()
+                    output = None
+                stage.stats.add(busy=time.perf_counter() - started, items=1)
+
+                if output is not None and downstream:
+                    self._put(downstream, output, stage.stats)
+
+    def run(self, source: Iterable):
+        """
+        运行流水线直到所有任务处理完毕（在调用线程中读取任务源）
+
+        Args:
+            source: 任务序列（可以是惰性生成器）
+
+        Raises:
+            处理函数抛出的第一个异常
+        """
+        self._started = time.perf_counter()
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for number in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(index,),
+                                          name=f"{stage.name}-{number}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        first = self.stages[0]
+        try:
+            for item in source:
+                if self.stopped:
+                    break
+                self._put(first, item)
+        finally:
+            first.inbox.put(_DONE)
+            for thread in threads:
+                thread.join()
+            self._finished = time.perf_counter()
+
+        if self._errors:
+            raise self._errors[0]
+
+    def stats(self) -> List[Dict]:
+        """
+        各阶段统计（见 StageStats.snapshot）
+
+        Returns:
+            按阶段顺序排列的统计列表
+        """
+        if self._started is None:
+            return []
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        return [stage.stats.snapshot(elapsed) for stage in self.stages]
+
+
+def print_stats(stats: List[Dict], stream=None):
+    """
+    打印各阶段统计
+
+    Args:
+        stats: Pipeline.stats() 的返回值
+        stream: 输出流（默认标准输出）
+    """
+    print(f"\n{'Stage':<14}{'Workers':>8}{'Items':>7}{'Busy s':>9}{'Util':>7}"
+          f"{'Starved s':>11}{'Blocked s':>11}{'Queue max':>11}{'Queue avg':>11}", file=stream)
+    for entry in stats:
+        print(f"{entry['stage']:<14}{entry['workers']:>8}{entry['items']:>7}{entry['busy_s']:>9.2f}"
+              f"{entry['utilization']:>7.0%}{entry['starved_s']:>11.2f}{entry['blocked_s']:>11.2f}"
+              f"{entry['queue_max']:>11}{entry['queue_mean']:>11.1f}", file=stream)
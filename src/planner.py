@@ -0,0 +1,151 @@
+"""
+运行计划模块
+不调用API，渲染批量任务的全部提示词，在本地估算输入/输出token数、请求数、花费，
+以及在当前限流（RPM/TPM）和并发数下大约需要的时间（plan 子命令）。
+
+每个请求的耗时取自 test_connection.py --benchmark 保存的同一服务和模型的最近结果，没有时使用保守的默认值。
+"""
+
+from typing import Dict, List, Optional
+
+from .benchmark import load_history
+from .tokens import expected_output_tokens, prompt_tokens, tokenizer_name
+
+# 没有基准测试结果时假设的首token时间（秒）和生成速度（tokens/s）
+DEFAULT_TTFT = 1.0
+DEFAULT_TOKENS_PER_S = 30.0
+
+
+def latency_profile(history: List[Dict], base_url: str, model: str, concurrency: int) -> Dict:
+    """
+    一个模型的首token时间和生成速度
+
+    Args:
+        history: 基准测试历史（见 benchmark.load_history）
+        base_url: 服务地址
+        model: 模型名称
+        concurrency: 计划的并发数（取最接近的并发数下的结果）
+
+    Returns:
+        包含 ttft、tokens_per_s、source（benchmark 的时间或 default）的字典
+    """
+    for run in reversed(history):
+        for result in run.get('results', []):
+            if result.get('base_url') != base_url or result.get('model') != model:
+                continue
+            levels = [level for level in result.get('levels', []) if level.get('ok') and level.get('tokens_per_s')]
+            if levels:
+                level = min(levels, key=lambda item: abs(item['concurrency'] - concurrency))
+                return {'ttft': level['ttft_p50'], 'tokens_per_s': level['tokens_per_s'],
+                        'source': f"benchmark {run.get('timestamp', '')} (concurrency {level['concurrency']})"}
+    return {'ttft': DEFAULT_TTFT, 'tokens_per_s': DEFAULT_TOKENS_PER_S, 'source': 'default'}
+
+
+def rate_limited_seconds(requests: int, tokens: int, rpm: float, tpm: float) -> float:
+    """
+    令牌桶限流下发出这些请求至少需要的时间
+
+    RPM 桶开始时只有1个请求的额度，TPM 桶开始时是满的（见 RateLimiter）。
+
+    Args:
+        requests: 请求数
+        tokens: token总数
+        rpm: 每分钟请求数上限（0表示不限）
+        tpm: 每分钟token数上限（0表示不限）
+
+    Returns:
+        秒数
+    """
+    seconds = 0.0
+    if rpm > 0:
+        seconds = max(seconds, max(0, requests - 1) * 60.0 / rpm)
+    if tpm > 0:
+        seconds = max(seconds, max(0, tokens - tpm) * 60.0 / tpm)
+    return seconds
+
+
+def plan_run(generator, tasks: List[Dict], concurrency: int = 1, history: Optional[List[Dict]] = None) -> Dict:
+    """
+    估算一次批量运行
+
+    Args:
+        generator: ArticleGenerator 实例（使用其配置、模型路由、限流器和价格表，不发请求）
+        tasks: 任务列表（格式见 ArticleGenerator.build_tasks）
+        concurrency: 并发数
+        history: 基准测试历史（默认读取 output/benchmarks.jsonl）
+
+    Returns:
+        包含 tasks、requests、input_tokens、output_tokens、cost、groups、models、limiters、wall_s、bottleneck、
+        budget_limit 等字段的字典
+    """
+    settings = generator.settings
+    history = load_history() if history is None else history
+    concurrency = max(1, concurrency)
+    n = settings.candidates
+    output_tokens = expected_output_tokens(settings.article_length, settings.max_tokens)
+
+    groups: Dict[str, Dict] = {}
+    models: Dict[str, Dict] = {}
+    limiters: Dict[int, Dict] = {}
+    for task in tasks:
+        prompt = generator.render_prompt(task['keyword'], task['description'], task['is_subtopic'],
+                                         task['main_keyword'], settings)
+        tokens_in = prompt_tokens(prompt)
+        tokens_out = output_tokens * n
+        group = task.get('group') or ''
+        model = settings.model_name
+        if generator.router:
+            model = generator.router.route(task['is_subtopic'], settings.article_length, group or None, model)
+        cost = generator.budget.cost(model, tokens_in, tokens_out)
+
+        for entry in (groups.setdefault(group, {'group': group}), models.setdefault(model, {'model': model})):
+            entry['requests'] = entry.get('requests', 0) + 1
+            entry['input_tokens'] = entry.get('input_tokens', 0) + tokens_in
+            entry['output_tokens'] = entry.get('output_tokens', 0) + tokens_out
+            entry['cost'] = entry.get('cost', 0.0) + cost
+
+        limiter = generator.router.limiter(model, generator.rate_limiter) if generator.router \
+            else generator.rate_limiter
+        usage = limiters.setdefault(id(limiter), {'rpm': limiter.rpm, 'tpm': limiter.tpm,
+                                                  'requests': 0, 'tokens': 0, 'models': []})
+        usage['requests'] += 1
+        usage['tokens'] += tokens_in + tokens_out
+        if model not in usage['models']:
+            usage['models'].append(model)
+
+    # 并发限制下的耗时：每个请求的耗时之和 / 并发数
+    busy = 0.0
+    for entry in models.values():
+        profile = latency_profile(history, settings.api_base_url, entry['model'], concurrency)
+        entry['latency_s'] = round(profile['ttft'] + output_tokens / profile['tokens_per_s'], 2)
+        entry['latency_source'] = profile['source']
+        entry['cost'] = round(entry['cost'], 6)
+        busy += entry['latency_s'] * entry['requests']
+    concurrency_s = busy / concurrency
+
+    for usage in limiters.values():
+        usage['seconds'] = round(rate_limited_seconds(usage['requests'], usage['tokens'], usage['rpm'], usage['tpm']), 1)
+    rate_s = max((usage['seconds'] for usage in limiters.values()), default=0.0)
+
+    for entry in groups.values():
+        entry['cost'] = round(entry['cost'], 6)
+    total_in = sum(entry['input_tokens'] for entry in groups.values())
+    total_out = sum(entry['output_tokens'] for entry in groups.values())
+    return {
+        'tasks': len(tasks),
+        'requests': len(tasks),
+        'candidates': n,
+        'tokenizer': tokenizer_name(),
+        'input_tokens': total_in,
+        'output_tokens': total_out,
+        'cost': round(sum(entry['cost'] for entry in groups.values()), 6),
+        'budget_limit': generator.budget.run_limit,
+        'concurrency': concurrency,
+        'groups': list(groups.values()),
+        'models': list(models.values()),
+        'limiters': list(limiters.values()),
+        'concurrency_s': round(concurrency_s, 1),
+        'rate_limit_s': round(rate_s, 1),
+        'wall_s': round(max(concurrency_s, rate_s), 1),
+        'bottleneck': 'rate limit' if rate_s > concurrency_s else 'concurrency',
+    }
@@ -0,0 +1,264 @@
+"""
+性能分析模块
+记录生成过程中各阶段的耗时，导出为 Chrome trace-event 格式（可在 chrome://tracing 或 Perfetto 中查看），
+可选同时采集 cProfile 和 tracemalloc 数据
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+
+class NullProfiler:
+    """不做任何记录的分析器（默认使用，开销可以忽略）"""
+
+    enabled = False
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args):
+        yield
+
+    def record(self, name: str, start: float, end: float, **args):
+        pass
+
+    @contextlib.contextmanager
+    def profile_thread(self):
+        yield
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler:
+    """
+    阶段耗时记录器
+
+    span() 可以在任意线程中使用，每个线程在trace中显示为一行。
+    """
+
+    enabled = True
+
+    def __init__(self, cpu: bool = False, memory: bool = False):
+        """
+        Args:
+            cpu: 是否采集 cProfile 数据（每个工作线程单独采集，导出时合并）
+            memory: 是否采集 tracemalloc 快照
+        """
+        self.cpu = cpu
+        self.memory = memory
+        self._origin = time.perf_counter()
+        self._events: List[Dict] = []
+        self._threads: Dict[int, str] = {}
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._memory_start = None
+
+        if memory:
+            tracemalloc.start(10)
+            self._memory_start = tracemalloc.take_snapshot()
+
+    def _tid(self) -> int:
+        thread = threading.current_thread()
+        ident = thread.ident or 0
+        if ident not in self._threads:
+            with self._lock:
+                self._threads.setdefault(ident, thread.name)
+        return ident
+
+    def record(self, name: str, start: float, end: float, **args):
+        """
+        记录一个已结束的阶段
+
+        Args:
+            name: 阶段名称
+            start: 开始时间（time.perf_counter）
+            end: 结束时间（time.perf_counter）
+            **args: 附加信息
+        """
+        event = {
+            'name': name,
+            'cat': name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': round((start - self._origin) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': os.getpid(),
+            'tid': self._tid(),
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self._events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args):
+        """
+        记录代码块的耗时
+
+        Args:
+            name: 阶段名称（点号前的部分作为分类，如 api.completion 的分类为 api）
+            **args: 附加信息
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), **args)
+
+    @contextlib.contextmanager
+    def profile_thread(self):
+        """在当前线程中采集 cProfile 数据（cpu=False 时不做处理）"""
+        if not self.cpu or getattr(self._local, 'profiling', False):
+            yield
+            return
+
+        profile = cProfile.Profile()
+        self._local.profiling = True
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.profiling = False
+            with self._lock:
+                self._profiles.append(profile)
+
+    def http_trace(self, event_name: str, info: Dict):
+        """
+        httpcore 的 trace 回调，记录连接、TLS握手和等待响应头的耗时
+
+        Args:
+            event_name: 事件名称，如 connection.connect_tcp.started
+            info: 事件信息
+        """
+        stage, _, state = event_name.rpartition('.')
+        names = {
+            'connection.connect_tcp': 'http.connect',
+            'connection.start_tls': 'http.tls',
+            'http11.receive_response_headers': 'http.wait_headers',
+            'http2.receive_response_headers': 'http.wait_headers',
+        }
+        if stage not in names:
+            return
+        pending = self._local.__dict__.setdefault('http_pending', {})
+        if state == 'started':
+            pending[stage] = time.perf_counter()
+        elif state in ('complete', 'failed') and stage in pending:
+            self.record(names[stage], pending.pop(stage), time.perf_counter(), status=state)
+
+    def make_http_client(self, timeout: float = 60.0):
+        """
+        创建带阶段追踪的 httpx 客户端（传给 OpenAI(http_client=...)）
+
+        Args:
+            timeout: 请求超时（秒）
+
+        Returns:
+            httpx.Client，httpx 不可用时返回 None
+        """
+        try:
+            import httpx
+        except ImportError:
+            return None
+
+        def add_trace(request):
+            request.extensions['trace'] = self.http_trace
+
+        return httpx.Client(timeout=timeout, event_hooks={'request': [add_trace]})
+
+    def export(self, output_dir: str) -> Dict[str, str]:
+        """
+        导出分析结果
+
+        Args:
+            output_dir: 输出目录
+
+        Returns:
+            {类型: 文件路径}，包含 trace，以及可选的 cprofile 和 memory
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        files = {}
+
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            profiles = list(self._profiles)
+
+        metadata = [{
+            'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}
+        } for tid, name in threads.items()]
+        trace_path = os.path.join(output_dir, f"trace_{stamp}.json")
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        files['trace'] = trace_path
+
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            cprofile_path = os.path.join(output_dir, f"cprofile_{stamp}.prof")
+            stats.dump_stats(cprofile_path)
+            files['cprofile'] = cprofile_path
+
+        if self.memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            memory_path = os.path.join(output_dir, f"memory_{stamp}.txt")
+            current, peak = tracemalloc.get_traced_memory()
+            with open(memory_path, 'w', encoding='utf-8') as f:
+                f.write(f"Current: {current / 1024:.1f} KiB, Peak: {peak / 1024:.1f} KiB\n\n")
+                f.write("Top allocations:\n")
+                for stat in snapshot.statistics('lineno')[:30]:
+                    f.write(f"  {stat}\n")
+                if self._memory_start is not None:
+                    f.write("\nGrowth since start:\n")
+                    for stat in snapshot.compare_to(self._memory_start, 'lineno')[:30]:
+                        f.write(f"  {stat}\n")
+            tracemalloc.stop()
+            files['memory'] = memory_path
+
+        return files
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        按阶段汇总耗时
+
+        Returns:
+            {阶段名称: {count, total_ms, mean_ms, max_ms}}
+        """
+        with self._lock:
+            events = list(self._events)
+        totals: Dict[str, Dict] = {}
+        for event in events:
+            entry = totals.setdefault(event['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            duration = event['dur'] / 1000
+            entry['count'] += 1
+            entry['total_ms'] += duration
+            entry['max_ms'] = max(entry['max_ms'], duration)
+        for entry in totals.values():
+            entry['mean_ms'] = entry['total_ms'] / entry['count']
+        return totals
+
+
+def print_summary(profiler: Profiler, files: Optional[Dict[str, str]] = None, stream=None):
+    """
+    打印各阶段耗时汇总
+
+    Args:
+        profiler: 分析器
+        files: export() 返回的文件路径
+        stream: 输出流（默认标准输出）
+    """
+    summary = profiler.summary()
+    print(f"\n{'Stage':<22}{'Count':>7}{'Total ms':>12}{'Mean ms':>11}{'Max ms':>11}", file=stream)
+    for name, entry in sorted(summary.items(), key=lambda item: -item[1]['total_ms']):
+        print(f"{name:<22}{entry['count']:>7}{entry['total_ms']:>12.1f}{entry['mean_ms']:>11.1f}"
+              f"{entry['max_ms']:>11.1f}", file=stream)
+    for kind, path in (files or {}).items():
+        print(f"📊 {kind}: {path}", file=stream)
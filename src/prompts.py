@@ -3,6 +3,29 @@
 用于生成不同主题的文章提示词
 """
 
+from typing import Dict, List, Tuple
+
+# 模板版本：修改模板内容后加1，增量生成（generate --incremental）会重新生成全部文章
+PROMPT_TEMPLATE_VERSION = 1
+
+# 提示词变体（用于 experiment 子命令比较，生成文章始终使用 default）：
+#   default  当前模板，整段作为一条 user 消息
+#   compact  当前模板去掉格式示例
+#   minimal  精简改写的要求
+#   system   当前模板拆成 system 消息（固定的要求和示例）和 user 消息（主题）
+PROMPT_VARIANTS = ('default', 'compact', 'minimal', 'system')
+
+REQUIREMENTS_MARKER = "IMPORTANT REQUIREMENTS:"
+EXAMPLE_MARKER = "Example format"
+CLOSING = "Now write your essay:"
+
+MINIMAL_REQUIREMENTS = """Requirements:
+- First line: a title (no "Title:" label), then a blank line, then 2-4 paragraphs separated by blank lines
+- Introduce the topic, develop it with specific examples, end with a conclusion
+- CET-6 vocabulary, varied sentence structures, transitional words (however, moreover, for instance)
+- No section labels, no Chinese characters, no meta-commentary"""
+
+
 def generate_prompt(keyword: str, description: str, word_count: int = 200) -> str:
     """
     生成文章提示词
@@ -114,3 +137,56 @@ Now write your essay:"""
 
     return prompt
 
+
+def split_prompt(prompt: str) -> Tuple[str, str]:
+    """
+    把模板生成的提示词拆成主题部分和要求部分（要求部分包括格式示例，不包括结尾的指令）
+
+    Args:
+        prompt: generate_prompt 或 generate_subtopic_prompt 的结果
+
+    Returns:
+        (主题部分, 要求部分)
+    """
+    head, _, rest = prompt.partition(REQUIREMENTS_MARKER)
+    requirements = REQUIREMENTS_MARKER + rest.rsplit(CLOSING, 1)[0]
+    return head.strip(), requirements.strip()
+
+
+def build_messages(variant: str, keyword: str, description: str = "", is_subtopic: bool = False,
+                   main_keyword: str = "", word_count: int = 200) -> List[Dict[str, str]]:
+    """
+    按变体生成请求消息
+
+    Args:
+        variant: 变体名称（见 PROMPT_VARIANTS）
+        keyword: 主题关键词
+        description: 主题描述
+        is_subtopic: 是否为子主题
+        main_keyword: 主主题关键词（仅当is_subtopic=True时使用）
+        word_count: 目标字数
+
+    Returns:
+        chat.completions 的 messages
+
+    Raises:
+        ValueError: 未知的变体
+    """
+    if variant not in PROMPT_VARIANTS:
+        raise ValueError(f"Unknown prompt variant: {variant} (choose from {', '.join(PROMPT_VARIANTS)})")
+    if is_subtopic and main_keyword:
+        prompt = generate_subtopic_prompt(main_keyword, keyword, word_count)
+    else:
+        prompt = generate_prompt(keyword, description, word_count)
+    if variant == 'default':
+        return [{"role": "user", "content": prompt}]
+
+    head, requirements = split_prompt(prompt)
+    if variant == 'system':
+        return [{"role": "system", "content": requirements},
+                {"role": "user", "content": f"{head}\n\n{CLOSING}"}]
+    if variant == 'compact':
+        requirements = requirements.split(EXAMPLE_MARKER, 1)[0].strip()
+    else:
+        requirements = MINIMAL_REQUIREMENTS
+    return [{"role": "user", "content": f"{head}\n\n{requirements}\n\n{CLOSING}"}]
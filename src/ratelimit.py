@@ -0,0 +1,118 @@
+"""
+限流模块
+基于令牌桶同时限制每分钟请求数（RPM）和每分钟token数（TPM），供多个线程共享
+"""
+
+import os
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    令牌桶限流器
+
+    两个桶分别按 rpm/60 和 tpm/60 的速度补充，容量等于一分钟的额度。
+    acquire() 会阻塞直到两个桶都有足够余量。
+    """
+
+    def __init__(self, rpm: float = 60.0, tpm: float = 0.0):
+        """
+        Args:
+            rpm: 每分钟请求数上限（0表示不限）
+            tpm: 每分钟token数上限（0表示不限）
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(min(rpm, 1.0)) if rpm > 0 else 0.0
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'RateLimiter':
+        """
+        从环境变量 RATE_LIMIT_RPM / RATE_LIMIT_TPM 创建限流器
+
+        Returns:
+            RateLimiter 实例
+        """
+        return cls(
+            rpm=float(os.getenv('RATE_LIMIT_RPM', '60')),
+            tpm=float(os.getenv('RATE_LIMIT_TPM', '0'))
+        )
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm > 0:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm > 0:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def _wait_time(self, tokens: int) -> float:
+        """当前还需等待多少秒才能满足请求（调用方需持有锁）"""
+        wait = 0.0
+        if self.rpm > 0 and self._requests < 1.0:
+            wait = max(wait, (1.0 - self._requests) * 60.0 / self.rpm)
+        if self.tpm > 0:
+            # 单次请求超过桶容量时只要求桶满
+            needed = min(tokens, self.tpm)
+            if self._tokens < needed:
+                wait = max(wait, (needed - self._tokens) * 60.0 / self.tpm)
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        获取一次请求的配额，必要时阻塞等待
+
+        Args:
+            tokens: 本次请求预计消耗的token数
+
+        Returns:
+            实际等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                wait = self._wait_time(tokens)
+                if wait <= 0:
+                    if self.rpm > 0:
+                        self._requests -= 1.0
+                    if self.tpm > 0:
+                        self._tokens -= tokens
+                    self.total_wait += waited
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def has_capacity(self, tokens: int = 0) -> bool:
+        """
+        当前是否可以立即发出请求（不消耗配额）
+
+        供后台低优先级任务使用：只在有空闲配额时才发请求，不与前台请求排队竞争。
+
+        Args:
+            tokens: 本次请求预计消耗的token数
+
+        Returns:
+            是否有空闲配额
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._wait_time(tokens) <= 0
+
+    def adjust(self, estimated_tokens: int, actual_tokens: int):
+        """
+        用实际token数修正预估值
+
+        Args:
+            estimated_tokens: acquire() 时使用的预估值
+            actual_tokens: 响应中的实际token数
+        """
+        if self.tpm <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.tpm, self._tokens + estimated_tokens - actual_tokens)
@@ -0,0 +1,194 @@
+"""
+容错模块
+提供带抖动的指数退避重试策略和断路器
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+from .errors import (
+    CircuitOpenError,
+    DeadlineExceededError,
+    GenerationError,
+    RateLimitedError,
+    classify_error,
+)
+
+T = TypeVar('T')
+
+
+class CircuitBreaker:
+    """
+    断路器
+
+    连续失败达到阈值后打开，打开期间所有请求立即失败；
+    冷却时间过后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        """
+        Args:
+            failure_threshold: 连续失败多少次后打开断路器
+            reset_timeout: 打开后多少秒进入半开状态
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """当前状态"""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self):
+        """
+        请求前检查，断路器打开时抛出 CircuitOpenError
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            remaining = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(
+                f"Circuit breaker is open after {self._failures} consecutive failures",
+                f"API端点连续失败，已暂停请求，约 {remaining:.0f} 秒后自动重试"
+            )
+
+    def record_success(self):
+        """记录一次成功"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """记录一次失败"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    只重试临时错误，使用"全抖动"指数退避：第n次重试前等待 uniform(0, min(max_delay, base * 2^n)) 秒，
+    并且所有尝试加上等待时间不超过单条任务的总时限。
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 deadline: float = 180.0, attempt_timeout: float = 60.0):
+        """
+        Args:
+            max_retries: 最大重试次数（不含首次请求）
+            base_delay: 退避基数（秒）
+            max_delay: 单次等待上限（秒）
+            deadline: 单条任务总时限（秒）
+            attempt_timeout: 单次请求超时（秒）
+        """
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+
+    def backoff(self, attempt: int) -> float:
+        """
+        计算第 attempt 次重试前的等待时间
+
+        Args:
+            attempt: 重试序号（从0开始）
+
+        Returns:
+            等待秒数
+        """
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def call(self, func: Callable[[float], T], breaker: Optional[CircuitBreaker] = None,
+             model_name: str = "",
+             on_retry: Optional[Callable[[int, float, GenerationError], None]] = None) -> T:
+        """
+        按策略执行调用
+
+        Args:
+            func: 实际调用，参数为本次尝试的超时秒数
+            breaker: 断路器（可选）
+            model_name: 模型名称（用于错误提示）
+            on_retry: 重试回调，参数为 (重试序号, 等待秒数, 错误)
+
+        Returns:
+            func 的返回值
+
+        Raises:
+            GenerationError: 永久错误、重试耗尽或超过总时限
+        """
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+
+        while True:
+            if breaker:
+                breaker.before_call()
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"Request deadline of {self.deadline:.0f}s exceeded")
+
+            try:
+                result = func(min(self.attempt_timeout, remaining))
+            except Exception as e:
+                error = classify_error(e, model_name)
+                if breaker:
+                    # 永久错误说明端点仍有响应，不计入断路器失败次数
+                    if error.retryable:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if not error.retryable or attempt >= self.max_retries:
+                    if error is e:
+                        raise
+                    raise error from e
+
+                delay = self.backoff(attempt)
+                if isinstance(error, RateLimitedError) and error.retry_after:
+                    delay = max(delay, error.retry_after)
+                if time.monotonic() + delay >= deadline_at:
+                    raise DeadlineExceededError(
+                        f"Request deadline of {self.deadline:.0f}s exceeded after {attempt + 1} attempts: "
+                        f"{error.message}",
+                        error.hint,
+                        e
+                    ) from e
+
+                if on_retry:
+                    on_retry(attempt + 1, delay, error)
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if breaker:
+                breaker.record_success()
+            return result
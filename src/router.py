@@ -0,0 +1,328 @@
+"""
+模型路由模块
+按规则把每个请求分配到分层模型池中的某个模型（如子主题、短文章用小模型，主主题用大模型），
+每个模型有自己的并发上限和限流器；开启自适应后根据观察到的延迟和格式检查通过率在同层模型间选择，
+某一层的模型通过率过低时自动升级到下一层。
+
+模型池配置在 config/models.json（见 config/models.example.json），文件不存在时所有请求使用 MODEL_NAME。
+"""
+
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .ratelimit import RateLimiter
+
+DEFAULT_POOL_FILE = os.path.join('config', 'models.json')
+
+# 延迟、通过率和失败率的指数移动平均系数
+EWMA_ALPHA = 0.2
+# 没有成功过的模型最多按零成本试用的请求数，之后视为无限慢（直到成功一次）
+UNTRIED_PROBES = 2
+
+
+class PooledModel:
+    """模型池中的一个模型及其运行统计"""
+
+    def __init__(self, name: str, tier: str, concurrency: int = 4, rpm: float = 0.0, tpm: float = 0.0):
+        """
+        Args:
+            name: 模型名称
+            tier: 所属层级
+            concurrency: 同时进行的请求数上限
+            rpm: 该模型的每分钟请求数上限（rpm 和 tpm 都为0时使用全局限流器）
+            tpm: 该模型的每分钟token数上限
+        """
+        self.name = name
+        self.tier = tier
+        self.concurrency = max(1, concurrency)
+        self.semaphore = threading.BoundedSemaphore(self.concurrency)
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm) if rpm > 0 or tpm > 0 else None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.latency: Optional[float] = None
+        self.pass_rate = 1.0
+        self.quality_samples = 0
+        self.failure_rate = 0.0
+        self.last_used = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        """统计快照"""
+        return {
+            'model': self.name,
+            'tier': self.tier,
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'latency_s': round(self.latency, 3) if self.latency is not None else None,
+            'pass_rate': round(self.pass_rate, 3),
+            'quality_samples': self.quality_samples,
+            'failure_rate': round(self.failure_rate, 3),
+        }
+
+
+class ModelRouter:
+    """
+    分层模型路由器
+
+    规则按顺序匹配，第一条匹配的规则决定首选层级；层级的顺序即模型在配置中首次出现的顺序（从小到大）。
+    """
+
+    def __init__(self, models: List[PooledModel], rules: List[Dict], adaptive: bool = True,
+                 min_pass_rate: float = 0.7, min_samples: int = 5, probe_interval: float = 120.0):
+        """
+        Args:
+            models: 模型列表
+            rules: 路由规则，每条为 {"when": {条件}, "tier": 层级}，条件可以是
+                   is_subtopic（布尔）、max_length / min_length（目标字数）、group（主题组）
+            adaptive: 是否根据延迟和通过率自适应选择
+            min_pass_rate: 通过率或请求成功率低于该值（且样本数足够）的模型不再被选中，整层都不达标时升级到下一层
+            min_samples: 判断通过率所需的最少样本数
+            probe_interval: 被排除的模型经过多少秒后重新试用一次（用于恢复）
+
+        Raises:
+            ValueError: 配置无效
+        """
+        if not models:
+            raise ValueError("Model pool is empty")
+        self.models: Dict[str, PooledModel] = {model.name: model for model in models}
+        self.tiers: List[str] = list(dict.fromkeys(model.tier for model in models))
+        for rule in rules:
+            if rule.get('tier') not in self.tiers:
+                raise ValueError(f"Unknown tier in routing rule: {rule.get('tier')}")
+        self.rules = rules
+        self.adaptive = adaptive
+        self.min_pass_rate = min_pass_rate
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ModelRouter':
+        """
+        从JSON配置文件创建路由器
+
+        Args:
+            path: 配置文件路径
+
+        Returns:
+            ModelRouter 实例
+
+        Raises:
+            OSError: 文件无法读取
+            ValueError: 配置无效
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        try:
+            models = [PooledModel(entry['name'], entry['tier'], int(entry.get('concurrency', 4)),
+                                  float(entry.get('rpm', 0)), float(entry.get('tpm', 0)))
+                      for entry in config['models']]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid model entry in {path}: {e}") from e
+        return cls(
+            models,
+            config.get('rules', []),
+            adaptive=bool(config.get('adaptive', True)),
+            min_pass_rate=float(config.get('min_pass_rate', 0.7)),
+            min_samples=int(config.get('min_samples', 5)),
+            probe_interval=float(config.get('probe_interval', 120)),
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional['ModelRouter']:
+        """
+        从 MODEL_POOL_FILE（默认 config/models.json）创建路由器
+
+        Returns:
+            ModelRouter 实例，文件不存在时返回 None
+
+        Raises:
+            ValueError: 配置无效
+        """
+        path = os.getenv('MODEL_POOL_FILE', DEFAULT_POOL_FILE)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls.from_file(path)
+        except OSError as e:
+            raise ValueError(f"Cannot read model pool {path}: {e}") from e
+
+    @staticmethod
+    def _matches(condition: Dict, is_subtopic: bool, article_length: int, group: Optional[str]) -> bool:
+        if 'is_subtopic' in condition and bool(condition['is_subtopic']) != is_subtopic:
+            return False
+        if 'max_length' in condition and article_length > condition['max_length']:
+            return False
+        if 'min_length' in condition and article_length < condition['min_length']:
+            return False
+        if 'group' in condition and condition['group'] != group:
+            return False
+        return True
+
+    def _eligible(self, model: PooledModel, now: float) -> bool:
+        """通过率和请求成功率是否达标（不达标的模型每隔 probe_interval 秒仍允许试用一次）"""
+        if not self.adaptive:
+            return True
+        failing = model.requests >= self.min_samples and 1 - model.failure_rate < self.min_pass_rate
+        low_quality = model.quality_samples >= self.min_samples and model.pass_rate < self.min_pass_rate
+        if not failing and not low_quality:
+            return True
+        return now - model.last_used >= self.probe_interval
+
+    def _cost(self, model: PooledModel, now: float) -> float:
+        """
+        预计等待时间：延迟 × 排队程度 ÷ 通过率 ÷ 成功率
+
+        没有成功过的模型在前 UNTRIED_PROBES 次请求内按零延迟优先试用，之后成本为无穷大，
+        只在每隔 probe_interval 秒时再试用一次。
+        """
+        if model.latency is not None:
+            latency = model.latency
+        elif model.requests < UNTRIED_PROBES or now - model.last_used >= self.probe_interval:
+            latency = 0.0
+        else:
+            return math.inf
+        return latency * (1 + model.in_flight / model.concurrency) / max(model.pass_rate, 0.1) \
+            / max(1 - model.failure_rate, 0.1)
+
+    def tier(self, is_subtopic: bool = False, article_length: int = 200, group: Optional[str] = None) -> Optional[str]:
+        """
+        路由规则为一个请求选择的层级（没有规则匹配时返回 None）
+
+        Args:
+            is_subtopic: 是否为子主题
+            article_length: 目标字数
+            group: 所属主题组
+
+        Returns:
+            层级名称
+        """
+        return next((rule['tier'] for rule in self.rules
+                     if self._matches(rule.get('when', {}), is_subtopic, article_length, group)), None)
+
+    def tier_models(self, tier: Optional[str]) -> List[str]:
+        """层级中的模型名称（tier 为 None 时使用第一个层级）"""
+        tier = tier or self.tiers[0]
+        return sorted(model.name for model in self.models.values() if model.tier == tier)
+
+    def route(self, is_subtopic: bool = False, article_length: int = 200, group: Optional[str] = None,
+              default: Optional[str] = None) -> str:
+        """
+        为一个请求选择模型
+
+        Args:
+            is_subtopic: 是否为子主题
+            article_length: 目标字数
+            group: 所属主题组
+            default: 没有规则匹配时使用的模型
+
+        Returns:
+            模型名称
+        """
+        tier = self.tier(is_subtopic, article_length, group)
+        if tier is None and default:
+            return default
+        start = self.tiers.index(tier) if tier else 0
+
+        now = time.monotonic()
+        with self._lock:
+            for candidate_tier in self.tiers[start:]:
+                models = [model for model in self.models.values()
+                          if model.tier == candidate_tier and self._eligible(model, now)]
+                if models:
+                    chosen = min(models, key=lambda model: self._cost(model, now)) if self.adaptive else \
+                        min(models, key=lambda model: model.in_flight / model.concurrency)
+                    chosen.last_used = now
+                    return chosen.name
+        # 所有层级都不达标时仍使用首选层级中通过率最高的模型
+        return max((model for model in self.models.values() if model.tier == self.tiers[start]),
+                   key=lambda model: model.pass_rate).name
+
+    def limiter(self, model: str, default: RateLimiter) -> RateLimiter:
+        """
+        模型对应的限流器
+
+        Args:
+            model: 模型名称
+            default: 模型没有单独限流配置（或不在池中）时使用的限流器
+
+        Returns:
+            限流器
+        """
+        pooled = self.models.get(model)
+        return pooled.limiter if pooled and pooled.limiter else default
+
+    @contextlib.contextmanager
+    def slot(self, model: str):
+        """
+        占用模型的一个并发名额（不在池中的模型不限制）
+
+        Args:
+            model: 模型名称
+        """
+        pooled = self.models.get(model)
+        if pooled is None:
+            yield
+            return
+        with pooled.semaphore:
+            with self._lock:
+                pooled.in_flight += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    pooled.in_flight -= 1
+
+    def record_latency(self, model: str, seconds: Optional[float]):
+        """
+        记录一次请求的结果
+
+        Args:
+            model: 模型名称
+            seconds: 请求耗时（失败时为 None）
+        """
+        pooled = self.models.get(model)
+        if pooled is None:
+            return
+        with self._lock:
+            pooled.requests += 1
+            pooled.failure_rate += EWMA_ALPHA * ((1.0 if seconds is None else 0.0) - pooled.failure_rate)
+            if seconds is None:
+                pooled.failures += 1
+            elif pooled.latency is None:
+                pooled.latency = seconds
+            else:
+                pooled.latency += EWMA_ALPHA * (seconds - pooled.latency)
+
+    def record_quality(self, model: str, passed: bool):
+        """
+        记录生成的文章是否通过格式检查
+
+        Args:
+            model: 模型名称
+            passed: 是否通过
+        """
+        pooled = self.models.get(model)
+        if pooled is None:
+            return
+        with self._lock:
+            pooled.quality_samples += 1
+            pooled.pass_rate += EWMA_ALPHA * ((1.0 if passed else 0.0) - pooled.pass_rate)
+
+    def stats(self) -> List[Dict]:
+        """
+        各模型的统计
+
+        Returns:
+            每个模型一项，包含 model、tier、concurrency、in_flight、requests、failures、latency_s、pass_rate、
+            quality_samples、failure_rate
+        """
+        with self._lock:
+            return [model.snapshot() for model in self.models.values()]
@@ -0,0 +1,56 @@
+"""
+任务调度模块
+决定批量生成时任务进入流水线的顺序。
+
+子主题的提示词只用到上级主题的关键词，不依赖上级主题生成的文章，因此主题和各级子主题可以同时生成，
+调度只需要决定顺序：
+- 按组调度：一组的任务全部发出后才开始下一组，尽早得到完整的一组文章
+- 组之间先按 topics.json 中的 priority（越大越先）排序，再按预计token数从少到多（短作业优先），
+  子主题很多的大组排在后面，不会拖慢其他组
+- 组内按预计token数从多到少发出，长任务先开始，最后同时结束的都是短任务，整组完成得更早
+"""
+
+from typing import Callable, Dict, List
+
+
+def order_tasks(tasks: List[Dict], estimate: Callable[[Dict], int]) -> List[Dict]:
+    """
+    按调度策略排列任务
+
+    Args:
+        tasks: 任务列表（格式见 ArticleGenerator.build_tasks，可以带 priority 字段）
+        estimate: 估算单个任务token数的函数
+
+    Returns:
+        排好序的新列表（相同预计token数的任务保持原来的相对顺序）
+    """
+    groups: Dict[str, List[tuple]] = {}
+    for index, task in enumerate(tasks):
+        groups.setdefault(task.get('group') or '', []).append((estimate(task), index, task))
+
+    def group_key(item):
+        name, members = item
+        priority = max(task.get('priority', 0) for _, _, task in members)
+        return -priority, sum(tokens for tokens, _, _ in members), members[0][1]
+
+    ordered = []
+    for _, members in sorted(groups.items(), key=group_key):
+        ordered.extend(task for _, _, task in sorted(members, key=lambda member: (-member[0], member[1])))
+    return ordered
+
+
+def group_sizes(tasks: List[Dict]) -> Dict[str, int]:
+    """
+    每组的任务数（用于判断一组是否已全部完成）
+
+    Args:
+        tasks: 任务列表
+
+    Returns:
+        {组名: 任务数}
+    """
+    sizes: Dict[str, int] = {}
+    for task in tasks:
+        group = task.get('group') or ''
+        sizes[group] = sizes.get(group, 0) + 1
+    return sizes
@@ -0,0 +1,293 @@
+"""
+文章评分模块
+在本地快速检查文章格式并打分，用于从多个候选文章中选出最好的一篇；
+并计算 MinHash 签名，用于发现批量生成中内容几乎相同的文章
+"""
+
+import random
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .analyzer import WORD_PATTERN, analyze_articles
+from .storage import normalize_article
+
+# 提示词中禁止出现的标签
+FORBIDDEN_LABELS = re.compile(r'^\s*(title|introduction|body|conclusion)\s*:', re.IGNORECASE | re.MULTILINE)
+CHINESE_CHARS = re.compile(r'[\u4e00-\u9fff]')
+
+# MinHash 签名长度；签名按每段 SIGNATURE_ROWS 个值分段，任意一段相同的文章才进一步比较
+SIGNATURE_SIZE = 32
+SIGNATURE_ROWS = 4
+# 估计的 Jaccard 相似度达到该值时视为近似重复
+DUPLICATE_THRESHOLD = 0.8
+_PRIME = (1 << 61) - 1
+# 固定种子，保证不同进程计算的签名一致（a、b 从同一个随机序列依次取出，互不相关）
+_RANDOM = random.Random(SIGNATURE_SIZE)
+_PERMUTATIONS = [(_RANDOM.randrange(1, _PRIME), _RANDOM.randrange(_PRIME)) for _ in range(SIGNATURE_SIZE)]
+del _RANDOM
+
+# 各项得分的权重
+WEIGHTS = {
+    'format': 0.35,
+    'length': 0.25,
+    'vocabulary': 0.2,
+    'diversity': 0.2,
+}
+
+
+def split_paragraphs(article: str) -> List[str]:
+    """
+    按空行切分段落
+
+    Args:
+        article: 文章内容
+
+    Returns:
+        段落列表（第一项为标题）
+    """
+    return [block.strip() for block in re.split(r'\n\s*\n', article.strip()) if block.strip()]
+
+
+def validate_article(article: str) -> List[str]:
+    """
+    检查文章是否符合提示词中的格式要求
+
+    Args:
+        article: 文章内容
+
+    Returns:
+        问题列表（为空表示通过）
+    """
+    issues = []
+    blocks = split_paragraphs(article)
+    if not blocks:
+        return ['empty article']
+
+    title = blocks[0]
+    if '\n' in title or len(title.split()) > 15:
+        issues.append('first block is not a one-line title')
+    if title.endswith('.'):
+        issues.append('title ends with a period')
+
+    paragraphs = len(blocks) - 1
+    if paragraphs < 2 or paragraphs > 4:
+        issues.append(f'{paragraphs} paragraph(s), expected 2-4')
+    if FORBIDDEN_LABELS.search(article):
+        issues.append('contains section labels')
+    if CHINESE_CHARS.search(article):
+        issues.append('contains Chinese characters')
+    return issues
+
+
+def words(text: str) -> List[str]:
+    """
+    提取英文单词（小写）
+
+    Args:
+        text: 文本
+
+    Returns:
+        单词列表
+    """
+    return [word.lower() for word in WORD_PATTERN.findall(text)]
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """
+    计算单词级 n-gram 集合，用于比较文章相似度
+
+    Args:
+        text: 文本
+        size: n-gram 长度
+
+    Returns:
+        n-gram 集合
+    """
+    tokens = words(text)
+    return {' '.join(tokens[i:i + size]) for i in range(max(0, len(tokens) - size + 1))}
+
+
+def length_score(word_count: int, target_length: int) -> float:
+    """字数越接近目标得分越高，偏差达到目标字数一半时为0"""
+    if target_length <= 0:
+        return 1.0
+    return max(0.0, 1.0 - abs(word_count - target_length) / (target_length * 0.5))
+
+
+def vocabulary_score(article: str) -> float:
+    """
+    词汇水平得分：CET-6 词汇使用情况和过渡词数量（见 analyzer 模块）
+
+    Args:
+        article: 文章内容
+
+    Returns:
+        0到1之间的得分
+    """
+    report = analyze_articles([article])[0]
+    if not report['tokens']:
+        return 0.0
+    # 一篇200词左右的六级作文通常用到6个以上不同的六级词，四六级词汇合计约占20%
+    cet6_score = min(1.0, report['cet6_types'] / 6)
+    coverage_score = min(1.0, (report['coverage']['cet4'] + report['coverage']['cet6']) / 0.2)
+
+    transition_score = min(1.0, len(report['transition_words']) / 3)
+    return 0.35 * cet6_score + 0.25 * coverage_score + 0.4 * transition_score
+
+
+def diversity_score(article: str, previous: Iterable[str]) -> float:
+    """
+    与已生成文章的差异度（1减去最大 Jaccard 相似度）
+
+    Args:
+        article: 文章内容
+        previous: 之前生成的文章
+
+    Returns:
+        0到1之间的得分
+    """
+    current = shingles(article)
+    if not current:
+        return 0.0
+    highest = 0.0
+    for text in previous:
+        other = shingles(text)
+        if other:
+            highest = max(highest, len(current & other) / len(current | other))
+    return 1.0 - highest
+
+
+def score_article(article: str, target_length: int, previous: Iterable[str] = ()) -> Dict:
+    """
+    综合评分
+
+    Args:
+        article: 文章内容
+        target_length: 目标字数
+        previous: 之前生成的文章（用于计算差异度）
+
+    Returns:
+        包含 score（总分）、各项得分、word_count 和 issues 的字典
+    """
+    issues = validate_article(article)
+    blocks = split_paragraphs(article)
+    body = '\n\n'.join(blocks[1:]) if len(blocks) > 1 else article
+    word_count = len(body.split())
+
+    parts = {
+        'format': max(0.0, 1.0 - 0.34 * len(issues)),
+        'length': length_score(word_count, target_length),
+        'vocabulary': vocabulary_score(article),
+        'diversity': diversity_score(article, previous),
+    }
+    total = sum(WEIGHTS[name] * value for name, value in parts.items())
+
+    return {
+        'score': round(total, 4),
+        **{name: round(value, 4) for name, value in parts.items()},
+        'word_count': word_count,
+        'issues': issues,
+    }
+
+
+def signature(article: str) -> Tuple[int, ...]:
+    """
+    计算文章的 MinHash 签名（基于单词 3-gram）
+
+    Args:
+        article: 文章内容
+
+    Returns:
+        长度为 SIGNATURE_SIZE 的整数元组（文章没有单词时为空元组）
+    """
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(article)]
+    if not hashes:
+        return ()
+    return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in _PERMUTATIONS)
+
+
+def signature_similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """由两个签名估计 Jaccard 相似度"""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+class SignatureIndex:
+    """
+    近似重复检测（MinHash + LSH 分段）
+
+    只与至少有一段签名完全相同的文章比较，不需要两两比较整个批次。不是线程安全的。
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        """
+        Args:
+            threshold: 视为近似重复的相似度
+        """
+        self.threshold = threshold
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._bands: Dict[Tuple, List[str]] = {}
+
+    def add(self, name: str, article_signature: Tuple[int, ...]) -> Optional[Tuple[str, float]]:
+        """
+        加入一篇文章，并返回与之最相似的已有文章
+
+        Args:
+            name: 文章名称（如文件名）
+            article_signature: signature() 的返回值
+
+        Returns:
+            (已有文章名称, 相似度)，没有达到阈值的文章时返回 None
+        """
+        if not article_signature:
+            return None
+        bands = [(start, article_signature[start:start + SIGNATURE_ROWS])
+                 for start in range(0, len(article_signature), SIGNATURE_ROWS)]
+        candidates = {other for band in bands for other in self._bands.get(band, ()) if other != name}
+
+        best = None
+        for other in candidates:
+            similarity = signature_similarity(article_signature, self._signatures[other])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (other, similarity)
+
+        if name not in self._signatures:
+            for band in bands:
+                self._bands.setdefault(band, []).append(name)
+        self._signatures[name] = article_signature
+        return best
+
+
+def postprocess_article(contents: List[str], target_length: int, previous: Iterable[str] = ()) -> Dict:
+    """
+    生成后的本地处理：整理格式、检查、评分、选出最好的候选并计算去重签名
+
+    只做计算、不访问共享状态，可以在进程池中运行。
+
+    Args:
+        contents: API 返回的一篇或多篇候选文章
+        target_length: 目标字数
+        previous: 最近生成的文章（用于计算差异度）
+
+    Returns:
+        包含 article、score、issues、word_count、candidates、alternates（未被选中的候选）和 signature 的字典
+    """
+    previous = list(previous)
+    ranked = sorted(
+        ({'article': article, **score_article(article, target_length, previous)}
+         for article in map(normalize_article, contents)),
+        key=lambda candidate: candidate['score'],
+        reverse=True
+    )
+    best = ranked[0]
+    return {
+        'article': best['article'],
+        'score': best['score'],
+        'issues': best['issues'],
+        'word_count': best['word_count'],
+        'candidates': len(ranked),
+        'alternates': [candidate['article'] for candidate in ranked[1:]],
+        'signature': signature(best['article']),
+    }
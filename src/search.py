@@ -0,0 +1,388 @@
+"""
+全文搜索模块
+为已生成的文章维护磁盘倒排索引（词元 -> 文章列表），保存文章时增量更新，查询按 BM25 排序
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from .analyzer import WORD_PATTERN, get_wordlist
+from .history import scan_articles
+from .storage import read_article
+
+INDEX_NAME = '.search_index.sqlite'
+
+# 不写入索引的常见词
+STOPWORDS = frozenset((
+    'a', 'an', 'the', 'and', 'or', 'but', 'of', 'to', 'in', 'on', 'at', 'by', 'for', 'with', 'from',
+    'as', 'is', 'are', 'was', 'were', 'be', 'been', 'it', 'its', 'this', 'that', 'these', 'those',
+    'we', 'they', 'their', 'our', 'you', 'your', 'he', 'she', 'his', 'her', 'them', 'i', 'not',
+    'can', 'will', 'would', 'should', 'may', 'might', 'do', 'does', 'did', 'have', 'has', 'had',
+    'which', 'who', 'what', 'when', 'where', 'how', 'than', 'so', 'if', 'into', 'also', 'such',
+))
+# 查询中额外忽略的词（如"articles mentioning eye contact"中的 articles、mentioning）
+QUERY_STOPWORDS = STOPWORDS | frozenset((
+    'article', 'articles', 'essay', 'essays', 'mention', 'mentions', 'mentioning', 'about',
+    'discuss', 'discussing', 'find', 'show',
+))
+
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+# 查询中相邻两个词在文章中以短语出现时的加分
+PHRASE_BONUS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    topic TEXT NOT NULL,
+    title TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    words INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+"""
+
+
+def open_index(output_dir: str = "output") -> Optional['SearchIndex']:
+    """
+    打开文章目录的搜索索引（SEARCH_INDEX_ENABLED=false 或无法打开时返回 None）
+
+    Args:
+        output_dir: 文章目录
+
+    Returns:
+        SearchIndex 实例或 None
+    """
+    if os.getenv('SEARCH_INDEX_ENABLED', 'true').lower() in ('0', 'false', 'no', 'off'):
+        return None
+    try:
+        return SearchIndex(output_dir)
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠️  Search index unavailable: {e}")
+        return None
+
+
+def index_saved(index: Optional['SearchIndex'], filepath: str, keyword: str, article: str):
+    """
+    索引刚保存的文章（索引出错只打印警告，不影响文章保存）
+
+    Args:
+        index: 搜索索引（为 None 时不做处理）
+        filepath: 文章文件路径
+        keyword: 主题关键词
+        article: 文章内容
+    """
+    if index is None:
+        return
+    try:
+        index.add(filepath, keyword, article)
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠️  Cannot update search index: {e}")
+
+
+def terms(text: str, stopwords=STOPWORDS) -> List[str]:
+    """
+    把文本转换为索引词元（小写、词形还原、去掉常见词）
+
+    Args:
+        text: 文本
+        stopwords: 需要忽略的词
+
+    Returns:
+        词元列表
+    """
+    wordlist = get_wordlist()
+    result = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        if word in stopwords or len(word) < 2:
+            continue
+        result.append(wordlist.lemma(word))
+    return result
+
+
+def normalize_space(text: str) -> str:
+    """小写并合并空白（用于短语匹配）"""
+    return ' '.join(WORD_PATTERN.findall(text.lower()))
+
+
+class SearchIndex:
+    """
+    文章倒排索引
+
+    索引保存在 output_dir/.search_index.sqlite，每篇文章一行 docs 记录，每个(词元, 文章)一行
+    postings 记录。新增或修改一篇文章只需要替换这篇文章的 postings，不需要重建整个索引。
+    """
+
+    def __init__(self, output_dir: str = "output", index_path: Optional[str] = None):
+        """
+        Args:
+            output_dir: 文章目录
+            index_path: 索引文件路径（默认 output_dir/.search_index.sqlite）
+        """
+        self.output_dir = output_dir
+        self.index_path = index_path or os.path.join(output_dir, INDEX_NAME)
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.index_path, check_same_thread=False)
+        # WAL 模式下搜索和写入可以同时进行（例如批量生成时在界面中搜索）
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        """关闭索引"""
+        with self._lock:
+            self._db.close()
+
+    def _relative(self, filepath: str) -> Optional[str]:
+        relative = os.path.relpath(filepath, self.output_dir).replace(os.sep, '/')
+        return None if relative.startswith('..') else relative
+
+    def _write(self, relative: str, stat: os.stat_result, topic: str, title: str, body: str):
+        """写入一篇文章（调用方持有锁并负责提交）"""
+        counts = Counter(terms(f"{topic}\n{title}\n{body}"))
+        row = self._db.execute('SELECT id FROM docs WHERE path = ?', (relative,)).fetchone()
+        values = (topic, title, sum(counts.values()), len(body.split()), stat.st_mtime, stat.st_size)
+        if row:
+            doc_id = row[0]
+            self._db.execute('UPDATE docs SET topic=?, title=?, length=?, words=?, mtime=?, size=? WHERE id=?',
+                             values + (doc_id,))
+            self._db.execute('DELETE FROM postings WHERE doc_id = ?', (doc_id,))
+        else:
+            doc_id = self._db.execute(
+                'INSERT INTO docs (path, topic, title, length, words, mtime, size) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (relative,) + values
+            ).lastrowid
+        self._db.executemany('INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)',
+                             [(term, doc_id, tf) for term, tf in counts.items()])
+
+    def _delete(self, relative: str):
+        """删除一篇文章（调用方持有锁并负责提交）"""
+        row = self._db.execute('SELECT id FROM docs WHERE path = ?', (relative,)).fetchone()
+        if row:
+            self._db.execute('DELETE FROM postings WHERE doc_id = ?', (row[0],))
+            self._db.execute('DELETE FROM docs WHERE id = ?', (row[0],))
+
+    def add(self, filepath: str, keyword: Optional[str] = None, article: Optional[str] = None):
+        """
+        索引刚保存的文章（文件不在 output_dir 下时忽略）
+
+        Args:
+            filepath: 文章文件路径
+            keyword: 主题关键词（与 article 一起提供时不再读取文件）
+            article: 文章内容（标题 + 空行 + 正文）
+        """
+        relative = self._relative(filepath)
+        if relative is None:
+            return
+        stat = os.stat(filepath)
+        if article is None:
+            parsed = read_article(filepath)
+        else:
+            title, _, body = article.strip().partition('\n')
+            parsed = {'topic': keyword or '', 'title': title.strip(), 'body': body.strip()}
+        with self._lock, self._db:
+            self._write(relative, stat, parsed['topic'], parsed['title'], parsed['body'])
+
+    def remove(self, filepath: str):
+        """
+        从索引中删除文章
+
+        Args:
+            filepath: 文章文件路径
+        """
+        relative = self._relative(filepath)
+        if relative is not None:
+            with self._lock, self._db:
+                self._delete(relative)
+
+    def refresh(self) -> Tuple[int, int, int]:
+        """
+        与磁盘同步：索引新增和修改过的文件（按修改时间和大小判断），删除已不存在的文件
+
+        Returns:
+            (新增数, 更新数, 删除数)
+        """
+        found = scan_articles(self.output_dir)
+        with self._lock:
+            indexed = {path: (mtime, size) for path, mtime, size
+                       in self._db.execute('SELECT path, mtime, size FROM docs')}
+
+        added = updated = 0
+        batch = []
+        for relative, stat in found.items():
+            current = indexed.get(relative)
+            if current == (stat.st_mtime, stat.st_size):
+                continue
+            try:
+                article = read_article(os.path.join(self.output_dir, relative))
+            except (OSError, UnicodeDecodeError):
+                continue
+            batch.append((relative, stat, article))
+            if current:
+                updated += 1
+            else:
+                added += 1
+            # 每200篇提交一次，首次建立大索引时不必每篇都提交
+            if len(batch) >= 200:
+                self._write_batch(batch)
+                batch = []
+        self._write_batch(batch)
+
+        removed = [relative for relative in indexed if relative not in found]
+        if removed:
+            with self._lock, self._db:
+                for relative in removed:
+                    self._delete(relative)
+        return added, updated, len(removed)
+
+    def _write_batch(self, batch: List[Tuple[str, os.stat_result, Dict]]):
+        """在一个事务中写入多篇文章"""
+        if not batch:
+            return
+        with self._lock, self._db:
+            for relative, stat, article in batch:
+                self._write(relative, stat, article['topic'], article['title'], article['body'])
+
+    def count(self) -> int:
+        """已索引的文章数"""
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        按 BM25 排序搜索文章
+
+        查询中用双引号括起来的短语必须完整出现；未加引号时，相邻的查询词在文章中以短语出现会额外加分。
+
+        Args:
+            query: 查询，如 'eye contact hospitality' 或 '"eye contact" hospitality'
+            limit: 最多返回的结果数
+
+        Returns:
+            结果列表，每项包含 path、topic、title、words、mtime、size、score、snippet
+        """
+        phrases = [normalize_space(phrase) for phrase in PHRASE_PATTERN.findall(query)]
+        phrases = [phrase for phrase in phrases if phrase]
+        query_terms = terms(query, QUERY_STOPWORDS)
+        unique_terms = list(dict.fromkeys(query_terms))
+        if not unique_terms:
+            return []
+
+        with self._lock:
+            total, average = self._db.execute('SELECT COUNT(*), AVG(length) FROM docs').fetchone()
+            if not total:
+                return []
+            postings = {
+                term: self._db.execute('SELECT doc_id, tf FROM postings WHERE term = ?', (term,)).fetchall()
+                for term in unique_terms
+            }
+
+        scores: Dict[int, float] = {}
+        lengths = self._lengths({doc_id for rows in postings.values() for doc_id, _ in rows})
+        for term, rows in postings.items():
+            if not rows:
+                continue
+            idf = _idf(total, len(rows))
+            for doc_id, tf in rows:
+                norm = K1 * (1 - B + B * lengths[doc_id] / (average or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        # 查询词中相邻的词组（去掉引号后按原顺序），用于短语加分
+        words = [word for word in WORD_PATTERN.findall(PHRASE_PATTERN.sub(' ', query).lower())
+                 if word not in QUERY_STOPWORDS]
+        pairs = [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        # 只读取排名靠前的文章来检查短语和生成摘要
+        candidates = ranked[:max(limit * 3, 30)] if not phrases else ranked
+        results = []
+        for doc_id, score in candidates:
+            doc = self._doc(doc_id)
+            if doc is None:
+                continue
+            try:
+                article = read_article(os.path.join(self.output_dir, *doc['path'].split('/')))
+            except (OSError, UnicodeDecodeError):
+                continue
+            text = normalize_space(f"{article['title']} {article['body']}")
+            if any(phrase not in text for phrase in phrases):
+                continue
+            score += PHRASE_BONUS * sum(1 for pair in pairs if pair in text)
+            doc.update(score=round(score, 4), snippet=snippet(article['body'], query_terms + phrases))
+            results.append(doc)
+            if phrases and len(results) >= limit:
+                break
+
+        results.sort(key=lambda doc: -doc['score'])
+        return results[:limit]
+
+    def _lengths(self, doc_ids) -> Dict[int, int]:
+        """批量读取文章的词元数"""
+        lengths = {}
+        ids = list(doc_ids)
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                lengths.update(self._db.execute(
+                    f'SELECT id, length FROM docs WHERE id IN ({placeholders})', chunk
+                ).fetchall())
+        return lengths
+
+    def _doc(self, doc_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute('SELECT path, topic, title, words, mtime, size FROM docs WHERE id = ?',
+                                   (doc_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('path', 'topic', 'title', 'words', 'mtime', 'size'), row))
+
+    def full_path(self, result: Dict) -> str:
+        """结果对应的文件路径"""
+        return os.path.join(self.output_dir, *result['path'].split('/'))
+
+
+def _idf(total: int, frequency: int) -> float:
+    """BM25 的逆文档频率（始终为正）"""
+    return math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+
+
+def snippet(body: str, query_terms: List[str], width: int = 160) -> str:
+    """
+    摘取包含最多查询词的句子
+
+    Args:
+        body: 正文
+        query_terms: 查询词元和短语
+        width: 最大长度
+
+    Returns:
+        摘要
+    """
+    wordlist = get_wordlist()
+    wanted = set(query_terms)
+    best, best_hits = "", -1
+    for sentence in re.split(r'(?<=[.!?])\s+', ' '.join(body.split())):
+        lowered = sentence.lower()
+        lemmas = {wordlist.lemma(word) for word in WORD_PATTERN.findall(lowered)}
+        hits = len(wanted & lemmas) + sum(1 for term in wanted if ' ' in term and term in lowered)
+        if hits > best_hits:
+            best, best_hits = sentence, hits
+    return best if len(best) <= width else best[:width - 3] + '...'
@@ -0,0 +1,503 @@
+"""
+本地HTTP服务模块
+将 ArticleGenerator 以HTTP接口提供给局域网内的多台机器共享（共用连接池、限流和预算）
+
+接口：
+    GET  /health            服务状态
+    POST /generate          生成单篇文章（JSON）
+    POST /stream            流式生成单篇文章（Server-Sent Events）
+    POST /batches           提交批量任务，返回任务ID
+    GET  /jobs              列出批量任务
+    GET  /jobs/<id>         查询批量任务状态
+    GET  /search?q=...      全文搜索已生成的文章
+    GET  /metrics           Prometheus 格式的运行指标
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from typing import Dict, List, Optional
+
+from .errors import (
+    BudgetExceededError,
+    CircuitOpenError,
+    GenerationError,
+    InvalidRequestError,
+    TransientError,
+)
+from .generator import ArticleGenerator
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .search import index_saved, open_index
+from .singleflight import SingleFlight, StreamFlight
+from .storage import safe_name, save_article
+
+# 批量任务的 topics 字段只能引用该目录中的文件
+TOPICS_DIR = 'config'
+
+
+class ArticleSaveError(Exception):
+    """文章已生成但保存失败（response 中仍包含文章，客户端不必重新生成）"""
+
+    def __init__(self, response: Dict, error: OSError):
+        """
+        Args:
+            response: 包含文章的响应字典
+            error: 保存时的错误
+        """
+        super().__init__(str(error))
+        self.response = dict(response, error=type(error).__name__, message=f"Article generated but not saved: {error}")
+
+
+def error_status(error: GenerationError) -> int:
+    """
+    将生成错误映射为HTTP状态码
+
+    Args:
+        error: 生成错误
+
+    Returns:
+        HTTP状态码
+    """
+    if isinstance(error, InvalidRequestError):
+        return 400
+    if isinstance(error, BudgetExceededError):
+        return 429
+    if isinstance(error, (CircuitOpenError, TransientError)):
+        return 503
+    return 502
+
+
+class BatchJob:
+    """一个后台批量任务"""
+
+    def __init__(self, tasks: List[Dict]):
+        """
+        Args:
+            tasks: 任务列表（格式见 ArticleGenerator.build_tasks）
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.tasks = tasks
+        self.status = 'queued'
+        self.results: List[Dict] = []
+        self.error = ""
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add_result(self, result: Dict):
+        """记录一个任务结果（由工作线程调用）"""
+        with self._lock:
+            self.results.append({key: value for key, value in result.items() if key != 'fatal'})
+
+    def to_dict(self, include_results: bool = True) -> Dict:
+        """
+        转换为可序列化的字典
+
+        Args:
+            include_results: 是否包含每篇文章的结果
+
+        Returns:
+            任务状态字典
+        """
+        with self._lock:
+            counts = {'ok': 0, 'failed': 0, 'skipped': 0}
+            for result in self.results:
+                counts[result['status']] += 1
+            data = {
+                'id': self.id,
+                'status': self.status,
+                'total': len(self.tasks),
+                **counts,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+                'error': self.error,
+            }
+            if include_results:
+                data['results'] = list(self.results)
+            return data
+
+
+class ArticleService:
+    """
+    文章生成服务
+
+    相同提示词和参数的并发请求会被合并为一次上游调用。
+    """
+
+    def __init__(self, generator: ArticleGenerator, output_dir: str = "output", concurrency: int = 4):
+        """
+        Args:
+            generator: 共享的文章生成器
+            output_dir: 批量任务和 save=true 请求的输出目录
+            concurrency: 每个批量任务的并发数
+        """
+        self.generator = generator
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.flight = SingleFlight()
+        self.stream_flight = StreamFlight()
+        # 合并的请求计为命中
+        self.metrics = generator.enable_metrics()
+        self.metrics.add_cache('singleflight', self.flight, hits='coalesced', misses='executed')
+        self.metrics.add_cache('stream_singleflight', self.stream_flight, hits='coalesced', misses='executed')
+        self.search_index = open_index(output_dir)
+        self.jobs: Dict[str, BatchJob] = {}
+        self._jobs_lock = threading.Lock()
+        # 批量任务依次执行，避免多个任务叠加并发
+        self._batch_lock = threading.Lock()
+
+    def _request_args(self, body: Dict) -> Dict:
+        """从请求体中提取生成参数"""
+        keyword = str(body.get('keyword', '')).strip()
+        if not keyword:
+            raise InvalidRequestError("Field 'keyword' is required")
+        return {
+            'keyword': keyword,
+            'description': str(body.get('description') or f"An essay about {keyword}"),
+            'is_subtopic': bool(body.get('is_subtopic', False)),
+            'main_keyword': str(body.get('main_keyword', '')),
+        }
+
+    def _key(self, args: Dict) -> str:
+        prompt = self.generator.render_prompt(args['keyword'], args['description'],
+                                              args['is_subtopic'], args['main_keyword'])
+        return self.generator.request_key(prompt)
+
+    def generate(self, body: Dict) -> Dict:
+        """
+        生成单篇文章
+
+        Args:
+            body: 请求体，包含 keyword 和可选的 description、is_subtopic、main_keyword、save
+
+        Returns:
+            响应字典
+
+        Raises:
+            ArticleSaveError: save 为 true 但写入文件失败
+        """
+        args = self._request_args(body)
+        started = time.monotonic()
+        article, shared = self.flight.do(self._key(args), lambda: self.generator.generate_article(**args))
+
+        response = {
+            'keyword': args['keyword'],
+            'article': article,
+            'words': len(article.split()),
+            'shared': shared,
+            'elapsed': round(time.monotonic() - started, 3),
+        }
+        if body.get('save'):
+            filepath = os.path.join(self.output_dir, f"{safe_name(args['keyword'])}.txt")
+            try:
+                save_article(filepath, args['keyword'], article)
+                index_saved(self.search_index, filepath, args['keyword'], article)
+            except OSError as e:
+                raise ArticleSaveError(response, e) from e
+            response['file'] = filepath
+        return response
+
+    def stream(self, body: Dict):
+        """
+        流式生成单篇文章
+
+        Args:
+            body: 请求体（同 generate）
+
+        Returns:
+            文本片段迭代器
+        """
+        args = self._request_args(body)
+        return self.stream_flight.subscribe(self._key(args), lambda: self.generator.stream_article(**args))
+
+    def submit_batch(self, body: Dict) -> BatchJob:
+        """
+        提交批量任务
+
+        Args:
+            body: 请求体，{"keywords": [...]} 或 {"topics": "topics.json"}（config/ 中的文件名）
+
+        Returns:
+            批量任务
+
+        Raises:
+            InvalidRequestError: 请求无效或主题文件不在 config/ 中
+        """
+        if body.get('keywords'):
+            if not isinstance(body['keywords'], list):
+                raise InvalidRequestError("Field 'keywords' must be a list")
+            tasks = [{
+                'group': '',
+                'keyword': str(keyword).strip(),
+                'description': f"An essay about {str(keyword).strip()}",
+                'is_subtopic': False,
+                'main_keyword': "",
+                'filename': f"{safe_name(str(keyword).strip())}.txt"
+            } for keyword in body['keywords'] if str(keyword).strip()]
+        elif body.get('topics'):
+            topics_path = self._topics_path(body['topics'])
+            try:
+                tasks = self.generator.build_tasks(self.generator.load_topics(topics_path))
+            except (OSError, ValueError, KeyError) as e:
+                raise InvalidRequestError(f"Cannot load topics from {topics_path}: {e}")
+        else:
+            raise InvalidRequestError("Field 'keywords' or 'topics' is required")
+
+        job = BatchJob(tasks)
+        with self._jobs_lock:
+            self.jobs[job.id] = job
+        threading.Thread(target=self._run_batch, args=(job,), daemon=True).start()
+        return job
+
+    @staticmethod
+    def _topics_path(name) -> str:
+        """
+        解析 topics 字段（true 表示默认的 config/topics.json），只接受 config/ 中的文件
+
+        Args:
+            name: 文件名（如 "topics.json" 或 "config/topics.json"）
+
+        Returns:
+            主题文件路径
+
+        Raises:
+            InvalidRequestError: 路径不在 config/ 中
+        """
+        if name is True:
+            return os.path.join(TOPICS_DIR, 'topics.json')
+        if not isinstance(name, str):
+            raise InvalidRequestError("Field 'topics' must be a file name in config/")
+        root = os.path.realpath(TOPICS_DIR)
+        prefix = TOPICS_DIR + '/'
+        relative = name[len(prefix):] if name.replace('\\', '/').startswith(prefix) else name
+        path = os.path.realpath(os.path.join(root, relative))
+        if os.path.isabs(relative) or os.path.dirname(path) != root:
+            raise InvalidRequestError(f"Topics file must be a file in {TOPICS_DIR}/")
+        return path
+
+    def _run_batch(self, job: BatchJob):
+        """在后台线程中执行批量任务"""
+        with self._batch_lock:
+            job.status = 'running'
+            try:
+                self.generator.run_tasks(job.tasks, self.output_dir, self.concurrency,
+                                         on_result=job.add_result)
+                job.status = 'completed'
+            except BudgetExceededError as e:
+                job.status = 'paused'
+                job.error = e.message
+            except GenerationError as e:
+                job.status = 'aborted'
+                job.error = e.message
+            except Exception as e:
+                job.status = 'aborted'
+                job.error = f"{type(e).__name__}: {e}"
+            finally:
+                job.finished_at = time.time()
+
+    def get_job(self, job_id: str) -> Optional[BatchJob]:
+        """查询批量任务"""
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict]:
+        """列出所有批量任务（不含明细）"""
+        with self._jobs_lock:
+            jobs = list(self.jobs.values())
+        return [job.to_dict(include_results=False) for job in jobs]
+
+    def search(self, query: str, limit: int = 10) -> Dict:
+        """
+        全文搜索已生成的文章
+
+        Args:
+            query: 查询
+            limit: 最多返回的结果数
+
+        Returns:
+            响应字典
+        """
+        if not query.strip():
+            raise InvalidRequestError("Query parameter 'q' is required")
+        if self.search_index is None:
+            raise InvalidRequestError("Search index is disabled (SEARCH_INDEX_ENABLED=false)")
+        return {'query': query, 'results': self.search_index.search(query, limit)}
+
+    def health(self) -> Dict:
+        """服务状态"""
+        adaptive = self.generator.adaptive_limiter
+        return {
+            'status': 'ok',
+            'model': self.generator.model_name,
+            'circuit': self.generator.circuit_breaker.state,
+            'coalesced': self.flight.coalesced + self.stream_flight.coalesced,
+            'upstream_calls': self.flight.executed + self.stream_flight.executed,
+            'budget': self.generator.budget.summary(),
+            'pipeline': self.generator.last_pipeline_stats,
+            'models': self.generator.router.stats() if self.generator.router else [],
+            'concurrency': adaptive.stats() if adaptive else self.generator.last_concurrency_stats,
+        }
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP请求处理器"""
+
+    protocol_version = 'HTTP/1.1'
+    service: ArticleService = None
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {self.address_string()} {format % args}")
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端在请求之间断开（如流式输出中途关闭）
+            self.close_connection = True
+
+    def _send_json(self, status: int, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status: int, text: str, content_type: str = 'text/plain; charset=utf-8'):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, error: GenerationError):
+        self._send_json(error_status(error), {
+            'error': type(error).__name__,
+            'message': error.message,
+            'hint': error.hint,
+        })
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            data = json.loads(self.rfile.read(length).decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            raise InvalidRequestError("Request body must be valid JSON")
+        if not isinstance(data, dict):
+            raise InvalidRequestError("Request body must be a JSON object")
+        return data
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == '/health':
+            self._send_json(200, self.service.health())
+        elif path == '/metrics':
+            self._send_text(200, self.service.metrics.render(), METRICS_CONTENT_TYPE)
+        elif path == '/jobs':
+            self._send_json(200, {'jobs': self.service.list_jobs()})
+        elif path == '/search':
+            params = parse_qs(urlsplit(self.path).query)
+            try:
+                limit = int(params.get('limit', ['10'])[0])
+                self._send_json(200, self.service.search(params.get('q', [''])[0], limit))
+            except ValueError:
+                self._send_json(400, {'error': 'InvalidRequestError', 'message': "'limit' must be an integer"})
+            except GenerationError as e:
+                self._send_error_json(e)
+        elif path.startswith('/jobs/'):
+            job = self.service.get_job(path[len('/jobs/'):])
+            if job:
+                self._send_json(200, job.to_dict())
+            else:
+                self._send_json(404, {'error': 'NotFound', 'message': 'Job not found'})
+        else:
+            self._send_json(404, {'error': 'NotFound', 'message': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        try:
+            body = self._read_json()
+            if path == '/generate':
+                self._send_json(200, self.service.generate(body))
+            elif path == '/stream':
+                self._stream(body)
+            elif path == '/batches':
+                job = self.service.submit_batch(body)
+                self._send_json(202, {'id': job.id, 'status': job.status, 'total': len(job.tasks),
+                                      'url': f"/jobs/{job.id}"})
+            else:
+                self._send_json(404, {'error': 'NotFound', 'message': f"Unknown path: {self.path}"})
+        except GenerationError as e:
+            self._send_error_json(e)
+        except ArticleSaveError as e:
+            self._send_json(500, e.response)
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {'error': 'InvalidRequestError', 'message': f"Malformed request: {e}"})
+
+    def _stream(self, body: Dict):
+        """以 Server-Sent Events 格式输出文章片段"""
+        chunks = self.service.stream(body)
+        # 先取第一个片段，这样连接失败时仍可返回普通的JSON错误
+        first = next(chunks, None)
+
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            if first is not None:
+                self._write_chunk(f"data: {json.dumps({'delta': first}, ensure_ascii=False)}\n\n".encode('utf-8'))
+            for chunk in chunks:
+                self._write_chunk(f"data: {json.dumps({'delta': chunk}, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self._write_chunk(b"event: done\ndata: {}\n\n")
+            self._write_chunk(b"")
+        except GenerationError as e:
+            payload = json.dumps({'error': type(e).__name__, 'message': e.message}, ensure_ascii=False)
+            try:
+                self._write_chunk(f"event: error\ndata: {payload}\n\n".encode('utf-8'))
+                self._write_chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已断开，停止读取（后台的生成继续，结果仍共享给其他订阅者）
+            self.close_connection = True
+            chunks.close()
+
+
+def serve(generator: ArticleGenerator, host: str = '127.0.0.1', port: int = 8765,
+          output_dir: str = "output", concurrency: int = 4):
+    """
+    启动HTTP服务（阻塞直到 Ctrl+C）
+
+    Args:
+        generator: 共享的文章生成器
+        host: 监听地址
+        port: 监听端口
+        output_dir: 输出目录
+        concurrency: 每个批量任务的并发数
+    """
+    service = ArticleService(generator, output_dir, concurrency)
+    handler = type('BoundServiceHandler', (ServiceHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    print(f"🌐 Article service listening on http://{host}:{port}")
+    print(f"✓ Using model: {generator.model_name}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
@@ -0,0 +1,285 @@
+"""
+配置模块
+生成相关的配置（API地址、密钥、模型、温度、字数等）保存在不可变的快照中，
+修改配置时整体替换快照：进行中的请求继续使用开始时取得的快照，新的请求使用新快照。
+可以定时检查 config/.env 的修改时间，文件变化时自动重新加载。
+
+优先级：运行时修改（如命令行参数，未写入文件）> 进程环境变量 > config/.env > 默认值。
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from dotenv import dotenv_values
+
+ENV_PATH = os.path.join('config', '.env')
+
+# 导入本模块时的环境变量（在 load_dotenv 之前），用于判断哪些配置由进程环境变量指定
+_PROCESS_ENV = dict(os.environ)
+
+
+class Settings(NamedTuple):
+    """不可变的配置快照"""
+
+    api_key: str
+    api_base_url: str = 'https://api.openai.com/v1'
+    model_name: str = 'gpt-4o-mini'
+    article_length: int = 200
+    temperature: float = 0.7
+    max_tokens: int = 400
+    candidates: int = 1
+    # 快照编号，每次替换加一
+    version: int = 0
+
+    @classmethod
+    def from_mapping(cls, values: Dict[str, Optional[str]], version: int = 0) -> 'Settings':
+        """
+        从环境变量形式的字典创建快照
+
+        Args:
+            values: {环境变量名: 值}
+            version: 快照编号
+
+        Returns:
+            配置快照
+
+        Raises:
+            ValueError: 缺少 API_KEY 或数值格式错误
+        """
+        def get(name: str, default: str) -> str:
+            value = values.get(name)
+            return value.strip() if value and value.strip() else default
+
+        api_key = get('API_KEY', '')
+        if not api_key:
+            raise ValueError("API_KEY not found in config/.env file")
+        try:
+            article_length = int(get('ARTICLE_LENGTH', '200'))
+            temperature = float(get('TEMPERATURE', '0.7'))
+            max_tokens = int(get('MAX_TOKENS', '400'))
+            candidates = max(1, int(get('CANDIDATES', '1')))
+        except ValueError as e:
+            raise ValueError(f"Invalid setting in config/.env: {e}") from e
+        if article_length <= 0 or max_tokens <= 0 or not 0 <= temperature <= 2:
+            raise ValueError("Invalid setting in config/.env: ARTICLE_LENGTH and MAX_TOKENS must be positive, "
+                             "TEMPERATURE must be between 0 and 2")
+
+        return cls(
+            api_key=api_key,
+            api_base_url=get('API_BASE_URL', 'https://api.openai.com/v1'),
+            model_name=get('MODEL_NAME', 'gpt-4o-mini'),
+            article_length=article_length,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            candidates=candidates,
+            version=version,
+        )
+
+    def to_env(self) -> Dict[str, str]:
+        """转换为环境变量形式的字典（不含 version）"""
+        return {env: str(getattr(self, field)) for field, env in ENV_NAMES.items()}
+
+    @property
+    def endpoint(self):
+        """决定HTTP客户端能否复用的部分（地址和密钥）"""
+        return self.api_base_url, self.api_key
+
+    def changes(self, other: 'Settings') -> Dict[str, tuple]:
+        """
+        与另一个快照相比变化的配置
+
+        Args:
+            other: 新快照
+
+        Returns:
+            {字段名: (旧值, 新值)}
+        """
+        return {field: (getattr(self, field), getattr(other, field))
+                for field in ENV_NAMES if getattr(self, field) != getattr(other, field)}
+
+
+# 字段名与环境变量名的对应关系
+ENV_NAMES = {
+    'api_key': 'API_KEY',
+    'api_base_url': 'API_BASE_URL',
+    'model_name': 'MODEL_NAME',
+    'article_length': 'ARTICLE_LENGTH',
+    'temperature': 'TEMPERATURE',
+    'max_tokens': 'MAX_TOKENS',
+    'candidates': 'CANDIDATES',
+}
+
+
+def write_env_file(path: str, values: Dict[str, str]):
+    """
+    更新 .env 文件中的配置项（保留其他行和注释，不存在的配置项追加到末尾）
+
+    Args:
+        path: 文件路径
+        values: {环境变量名: 值}
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        lines = []
+
+    remaining = dict(values)
+    for index, line in enumerate(lines):
+        match = re.match(r'\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_]*)\s*=', line)
+        if match and match.group(1) in remaining:
+            lines[index] = f"{match.group(1)}={remaining.pop(match.group(1))}"
+    lines += [f"{name}={value}" for name, value in remaining.items()]
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+
+class SettingsManager:
+    """
+    持有当前配置快照
+
+    current 属性的读取是原子的；替换快照时加锁，并在锁外通知订阅者。
+    """
+
+    def __init__(self, env_path: str = ENV_PATH):
+        """
+        Args:
+            env_path: .env 文件路径
+
+        Raises:
+            ValueError: 配置无效（如缺少 API_KEY）
+        """
+        self.env_path = env_path
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Settings, Settings], None]] = []
+        self._mtime = self._file_mtime()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # 运行时修改且未写入文件的配置 {环境变量名: 值}，重新加载文件时保留
+        self._overrides: Dict[str, str] = {}
+        self.current = Settings.from_mapping(self._values())
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.env_path).st_mtime
+        except OSError:
+            return None
+
+    def _values(self) -> Dict[str, Optional[str]]:
+        """按优先级合并 .env 文件和进程环境变量"""
+        values = dotenv_values(self.env_path) if os.path.exists(self.env_path) else {}
+        values.update({env: _PROCESS_ENV[env] for env in ENV_NAMES.values() if env in _PROCESS_ENV})
+        values.update(self._overrides)
+        return values
+
+    @staticmethod
+    def overridden() -> List[str]:
+        """由进程环境变量指定、修改 .env 文件不会生效的配置项"""
+        return [env for env in ENV_NAMES.values() if env in _PROCESS_ENV]
+
+    def subscribe(self, listener: Callable[[Settings, Settings], None]):
+        """
+        订阅配置变化
+
+        Args:
+            listener: 回调函数，参数为 (旧快照, 新快照)，在替换快照的线程中调用
+        """
+        self._listeners.append(listener)
+
+    def _swap(self, build: Callable[[Settings], Settings]) -> Settings:
+        with self._lock:
+            old = self.current
+            new = build(old)
+            if not old.changes(new):
+                return old
+            new = new._replace(version=old.version + 1)
+            self.current = new
+        for listener in list(self._listeners):
+            listener(old, new)
+        return new
+
+    def update(self, persist: bool = False, **changes) -> Settings:
+        """
+        修改部分配置并替换快照
+
+        Args:
+            persist: 是否同时写入 .env 文件（不写入时，之后重新加载文件也保留这些修改）
+            **changes: 要修改的字段（如 temperature=0.9）
+
+        Returns:
+            新快照（没有变化时返回当前快照）
+
+        Raises:
+            ValueError: 字段名或取值无效
+        """
+        unknown = [name for name in changes if name not in ENV_NAMES]
+        if unknown:
+            raise ValueError(f"Unknown setting(s): {', '.join(unknown)}")
+
+        values = {ENV_NAMES[name]: str(value) for name, value in changes.items()}
+        new = self._swap(lambda old: Settings.from_mapping({**old.to_env(), **values}))
+        if persist:
+            write_env_file(self.env_path, values)
+            self._mtime = self._file_mtime()
+            for env in values:
+                self._overrides.pop(env, None)
+        else:
+            self._overrides.update(values)
+        return new
+
+    def reload(self) -> Settings:
+        """
+        从 .env 文件重新加载
+
+        Returns:
+            新快照（没有变化时返回当前快照）
+
+        Raises:
+            ValueError: 文件中的配置无效（此时保留当前快照）
+        """
+        self._mtime = self._file_mtime()
+        values = self._values()
+        return self._swap(lambda old: Settings.from_mapping(values))
+
+    def check(self) -> bool:
+        """
+        检查 .env 文件是否被修改，修改过则重新加载（GUI 可以用 root.after 定时调用）
+
+        Returns:
+            是否重新加载了配置（配置无效时打印警告并返回 False）
+        """
+        if self._file_mtime() == self._mtime:
+            return False
+        try:
+            old = self.current
+            return self.reload() is not old
+        except ValueError as e:
+            print(f"⚠️  Ignoring config change: {e}")
+            return False
+
+    def watch(self, interval: float = 2.0):
+        """
+        在后台线程中定时检查 .env 文件（重复调用不会启动多个线程）
+
+        Args:
+            interval: 检查间隔（秒），小于等于0时不检查
+        """
+        if interval <= 0 or self._watcher:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.check()
+
+        self._watcher = threading.Thread(target=loop, name='settings-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        """停止后台检查"""
+        self._stop.set()
@@ -0,0 +1,153 @@
+"""
+请求合并模块
+相同指纹的并发请求只向上游发起一次调用，其余请求等待并共享结果
+"""
+
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    单飞（single-flight）请求合并
+
+    第一个请求执行实际调用，调用期间到达的相同 key 的请求阻塞等待并获得相同结果（或相同异常）。
+    调用结束后 key 被移除，之后的请求会重新调用。
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        执行或加入一次调用
+
+        Args:
+            key: 请求指纹
+            func: 实际调用
+
+        Returns:
+            (结果, 是否与其他请求共享了结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                shared = call.waiters > 0
+            call.done.set()
+
+        return call.result, shared
+
+
+class _Stream:
+    """一次进行中的流式调用，缓存已收到的片段供后加入的订阅者回放"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.cond = threading.Condition()
+
+
+class StreamFlight:
+    """
+    流式请求合并
+
+    第一个订阅者在后台线程中消费上游流，所有相同 key 的订阅者（包括中途加入的）
+    从头回放已缓存的片段并继续接收新片段。
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, _Stream] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def subscribe(self, key: str, open_stream: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        订阅一个流
+
+        Args:
+            key: 请求指纹
+            open_stream: 打开上游流的函数（只在没有进行中的相同请求时调用）
+
+        Yields:
+            文本片段
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream:
+                self.coalesced += 1
+            else:
+                stream = _Stream()
+                self._streams[key] = stream
+                self.executed += 1
+                threading.Thread(target=self._pump, args=(key, stream, open_stream), daemon=True).start()
+
+        index = 0
+        while True:
+            with stream.cond:
+                while index >= len(stream.chunks) and not stream.finished:
+                    stream.cond.wait()
+                chunks = stream.chunks[index:]
+                finished = stream.finished
+            for chunk in chunks:
+                yield chunk
+            index += len(chunks)
+            if finished and index >= len(stream.chunks):
+                if stream.error:
+                    raise stream.error
+                return
+
+    def _pump(self, key: str, stream: _Stream, open_stream: Callable[[], Iterator[str]]):
+        """在后台线程中消费上游流"""
+        try:
+            for chunk in open_stream():
+                with stream.cond:
+                    stream.chunks.append(chunk)
+                    stream.cond.notify_all()
+        except BaseException as e:
+            stream.error = e
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            with stream.cond:
+                stream.finished = True
+                stream.cond.notify_all()
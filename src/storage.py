@@ -0,0 +1,101 @@
+"""
+文章存储模块
+统一文章文件的命名、写入和读取格式
+"""
+
+import os
+import re
+from typing import Dict
+
+
+# 文章文件头部的分隔线
+SEPARATOR = '=' * 60
+
+# 文件名中替换为下划线的字符：路径分隔符、Windows 保留字符和空格
+UNSAFE_FILENAME_CHARS = ('/', '\\', ':', '*', '?', '"', '<', '>', '|', ' ')
+
+
+def safe_name(keyword: str) -> str:
+    """
+    将关键词转换为文件名片段（路径分隔符、Windows 保留字符和空格替换为下划线，结果不会跳出所在目录）
+
+    Args:
+        keyword: 主题关键词
+
+    Returns:
+        文件名片段
+    """
+    for char in UNSAFE_FILENAME_CHARS:
+        keyword = keyword.replace(char, '_')
+    return keyword
+
+
+def normalize_article(article: str) -> str:
+    """
+    整理文章空白：统一换行符，去掉行尾空格，多个空行合并为一个
+
+    Args:
+        article: 文章内容
+
+    Returns:
+        整理后的文章
+    """
+    lines = [line.rstrip() for line in article.replace('\r\n', '\n').replace('\r', '\n').strip().split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines))
+
+
+def save_article(filepath: str, keyword: str, article: str):
+    """
+    保存文章（先写临时文件再替换，避免并发读取到半截文件）
+
+    Args:
+        filepath: 文件路径
+        keyword: 主题关键词
+        article: 文章内容
+    """
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(f"Topic: {keyword}\n")
+        f.write(f"{SEPARATOR}\n\n")
+        f.write(article)
+    os.replace(tmp_path, filepath)
+
+
+def parse_article(text: str) -> Dict[str, str]:
+    """
+    解析文章文件内容
+
+    Args:
+        text: 文件全文
+
+    Returns:
+        包含 topic、title、body 的字典
+    """
+    topic = ""
+    if text.startswith("Topic:"):
+        header, _, text = text.partition('\n')
+        topic = header[len("Topic:"):].strip()
+        if text.startswith(SEPARATOR):
+            text = text[len(SEPARATOR):]
+    text = text.strip()
+
+    title, _, body = text.partition('\n')
+    return {'topic': topic, 'title': title.strip(), 'body': body.strip()}
+
+
+def read_article(filepath: str) -> Dict[str, str]:
+    """
+    读取并解析文章文件
+
+    Args:
+        filepath: 文件路径
+
+    Returns:
+        包含 topic、title、body 的字典
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return parse_article(f.read())
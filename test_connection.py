@@ -1,22 +1,89 @@
 """
-API连接测试脚本
-用于诊断API连接问题
+API连接测试与基准测试脚本
+用于诊断API连接问题，以及比较不同服务和模型的速度
+
+使用方法：
+    python test_connection.py                       # 连接测试（DNS/TCP/TLS耗时 + 一次测试请求）
+    python test_connection.py --benchmark           # 基准测试，默认每个并发数5次请求，并发数 1,4
+    python test_connection.py --benchmark --samples 10 --concurrency 1,4,8
+    python test_connection.py --history             # 查看历史基准测试结果
 """
 
+import argparse
 import os
 import sys
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from src.benchmark import (
+    DEFAULT_ENDPOINTS,
+    DEFAULT_HISTORY,
+    benchmark_model,
+    load_endpoints,
+    load_history,
+    new_run,
+    previous_level,
+    probe_connection,
+    recommend,
+    save_run,
+)
+from src.prompts import generate_prompt
+
+
+def load_env():
+    """从 config/.env 文件加载环境变量"""
+    env_path = os.path.join('config', '.env')
+    load_dotenv(dotenv_path=env_path)
+
+
+def print_connection(probe):
+    """打印连接各阶段耗时"""
+    def ms(value):
+        return f"{value:.0f} ms" if value is not None else "-"
+
+    print(f"  → 连接 {probe['host']} ({probe['address'] or '未解析'}): "
+          f"DNS {ms(probe['dns_ms'])} | TCP {ms(probe['tcp_ms'])} | TLS {ms(probe['tls_ms'])}")
+    if probe.get('error'):
+        print(f"  ⚠️  直连失败: {probe['error']}（使用代理时可以忽略）")
+
+
+def print_diagnosis(error_text, model_name):
+    """根据错误信息打印诊断建议"""
+    print("\n诊断建议：")
+
+    if "Connection" in error_text or "timeout" in error_text.lower():
+        print("  ⚠️  网络连接问题")
+        print("     1. 检查网络连接是否正常")
+        print("     2. OpenAI API在中国大陆可能需要VPN")
+        print("     3. 建议使用国内可访问的API服务（如OpenRouter）")
+        print("\n  解决方案：")
+        print("     编辑.env文件，改用OpenRouter：")
+        print("     API_BASE_URL=https://openrouter.ai/api/v1")
+        print("     MODEL_NAME=openai/gpt-4o-mini")
+        print("     API_KEY=你的OpenRouter密钥")
+
+    elif "API key" in error_text or "Unauthorized" in error_text or "401" in error_text:
+        print("  ⚠️  API密钥问题")
+        print("     1. 检查API_KEY是否正确")
+        print("     2. 确认密钥未过期")
+        print("     3. 确认账户有足够余额")
+
+    elif "model" in error_text.lower() or "404" in error_text:
+        print("  ⚠️  模型名称问题")
+        print(f"     当前模型: {model_name}")
+        print("     1. 检查模型名称是否正确")
+        print("     2. 确认账户有权限使用该模型")
+
+    else:
+        print("  ⚠️  未知错误")
+        print("     请检查错误信息并搜索解决方案")
+
+
 def test_connection():
     """测试API连接"""
     print("="*60)
     print("API连接测试")
     print("="*60)
-    
-    # 从 config/.env 文件加载环境变量
-    env_path = os.path.join('config', '.env')
-    load_dotenv(dotenv_path=env_path)
 
     api_key = os.getenv('API_KEY')
     api_base_url = os.getenv('API_BASE_URL', 'https://api.openai.com/v1')
@@ -25,16 +92,16 @@ def test_connection():
     print(f"\n配置信息：")
     print(f"  API Base URL: {api_base_url}")
     print(f"  Model Name: {model_name}")
-    print(f"  API Key: {api_key[:20]}...{api_key[-10:] if api_key else 'NOT FOUND'}")
 
     if not api_key:
         print("\n❌ 错误：未找到API_KEY")
         print("请检查 config/.env 文件是否存在并包含 API_KEY")
-        print("请检查.env文件是否存在且包含API_KEY")
         return False
-    
+    print(f"  API Key: {api_key[:20]}...{api_key[-10:]}")
+
     print("\n正在测试连接...")
-    
+    print_connection(probe_connection(api_base_url))
+
     try:
         # 初始化客户端
         client = OpenAI(
@@ -42,7 +109,7 @@ def test_connection():
             base_url=api_base_url,
             timeout=30.0
         )
-        
+
         # 发送测试请求
         print("  → 发送测试请求...")
         response = client.chat.completions.create(
@@ -52,60 +119,204 @@ def test_connection():
             ],
             max_tokens=50
         )
-        
+
         result = response.choices[0].message.content.strip()
-        
+
         print("\n✅ 连接成功！")
         print(f"  API响应: {result}")
         print(f"  使用的模型: {response.model}")
         print(f"  消耗tokens: {response.usage.total_tokens}")
-        
+
         return True
-        
+
     except Exception as e:
         print(f"\n❌ 连接失败！")
         print(f"  错误类型: {type(e).__name__}")
         print(f"  错误信息: {str(e)}")
-        
-        # 提供诊断建议
-        print("\n诊断建议：")
-        
-        if "Connection" in str(e) or "timeout" in str(e).lower():
-            print("  ⚠️  网络连接问题")
-            print("     1. 检查网络连接是否正常")
-            print("     2. OpenAI API在中国大陆可能需要VPN")
-            print("     3. 建议使用国内可访问的API服务（如OpenRouter）")
-            print("\n  解决方案：")
-            print("     编辑.env文件，改用OpenRouter：")
-            print("     API_BASE_URL=https://openrouter.ai/api/v1")
-            print("     MODEL_NAME=openai/gpt-4o-mini")
-            print("     API_KEY=你的OpenRouter密钥")
-            
-        elif "API key" in str(e) or "Unauthorized" in str(e) or "401" in str(e):
-            print("  ⚠️  API密钥问题")
-            print("     1. 检查API_KEY是否正确")
-            print("     2. 确认密钥未过期")
-            print("     3. 确认账户有足够余额")
-            
-        elif "model" in str(e).lower() or "404" in str(e):
-            print("  ⚠️  模型名称问题")
-            print(f"     当前模型: {model_name}")
-            print("     1. 检查模型名称是否正确")
-            print("     2. 确认账户有权限使用该模型")
-            
-        else:
-            print("  ⚠️  未知错误")
-            print("     请检查错误信息并搜索解决方案")
-        
+        print_diagnosis(str(e), model_name)
+        return False
+
+
+def format_delta(current, previous):
+    """与上次结果相比的变化（百分比）"""
+    if current is None or not previous:
+        return "-"
+    return f"{(current - previous) / previous:+.0%}"
+
+
+def print_table(run, history):
+    """打印对比表格（含与上次运行相比p50延迟的变化）"""
+    header = (f"{'Endpoint':<16} {'Model':<30} {'Conc':>4} {'OK':>5} {'TTFT':>6} "
+              f"{'p50':>6} {'p90':>6} {'p99':>6} {'tok/s':>6} {'Tput':>7} {'Δp50':>6}")
+    print("\n" + header)
+    print("-" * len(header))
+
+    def seconds(value):
+        return f"{value:.2f}" if value is not None else "-"
+
+    def speed(value):
+        return f"{value:.0f}" if value is not None else "-"
+
+    for result in run['results']:
+        for level in result['levels']:
+            previous = previous_level(history, result['base_url'], result['model'], level['concurrency'])
+            print(f"{result['endpoint'][:16]:<16} {result['model'][-30:]:<30} {level['concurrency']:>4} "
+                  f"{level['ok']:>2}/{level['samples']:<2} {seconds(level['ttft_p50']):>6} "
+                  f"{seconds(level['latency_p50']):>6} {seconds(level['latency_p90']):>6} "
+                  f"{seconds(level['latency_p99']):>6} {speed(level['tokens_per_s']):>6} "
+                  f"{level['throughput_tps']:>7} "
+                  f"{format_delta(level['latency_p50'], previous and previous['latency_p50']):>6}")
+            if level['errors']:
+                errors = ', '.join(f"{name}×{count}" for name, count in level['errors'].items())
+                print(f"{'':<16} ⚠️  {errors}")
+    print("\nTTFT/p50/p90/p99 单位为秒；tok/s 为单个请求的生成速度，Tput 为该并发数下的总吞吐量（tokens/s）")
+
+
+def print_recommendation(recommendation):
+    """打印推荐设置"""
+    if not recommendation:
+        print("\n❌ 没有可用的结果，无法给出推荐，请先运行连接测试排查问题")
+        return
+    interactive = recommendation['interactive']
+    batch = recommendation['batch']
+    print("\n推荐设置：")
+    print(f"  单篇生成（GUI/命令行）：{interactive['endpoint']} / {interactive['model']}"
+          f"（p50 {interactive['latency_p50']:.1f}s）")
+    for name, value in interactive['settings'].items():
+        print(f"     {name}={value}")
+    print(f"  批量生成：{batch['endpoint']} / {batch['model']}，并发 {batch['concurrency']}"
+          f"（{batch['throughput_tps']} tokens/s）")
+    for name, value in batch['settings'].items():
+        print(f"     {name}={value}")
+    print(f"     python main.py generate --adaptive --concurrency {batch['concurrency']}")
+
+
+def run_benchmark(args):
+    """运行基准测试"""
+    print("="*60)
+    print("API基准测试")
+    print("="*60)
+
+    try:
+        endpoints = load_endpoints(args.endpoints)
+    except ValueError as e:
+        print(f"\n❌ {e}")
         return False
+    if not endpoints:
+        print("\n❌ 错误：没有可测试的服务")
+        print(f"请在 config/.env 中配置 API_KEY，或按 config/endpoints.example.json 创建 {DEFAULT_ENDPOINTS}")
+        return False
+
+    # 使用真实的文章提示词，结果与实际生成时一致
+    article_length = int(os.getenv('ARTICLE_LENGTH', '200'))
+    max_tokens = args.max_tokens or int(os.getenv('MAX_TOKENS', '400'))
+    prompt = generate_prompt("Cultural Shock", "Experiencing a new culture for the first time", article_length)
+    run = new_run({'samples': args.samples, 'levels': args.concurrency, 'max_tokens': max_tokens,
+                   'article_length': article_length})
+    history = load_history(args.history_file)
+
+    for endpoint in endpoints:
+        print(f"\n📡 {endpoint.name}: {endpoint.base_url}")
+        probe = probe_connection(endpoint.base_url)
+        print_connection(probe)
+        # 不自动重试，错误计入结果
+        client = OpenAI(api_key=endpoint.api_key, base_url=endpoint.base_url, timeout=args.timeout, max_retries=0)
+
+        for model in endpoint.models:
+            print(f"  → {model}: 并发 {', '.join(map(str, args.concurrency))}，每轮 {args.samples} 次请求")
+
+            def on_sample(concurrency, sample):
+                mark = '.' if sample['ok'] else 'x'
+                sys.stdout.write(mark)
+                sys.stdout.flush()
+
+            sys.stdout.write("    ")
+            levels = benchmark_model(client, model, prompt, max_tokens, args.samples, args.concurrency,
+                                     on_sample=on_sample)
+            print()
+            run['results'].append({'endpoint': endpoint.name, 'base_url': endpoint.base_url, 'model': model,
+                                   'connection': probe, 'levels': levels})
+
+    print_table(run, history)
+    run['recommendation'] = recommend(run['results'])
+    print_recommendation(run['recommendation'])
+
+    if not args.no_save:
+        save_run(run, args.history_file)
+        print(f"\n✓ 结果已保存到: {args.history_file}")
+    return bool(run['recommendation'])
+
+
+def print_history(path, limit):
+    """打印历史基准测试结果"""
+    runs = load_history(path)
+    if not runs:
+        print(f"没有历史结果: {path}")
+        return
+    print(f"{'Time':<20} {'Endpoint':<16} {'Model':<30} {'Conc':>4} {'p50':>6} {'p95':>6} {'Tput':>7} {'Errors':>6}")
+    for run in runs[-limit:]:
+        for result in run['results']:
+            for level in result['levels']:
+                p50 = f"{level['latency_p50']:.2f}" if level['latency_p50'] is not None else "-"
+                p95 = f"{level['latency_p95']:.2f}" if level['latency_p95'] is not None else "-"
+                print(f"{run['timestamp']:<20} {result['endpoint'][:16]:<16} {result['model'][-30:]:<30} "
+                      f"{level['concurrency']:>4} {p50:>6} {p95:>6} {level['throughput_tps']:>7} "
+                      f"{sum(level['errors'].values()):>6}")
+
+
+def parse_levels(value):
+    """解析逗号分隔的并发数（argparse 类型函数）"""
+    try:
+        levels = sorted({int(item) for item in value.split(',') if item.strip()})
+    except ValueError:
+        levels = []
+    if not levels or levels[0] < 1:
+        raise argparse.ArgumentTypeError(f"invalid concurrency levels: {value}")
+    return levels
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description="API连接测试与基准测试")
+    parser.add_argument('--benchmark', '-b', action='store_true',
+                        help='对每个服务和模型进行基准测试并推荐设置')
+    parser.add_argument('--endpoints', metavar='FILE',
+                        help=f'要测试的服务列表（默认: {DEFAULT_ENDPOINTS}，不存在时测试 config/.env 中的配置）')
+    parser.add_argument('--samples', '-n', type=int, default=5, metavar='N',
+                        help='每个并发数的请求次数（默认: 5）')
+    parser.add_argument('--concurrency', '-j', type=parse_levels, default=[1, 4], metavar='LEVELS',
+                        help='逗号分隔的并发数（默认: 1,4）')
+    parser.add_argument('--max-tokens', type=int, metavar='N',
+                        help='每次请求的最大token数（默认: MAX_TOKENS 配置）')
+    parser.add_argument('--timeout', type=float, default=120.0, metavar='SECONDS',
+                        help='单次请求超时（默认: 120）')
+    parser.add_argument('--history-file', default=DEFAULT_HISTORY, metavar='FILE',
+                        help=f'基准测试结果文件（默认: {DEFAULT_HISTORY}）')
+    parser.add_argument('--no-save', action='store_true',
+                        help='不保存本次基准测试结果')
+    parser.add_argument('--history', nargs='?', type=int, const=10, metavar='N',
+                        help='查看最近N次基准测试结果（默认: 10）')
+    return parser
+
 
 if __name__ == "__main__":
+    args = build_parser().parse_args()
+    load_env()
+
+    if args.history:
+        print_history(args.history_file, args.history)
+        sys.exit(0)
+
+    if args.benchmark:
+        sys.exit(0 if run_benchmark(args) else 1)
+
     success = test_connection()
-    
+
     if success:
         print("\n" + "="*60)
         print("✅ 测试通过！可以开始使用文章生成器了")
         print("   运行: python main.py")
+        print("   基准测试: python test_connection.py --benchmark")
         print("="*60)
         sys.exit(0)
     else:
@@ -114,4 +325,3 @@ if __name__ == "__main__":
         print("   重新测试: python test_connection.py")
         print("="*60)
         sys.exit(1)
-
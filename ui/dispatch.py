@@ -0,0 +1,212 @@
+"""
+后台任务与界面更新队列模块
+Tk 组件只能在主线程中操作。后台工作（初始化生成器、生成文章、刷新索引、搜索）交给常驻的工作线程执行，
+工作线程和事件总线只把界面更新放入线程安全的队列，主线程按固定间隔取出执行：
+
+- 带 key 的更新会合并，队列中同一个 key 只保留最新的一个（如状态栏文字、预取进度），
+  后台再忙也不会堆积大量过时的界面更新
+- 每轮最多执行 budget_ms 毫秒，剩下的留到下一轮，事件循环不会被长时间占用
+- 记录事件循环延迟（定时器实际触发比预定晚多少）和更新在队列中的等待时间
+"""
+
+import collections
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# 导入指标（使用相对导入）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.benchmark import percentile
+from src.metrics import Histogram
+
+# 取出更新的间隔和每轮的时间上限（毫秒）
+DRAIN_INTERVAL_MS = 16
+DRAIN_BUDGET_MS = 8
+# 常驻工作线程数（生成文章 + 历史记录刷新/搜索可以同时进行）
+WORKERS = 2
+
+# 事件循环延迟和队列等待时间的直方图分桶（秒）
+UI_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# 计算分位数时保留的最近样本数
+RECENT_SAMPLES = 1000
+
+
+class UIQueue:
+    """线程安全的界面更新队列，由主线程定时取出执行"""
+
+    def __init__(self, root, interval_ms: int = DRAIN_INTERVAL_MS, budget_ms: int = DRAIN_BUDGET_MS):
+        """
+        Args:
+            root: Tk 根窗口
+            interval_ms: 取出更新的间隔（毫秒）
+            budget_ms: 每轮执行更新的时间上限（毫秒）
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self.budget = budget_ms / 1000
+        self._lock = threading.Lock()
+        # {key: (回调, 参数, 放入时间)}，不合并的更新使用递增的整数 key
+        self._pending: 'collections.OrderedDict' = collections.OrderedDict()
+        self._sequence = 0
+        self._job = None
+        self._due = 0.0
+        self.posted = 0
+        self.coalesced = 0
+        self.executed = 0
+        self.loop_latency = Histogram(UI_LATENCY_BUCKETS)
+        self.queue_wait = Histogram(UI_LATENCY_BUCKETS)
+        self._recent_latency: collections.deque = collections.deque(maxlen=RECENT_SAMPLES)
+        self._recent_wait: collections.deque = collections.deque(maxlen=RECENT_SAMPLES)
+
+    def post(self, callback: Callable, *args, key: Optional[str] = None):
+        """
+        放入一个界面更新（可以在任何线程中调用）
+
+        Args:
+            callback: 在主线程中执行的回调
+            *args: 回调参数
+            key: 合并键，队列中已有同一个 key 的更新时用新的替换（位置不变）
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self.posted += 1
+            if key is None:
+                self._sequence += 1
+                key = self._sequence
+            elif key in self._pending:
+                self.coalesced += 1
+                # 保留最早的放入时间，等待时间反映界面实际落后多久
+                now = self._pending[key][2]
+            self._pending[key] = (callback, args, now)
+
+    def start(self):
+        """开始定时取出更新（在主线程中调用）"""
+        if self._job is None:
+            self._schedule()
+
+    def stop(self):
+        """停止取出更新，丢弃队列中剩余的更新（在主线程中调用）"""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        with self._lock:
+            self._pending.clear()
+
+    def _schedule(self):
+        self._due = time.perf_counter() + self.interval_ms / 1000
+        self._job = self.root.after(self.interval_ms, self._drain)
+
+    def _drain(self):
+        """执行队列中的更新，超过时间上限后把剩余的留到下一轮"""
+        started = time.perf_counter()
+        lateness = max(0.0, started - self._due)
+        self.loop_latency.observe(lateness)
+        self._recent_latency.append(lateness)
+
+        deadline = started + self.budget
+        while True:
+            with self._lock:
+                if not self._pending:
+                    break
+                _, (callback, args, posted_at) = self._pending.popitem(last=False)
+            now = time.perf_counter()
+            self.queue_wait.observe(now - posted_at)
+            self._recent_wait.append(now - posted_at)
+            try:
+                callback(*args)
+            except Exception as e:
+                # 一个更新出错不影响后续更新
+                print(f"⚠️  UI update failed: {e}", file=sys.stderr)
+            self.executed += 1
+            if time.perf_counter() >= deadline:
+                break
+        self._schedule()
+
+    def stats(self) -> Dict:
+        """
+        队列统计
+
+        Returns:
+            包含 posted、coalesced、executed、pending、loop_latency_p50/p95/p99/max、
+            queue_wait_p50/p95（毫秒）的字典
+        """
+        latency = list(self._recent_latency)
+        wait = list(self._recent_wait)
+        with self._lock:
+            pending = len(self._pending)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            'posted': self.posted,
+            'coalesced': self.coalesced,
+            'executed': self.executed,
+            'pending': pending,
+            'loop_latency_p50_ms': ms(percentile(latency, 50)),
+            'loop_latency_p95_ms': ms(percentile(latency, 95)),
+            'loop_latency_p99_ms': ms(percentile(latency, 99)),
+            'loop_latency_max_ms': ms(max(latency)) if latency else None,
+            'queue_wait_p50_ms': ms(percentile(wait, 50)),
+            'queue_wait_p95_ms': ms(percentile(wait, 95)),
+        }
+
+
+class BackgroundWorker:
+    """
+    常驻的后台工作线程
+
+    任务按提交顺序由 WORKERS 个线程执行，结果通过 UIQueue 交回主线程。
+    使用守护线程（而不是 ThreadPoolExecutor），关闭窗口时不必等待进行中的API请求。
+    """
+
+    def __init__(self, ui_queue: UIQueue, workers: int = WORKERS):
+        """
+        Args:
+            ui_queue: 界面更新队列
+            workers: 工作线程数
+        """
+        self.ui_queue = ui_queue
+        self._tasks: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads = [threading.Thread(target=self._run, name=f'ui-worker-{index}', daemon=True)
+                         for index in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func: Callable, *args, on_done: Optional[Callable] = None,
+               on_error: Optional[Callable[[Exception], None]] = None):
+        """
+        在工作线程中执行 func(*args)
+
+        Args:
+            func: 后台任务（不能操作 Tk 组件）
+            *args: 任务参数
+            on_done: 成功时在主线程中以返回值调用
+            on_error: 出错时在主线程中以异常调用（为 None 时打印错误）
+        """
+        self._tasks.put((func, args, on_done, on_error))
+
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            func, args, on_done, on_error = task
+            try:
+                result = func(*args)
+            except Exception as e:
+                if on_error:
+                    self.ui_queue.post(on_error, e)
+                else:
+                    print(f"⚠️  Background task failed: {e}", file=sys.stderr)
+                continue
+            if on_done:
+                self.ui_queue.post(on_done, result)
+
+    def shutdown(self):
+        """通知工作线程在完成当前任务后退出（不等待）"""
+        for _ in self._threads:
+            self._tasks.put(None)
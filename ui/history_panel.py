@@ -0,0 +1,298 @@
+"""
+历史记录面板模块
+浏览、筛选、全文搜索和预览 output/ 中已生成的文章
+"""
+
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from .themes import AppTheme
+from .components import ModernButton, ModernEntry
+from .utils import center_window, format_file_size, show_error, truncate_text
+from .dispatch import BackgroundWorker, UIQueue
+
+# 导入索引（使用相对导入）
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.history import HistoryIndex
+from src.search import SearchIndex
+from src.storage import read_article
+
+
+class HistoryPanel(tk.Toplevel):
+    """
+    历史记录窗口
+
+    列表按需分页加载：先插入一页，滚动接近底部时再插入下一页，
+    即使目录中有上万篇文章也能立即打开。
+    """
+
+    PAGE_SIZE = 200
+
+    def __init__(self, parent, index: HistoryIndex, search_index: Optional[SearchIndex] = None,
+                 on_open: Optional[Callable[[str, str], None]] = None,
+                 worker: Optional[BackgroundWorker] = None):
+        """
+        初始化历史记录窗口
+
+        Args:
+            parent: 父窗口
+            index: 历史文章索引
+            search_index: 全文搜索索引（为 None 时不显示搜索按钮）
+            on_open: 在主窗口打开文章的回调，参数为 (主题, 文章内容)
+            worker: 执行刷新和搜索的后台工作线程（为 None 时创建窗口自己的）
+        """
+        super().__init__(parent)
+        self.title("历史文章")
+        self.configure(bg=AppTheme.get_color('bg_secondary'))
+        center_window(self, 900, 600)
+
+        self.index = index
+        self.search_index = search_index
+        self.on_open = on_open
+        self.rows: List[Dict] = []
+        self.loaded = 0
+        self.entries_by_path: Dict[str, Dict] = {}
+        self._filter_job = None
+        self._own_queue: Optional[UIQueue] = None
+        if worker is None:
+            self._own_queue = UIQueue(self)
+            self._own_queue.start()
+            worker = BackgroundWorker(self._own_queue, workers=1)
+            self.bind('<Destroy>', self._on_destroy, add='+')
+        self.worker = worker
+
+        self.create_ui()
+        self.refresh()
+
+    def create_ui(self):
+        """创建界面"""
+        container = tk.Frame(self, bg=AppTheme.get_color('bg_secondary'))
+        container.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+
+        # 搜索栏
+        toolbar = tk.Frame(container, bg=AppTheme.get_color('bg_secondary'))
+        toolbar.pack(fill=tk.X, pady=(0, 10))
+
+        self.filter_entry = ModernEntry(toolbar, placeholder="按主题或标题筛选，回车全文搜索", width=40)
+        self.filter_entry.pack(side=tk.LEFT)
+        self.filter_entry.bind('<KeyRelease>', self.on_filter_changed)
+
+        if self.search_index:
+            self.filter_entry.bind('<Return>', lambda event: self.search())
+            self.search_btn = ModernButton(toolbar, text="🔍 全文搜索", command=self.search,
+                                           style='primary', width=10)
+            self.search_btn.pack(side=tk.LEFT, padx=(10, 0))
+
+        self.refresh_btn = ModernButton(toolbar, text="🔄 刷新", command=self.refresh,
+                                        style='secondary', width=8)
+        self.refresh_btn.pack(side=tk.LEFT, padx=(10, 0))
+
+        self.count_label = tk.Label(
+            toolbar,
+            text="正在加载...",
+            font=AppTheme.get_font('small'),
+            bg=AppTheme.get_color('bg_secondary'),
+            fg=AppTheme.get_color('text_secondary')
+        )
+        self.count_label.pack(side=tk.RIGHT)
+
+        # 列表和预览
+        panes = ttk.PanedWindow(container, orient=tk.HORIZONTAL)
+        panes.pack(fill=tk.BOTH, expand=True)
+
+        list_frame = tk.Frame(panes, bg=AppTheme.get_color('bg_primary'))
+        columns = ('title', 'words', 'modified')
+        self.tree = ttk.Treeview(list_frame, columns=columns, show='headings', selectmode='browse')
+        self.tree.heading('title', text="标题 / 主题")
+        self.tree.heading('words', text="字数")
+        self.tree.heading('modified', text="修改时间")
+        self.tree.column('title', width=260)
+        self.tree.column('words', width=60, anchor=tk.E)
+        self.tree.column('modified', width=130)
+
+        self.scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+        self.tree.bind('<Double-1>', lambda event: self.open_selected())
+        panes.add(list_frame, weight=1)
+
+        self.preview = scrolledtext.ScrolledText(
+            panes,
+            font=AppTheme.get_font('body_en'),
+            bg=AppTheme.get_color('bg_primary'),
+            fg=AppTheme.get_color('text_primary'),
+            relief=tk.FLAT,
+            wrap=tk.WORD,
+            padx=10,
+            pady=10
+        )
+        self.preview.config(state=tk.DISABLED)
+        panes.add(self.preview, weight=1)
+
+        # 底部按钮
+        bottom = tk.Frame(container, bg=AppTheme.get_color('bg_secondary'))
+        bottom.pack(fill=tk.X, pady=(10, 0))
+
+        self.detail_label = tk.Label(
+            bottom,
+            text="",
+            font=AppTheme.get_font('small'),
+            bg=AppTheme.get_color('bg_secondary'),
+            fg=AppTheme.get_color('text_tertiary'),
+            anchor=tk.W
+        )
+        self.detail_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        open_btn = ModernButton(bottom, text="📄 在主窗口打开", command=self.open_selected,
+                                style='primary', width=14)
+        open_btn.pack(side=tk.RIGHT)
+
+    def _on_destroy(self, event):
+        """窗口关闭时停止自己的工作线程"""
+        if event.widget is self:
+            self._own_queue.stop()
+            self.worker.shutdown()
+
+    def refresh(self):
+        """在后台线程增量刷新索引"""
+        self.refresh_btn.set_loading(True)
+        self.worker.submit(self.index.refresh, on_done=self.on_refreshed,
+                           on_error=lambda e: self.on_refresh_error(str(e)))
+
+    def on_refreshed(self, changes):
+        """索引刷新完成回调"""
+        if not self.winfo_exists():
+            return
+        self.refresh_btn.set_loading(False)
+        self.apply_filter()
+        added, updated, removed = changes
+        if added or updated or removed:
+            self.detail_label.config(text=f"新增 {added} 篇，更新 {updated} 篇，移除 {removed} 篇")
+
+    def on_refresh_error(self, error_msg: str):
+        """索引刷新失败回调"""
+        if not self.winfo_exists():
+            return
+        self.refresh_btn.set_loading(False)
+        show_error("刷新失败", f"无法读取文章目录:\n\n{error_msg}", self)
+
+    def search(self):
+        """在后台线程全文搜索（先同步索引，再按相关度排序显示结果）"""
+        query = self.filter_entry.get_value().strip()
+        if not query or not self.search_index:
+            return
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+            self._filter_job = None
+        self.search_btn.set_loading(True)
+        self.count_label.config(text="正在搜索...")
+
+        def search_task():
+            self.search_index.refresh()
+            return self.search_index.search(query, limit=200)
+
+        self.worker.submit(search_task, on_done=lambda results: self.on_search_done(query, results),
+                           on_error=lambda e: self.on_search_error(str(e)))
+
+    def on_search_done(self, query: str, results: List[Dict]):
+        """搜索完成回调"""
+        if not self.winfo_exists():
+            return
+        self.search_btn.set_loading(False)
+        self.show_rows(results)
+        self.count_label.config(text=f"“{truncate_text(query, 20)}” 找到 {len(results)} 篇")
+        if results:
+            self.detail_label.config(text=results[0]['snippet'])
+
+    def on_search_error(self, error_msg: str):
+        """搜索失败回调"""
+        if not self.winfo_exists():
+            return
+        self.search_btn.set_loading(False)
+        self.count_label.config(text="")
+        show_error("搜索失败", f"搜索时出错:\n\n{error_msg}", self)
+
+    def on_filter_changed(self, event=None):
+        """筛选条件变化（停止输入200毫秒后再筛选）"""
+        if event is not None and event.keysym == 'Return':
+            return
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(200, self.apply_filter)
+
+    def apply_filter(self):
+        """按筛选条件重新填充列表（只插入第一页）"""
+        self._filter_job = None
+        self.show_rows(self.index.entries(self.filter_entry.get_value()))
+        self.count_label.config(text=f"共 {len(self.rows)} 篇")
+
+    def show_rows(self, rows: List[Dict]):
+        """
+        替换列表内容（只插入第一页）
+
+        Args:
+            rows: 条目列表（索引条目或搜索结果）
+        """
+        self.rows = rows
+        self.entries_by_path = {}
+        self.loaded = 0
+        self.tree.delete(*self.tree.get_children())
+        self.load_more()
+
+    def load_more(self):
+        """插入下一页"""
+        page = self.rows[self.loaded:self.loaded + self.PAGE_SIZE]
+        for entry in page:
+            modified = datetime.fromtimestamp(entry['mtime']).strftime('%Y-%m-%d %H:%M')
+            label = truncate_text(entry['title'] or entry['topic'] or entry['path'], 60)
+            self.tree.insert('', tk.END, iid=entry['path'], values=(label, entry['words'], modified))
+            self.entries_by_path[entry['path']] = entry
+        self.loaded += len(page)
+
+    def on_scroll(self, first, last):
+        """列表滚动：更新滚动条，接近底部时加载下一页"""
+        self.scrollbar.set(first, last)
+        if float(last) > 0.9 and self.loaded < len(self.rows):
+            self.after_idle(self.load_more)
+
+    def selected_entry(self) -> Optional[Dict]:
+        """当前选中的条目"""
+        selection = self.tree.selection()
+        return self.entries_by_path.get(selection[0]) if selection else None
+
+    def on_select(self, event=None):
+        """显示选中文章的预览"""
+        entry = self.selected_entry()
+        if not entry:
+            return
+        try:
+            article = read_article(self.index.full_path(entry))
+        except (OSError, UnicodeDecodeError) as e:
+            show_error("读取失败", f"无法读取文章:\n\n{str(e)}", self)
+            return
+
+        self.preview.config(state=tk.NORMAL)
+        self.preview.delete(1.0, tk.END)
+        self.preview.insert(1.0, f"{article['title']}\n\n{article['body']}")
+        self.preview.config(state=tk.DISABLED)
+        self.detail_label.config(
+            text=f"{entry['path']} | 主题: {entry['topic'] or '-'} | {format_file_size(entry['size'])}"
+        )
+
+    def open_selected(self):
+        """在主窗口中打开选中的文章"""
+        entry = self.selected_entry()
+        if not entry or not self.on_open:
+            return
+        try:
+            article = read_article(self.index.full_path(entry))
+        except (OSError, UnicodeDecodeError) as e:
+            show_error("读取失败", f"无法读取文章:\n\n{str(e)}", self)
+            return
+        self.on_open(article['topic'] or entry['title'], f"{article['title']}\n\n{article['body']}")
@@ -5,7 +5,6 @@
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog
-import threading
 import os
 from typing import Optional
 from datetime import datetime
@@ -13,15 +12,28 @@ from datetime import datetime
 from .themes import AppTheme
 from .components import ModernButton, ModernEntry, ModernTextArea
 from .utils import center_window, show_error, show_success, show_info, validate_keyword, safe_filename
+from .prefetch import Prefetcher
+from .history_panel import HistoryPanel
+from .settings_dialog import SettingsDialog
+from .dispatch import BackgroundWorker, UIQueue
 
 # 导入生成器（使用相对导入）
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.generator import ArticleGenerator
+from src import events
+from src.history import HistoryIndex
+from src.search import index_saved, open_index
+from src.metrics import MetricsExporter
+from src.settings import ENV_NAMES, ENV_PATH, SettingsManager, write_env_file
+from src.storage import save_article as save_article_file
 
 
 class ArticleGeneratorApp:
     """文章生成器主应用程序"""
+
+    # 检查 config/.env 是否被修改的间隔（毫秒）
+    SETTINGS_POLL_MS = 2000
     
     def __init__(self, root: tk.Tk):
         """
@@ -53,7 +65,19 @@ class ArticleGeneratorApp:
         # 初始化变量
         self.generator: Optional[ArticleGenerator] = None
         self.is_generating = False
+        # 正在生成（非预取）的主题，用于筛选进度事件
+        self.generating_keyword = ""
         self.current_article = ""
+        self.metrics_exporter: Optional[MetricsExporter] = None
+        self.prefetcher: Optional[Prefetcher] = None
+        self.history_index = HistoryIndex("output")
+        self.search_index = open_index("output")
+        self.history_panel: Optional[HistoryPanel] = None
+
+        # 后台任务由常驻工作线程执行，界面更新经队列交回主线程
+        self.ui_queue = UIQueue(self.root)
+        self.worker = BackgroundWorker(self.ui_queue)
+        self.ui_queue.start()
         
         # 创建UI
         self.create_ui()
@@ -244,6 +268,26 @@ class ArticleGeneratorApp:
         )
         self.clear_btn.pack(side=tk.LEFT, padx=5)
 
+        # 历史记录按钮
+        self.history_btn = ModernButton(
+            button_container,
+            text="📚 历史记录",
+            command=self.open_history,
+            style='secondary',
+            width=12
+        )
+        self.history_btn.pack(side=tk.LEFT, padx=5)
+
+        # 设置按钮
+        self.settings_btn = ModernButton(
+            button_container,
+            text="⚙️ 设置",
+            command=self.open_settings,
+            style='secondary',
+            width=10
+        )
+        self.settings_btn.pack(side=tk.LEFT, padx=5)
+
     def create_output_section(self, parent):
         """创建输出区域"""
         output_frame = tk.LabelFrame(
@@ -311,29 +355,84 @@ class ArticleGeneratorApp:
 
     def initialize_generator(self):
         """初始化文章生成器"""
-        def init_task():
-            try:
-                self.update_status("正在初始化生成器...", 'busy')
-                self.generator = ArticleGenerator()
-
-                # 更新UI
-                self.root.after(0, lambda: self.on_generator_ready())
-
-            except Exception as e:
-                error_msg = str(e)
-                self.root.after(0, lambda: self.on_generator_error(error_msg))
+        # 界面只能在主线程中更新
+        self.update_status("正在初始化生成器...", 'busy')
 
         # 在后台线程初始化
-        thread = threading.Thread(target=init_task, daemon=True)
-        thread.start()
+        self.worker.submit(ArticleGenerator, on_done=self.on_generator_ready,
+                           on_error=lambda e: self.on_generator_error(str(e)))
+
+    def on_generator_ready(self, generator: ArticleGenerator):
+        """
+        生成器就绪回调
 
-    def on_generator_ready(self):
-        """生成器就绪回调"""
+        Args:
+            generator: 在后台线程中创建的生成器
+        """
+        self.generator = generator
         model_info = f"模型: {self.generator.model_name}"
         self.model_label.config(text=model_info)
         self.update_status("就绪 - 可以开始生成文章", 'ready')
         self.footer_label.config(text=f"就绪 | 目标字数: {self.generator.article_length} 词")
 
+        # 定时检查 config/.env，修改后立即生效
+        self.root.after(self.SETTINGS_POLL_MS, self.poll_settings)
+
+        # 进度事件在事件总线的线程中分发，放入界面更新队列（状态栏只需要显示最新的一个）
+        self.generator.events.subscribe(
+            lambda event: self.ui_queue.post(self.on_generation_event, event, key='generation-status'),
+            kinds=(events.STARTED, events.FIRST_TOKEN, events.RETRIED)
+        )
+
+        # 启动空闲预取（用户的任何键盘、鼠标操作都会推迟预取）
+        self.prefetcher = Prefetcher.from_env(
+            self.generator,
+            on_prefetched=lambda keyword: self.ui_queue.post(self.on_prefetched, keyword, key='prefetched')
+        )
+        if self.prefetcher:
+            self.root.bind_all('<Any-KeyPress>', lambda event: self.prefetcher.touch(), add='+')
+            self.root.bind_all('<Any-ButtonPress>', lambda event: self.prefetcher.touch(), add='+')
+            self.prefetcher.start()
+
+        # 配置了 METRICS_PORT 或 METRICS_FILE 时导出运行指标（预取缓存的命中率也在其中）
+        metrics = self.generator.enable_metrics()
+        if self.prefetcher:
+            metrics.add_cache('prefetch', self.prefetcher.cache)
+        metrics.add_histogram('ui_loop_latency_seconds', self.ui_queue.loop_latency,
+                              'How late the GUI update timer fires (UI event loop latency)')
+        metrics.add_histogram('ui_queue_wait_seconds', self.ui_queue.queue_wait,
+                              'Time GUI updates wait in the queue before running')
+        self.metrics_exporter = MetricsExporter.from_env(metrics)
+        if self.metrics_exporter.enabled:
+            try:
+                self.metrics_exporter.start()
+            except OSError as e:
+                print(f"⚠️  Cannot start metrics: {e}")
+
+    def on_generation_event(self, event: events.Event):
+        """
+        进度事件回调（在主线程中调用），只显示当前生成的文章的进度
+
+        Args:
+            event: 进度事件
+        """
+        if not self.is_generating or event.keyword != self.generating_keyword:
+            return
+        if event.kind == events.STARTED:
+            self.update_status(f"正在调用 {event.model}: {event.keyword}...", 'busy')
+        elif event.kind == events.FIRST_TOKEN:
+            self.update_status(f"正在接收: {event.keyword}...", 'busy')
+        elif event.kind == events.RETRIED:
+            self.update_status(f"第 {event.data['attempt']} 次重试（{event.data['delay']:.0f} 秒后）: {event.keyword}", 'busy')
+            self.footer_label.config(text=f"生成中... | 主题: {event.keyword} | {event.message}")
+
+    def on_prefetched(self, keyword: str):
+        """后台预取完成回调"""
+        if not self.is_generating:
+            self.footer_label.config(
+                text=f"⚡ 已预取 {self.prefetcher.prefetched} 篇 | 最新: {keyword}"
+            )
+
     def on_generator_error(self, error_msg: str):
         """生成器错误回调"""
         self.update_status("初始化失败", 'error')
@@ -343,6 +442,47 @@ class ArticleGeneratorApp:
             self.root
         )
 
+    def poll_settings(self):
+        """检查 config/.env 是否被修改（在主线程中定时调用）"""
+        if self.generator.settings_manager.check():
+            self.on_settings_changed()
+        self.root.after(self.SETTINGS_POLL_MS, self.poll_settings)
+
+    def on_settings_changed(self):
+        """配置变化后更新界面（进行中的生成仍使用原来的配置）"""
+        self.model_label.config(text=f"模型: {self.generator.model_name}")
+        if not self.is_generating:
+            self.footer_label.config(
+                text=f"设置已更新 | 模型: {self.generator.model_name} | 目标字数: {self.generator.article_length} 词"
+            )
+
+    def open_settings(self):
+        """打开设置窗口"""
+        SettingsDialog(self.root, self.generator.settings if self.generator else None,
+                       on_save=self.apply_settings, overridden=SettingsManager.overridden())
+
+    def apply_settings(self, values: dict) -> Optional[str]:
+        """
+        保存设置并立即生效
+
+        Args:
+            values: 变化的配置 {字段名: 值}
+
+        Returns:
+            错误信息（成功时返回 None）
+        """
+        if self.generator is None:
+            # 生成器还没有初始化成功（如缺少密钥），写入文件后重新初始化
+            write_env_file(ENV_PATH, {ENV_NAMES[name]: value for name, value in values.items()})
+            self.initialize_generator()
+            return None
+        try:
+            self.generator.settings_manager.update(persist=True, **values)
+        except (ValueError, OSError) as e:
+            return str(e)
+        self.on_settings_changed()
+        return None
+
     def update_status(self, message: str, status_type: str = 'idle'):
         """
         更新状态显示
@@ -388,8 +528,18 @@ class ArticleGeneratorApp:
         if not description:
             description = f"An essay about {keyword}"
 
+        # 命中预取缓存时直接显示
+        if self.prefetcher:
+            self.prefetcher.history.add(keyword)
+            article = self.prefetcher.take(keyword, description)
+            if article:
+                self.on_article_generated(keyword, article, prefetched=True)
+                return
+            self.prefetcher.begin_interactive()
+
         # 开始生成
         self.is_generating = True
+        self.generating_keyword = keyword
         self.generate_btn.set_loading(True)
         self.save_btn.config(state=tk.DISABLED)
         self.update_status(f"正在生成文章: {keyword}...", 'busy')
@@ -401,20 +551,22 @@ class ArticleGeneratorApp:
         self.output_text.config(state=tk.DISABLED)
 
         # 在后台线程生成
-        def generate_task():
-            try:
-                article = self.generator.generate_article(keyword, description)
-                self.root.after(0, lambda: self.on_article_generated(keyword, article))
-            except Exception as e:
-                error_msg = str(e)
-                self.root.after(0, lambda: self.on_generation_error(error_msg))
+        self.worker.submit(self.generator.generate_article, keyword, description,
+                           on_done=lambda article: self.on_article_generated(keyword, article),
+                           on_error=lambda e: self.on_generation_error(str(e)))
 
-        thread = threading.Thread(target=generate_task, daemon=True)
-        thread.start()
+    def on_article_generated(self, keyword: str, article: str, prefetched: bool = False):
+        """
+        文章生成完成回调
 
-    def on_article_generated(self, keyword: str, article: str):
-        """文章生成完成回调"""
+        Args:
+            keyword: 主题关键词
+            article: 文章内容
+            prefetched: 是否来自预取缓存
+        """
         self.is_generating = False
+        if self.prefetcher:
+            self.prefetcher.end_interactive()
         self.generate_btn.set_loading(False)
         self.save_btn.config(state=tk.NORMAL)
 
@@ -431,7 +583,8 @@ class ArticleGeneratorApp:
         # 更新状态
         word_count = len(article.split())
         self.update_status("生成完成", 'ready')
-        self.footer_label.config(text=f"生成完成 | 字数: {word_count} 词 | 主题: {keyword}")
+        source = " | ⚡ 预取命中" if prefetched else ""
+        self.footer_label.config(text=f"生成完成 | 字数: {word_count} 词 | 主题: {keyword}{source}")
 
         # 显示成功消息
         show_success("成功", f"文章生成完成！\n\n字数: {word_count} 词", self.root)
@@ -439,6 +592,8 @@ class ArticleGeneratorApp:
     def on_generation_error(self, error_msg: str):
         """生成错误回调"""
         self.is_generating = False
+        if self.prefetcher:
+            self.prefetcher.end_interactive()
         self.generate_btn.set_loading(False)
         self.update_status("生成失败", 'error')
         self.footer_label.config(text="生成失败")
@@ -473,15 +628,12 @@ class ArticleGeneratorApp:
             return
 
         try:
-            # 确保输出目录存在
-            os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else "output", exist_ok=True)
-
             # 保存文件
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"Topic: {self.current_keyword}\n")
-                f.write(f"{'='*60}\n\n")
-                f.write(self.current_article)
+            save_article_file(filepath, self.current_keyword, self.current_article)
 
+            # 更新历史和搜索索引
+            self.history_index.update(filepath)
+            index_saved(self.search_index, filepath, self.current_keyword, self.current_article)
             self.footer_label.config(text=f"已保存: {os.path.basename(filepath)}")
             show_success("保存成功", f"文章已保存到:\n{filepath}", self.root)
 
@@ -498,6 +650,38 @@ class ArticleGeneratorApp:
         self.save_btn.config(state=tk.DISABLED)
         self.footer_label.config(text="已清空")
 
+    def open_history(self):
+        """打开历史记录窗口（已打开时切换到前台）"""
+        if self.history_panel and self.history_panel.winfo_exists():
+            self.history_panel.lift()
+            self.history_panel.refresh()
+            return
+        self.history_panel = HistoryPanel(self.root, self.history_index, self.search_index,
+                                          on_open=self.on_history_open, worker=self.worker)
+
+    def on_history_open(self, keyword: str, article: str):
+        """
+        在主窗口显示历史文章
+
+        Args:
+            keyword: 主题关键词
+            article: 文章内容
+        """
+        if self.is_generating:
+            show_info("提示", "正在生成文章，请稍候...", self.root)
+            return
+
+        self.current_article = article
+        self.current_keyword = keyword
+
+        self.output_text.config(state=tk.NORMAL)
+        self.output_text.delete(1.0, tk.END)
+        self.output_text.insert(1.0, article)
+        self.output_text.config(state=tk.DISABLED)
+
+        self.save_btn.config(state=tk.NORMAL)
+        self.footer_label.config(text=f"历史文章 | 字数: {len(article.split())} 词 | 主题: {keyword}")
+
     def on_closing(self):
         """窗口关闭事件"""
         if self.is_generating:
@@ -509,6 +693,17 @@ class ArticleGeneratorApp:
             ):
                 return
 
+        if self.prefetcher:
+            self.prefetcher.stop()
+        self.ui_queue.stop()
+        self.worker.shutdown()
+        stats = self.ui_queue.stats()
+        if stats['loop_latency_p95_ms'] is not None:
+            print(f"📊 UI loop latency: p50 {stats['loop_latency_p50_ms']} ms, "
+                  f"p95 {stats['loop_latency_p95_ms']} ms, max {stats['loop_latency_max_ms']} ms | "
+                  f"{stats['executed']} updates ({stats['coalesced']} coalesced)")
+        if self.search_index:
+            self.search_index.close()
         self.root.destroy()
 
     def run(self):
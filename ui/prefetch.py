@@ -0,0 +1,260 @@
+"""
+空闲预取模块
+界面空闲时在后台预先生成用户最可能请求的文章，放入本地缓存
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+# 导入生成器（使用相对导入）
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.cache import ArticleCache
+from src.errors import GenerationError
+
+
+def default_description(keyword: str) -> str:
+    """界面在用户未填写描述时使用的默认描述"""
+    return f"An essay about {keyword}"
+
+
+class KeywordHistory:
+    """最近使用的关键词（持久化到JSON文件）"""
+
+    def __init__(self, path: str = os.path.join('output', '.keyword_history.json'), limit: int = 50):
+        """
+        Args:
+            path: 历史文件路径
+            limit: 最多保留的关键词数量
+        """
+        self.path = path
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._keywords: List[str] = self._load()
+
+    def _load(self) -> List[str]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return [str(keyword) for keyword in data][:self.limit]
+        except (OSError, ValueError, TypeError):
+            return []
+
+    def add(self, keyword: str):
+        """
+        记录一次使用（移到最前）
+
+        Args:
+            keyword: 主题关键词
+        """
+        with self._lock:
+            if keyword in self._keywords:
+                self._keywords.remove(keyword)
+            self._keywords.insert(0, keyword)
+            del self._keywords[self.limit:]
+            keywords = list(self._keywords)
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(keywords, f, ensure_ascii=False, indent=2)
+        except OSError:
+            pass
+
+    def recent(self) -> List[str]:
+        """最近使用的关键词（最新的在前）"""
+        with self._lock:
+            return list(self._keywords)
+
+
+class Prefetcher:
+    """
+    空闲预取器
+
+    在后台线程中运行，只有同时满足以下条件时才发起一次预取：
+        - 没有前台生成任务，且用户已有 idle_seconds 秒没有操作
+        - 限流器有空闲配额（不与前台请求排队竞争）
+        - 预取花费未超过 spend_cap，预取数量未超过 max_items
+    候选关键词依次来自最近使用的关键词和 config/topics.json。
+    """
+
+    def __init__(self, generator, cache: ArticleCache, history: KeywordHistory,
+                 topics_path: str = os.path.join('config', 'topics.json'),
+                 idle_seconds: float = 30.0, spend_cap: float = 0.05, max_items: int = 10,
+                 on_prefetched: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            generator: 文章生成器
+            cache: 文章缓存
+            history: 关键词历史
+            topics_path: 主题配置文件路径
+            idle_seconds: 用户无操作多少秒后开始预取
+            spend_cap: 本次会话预取花费上限（美元）
+            max_items: 本次会话最多预取的文章数
+            on_prefetched: 每预取一篇后的回调（在后台线程中调用）
+        """
+        self.generator = generator
+        self.cache = cache
+        self.history = history
+        self.topics_path = topics_path
+        self.idle_seconds = idle_seconds
+        self.spend_cap = spend_cap
+        self.max_items = max_items
+        self.on_prefetched = on_prefetched
+
+        self.spent = 0.0
+        self.prefetched = 0
+        self._last_activity = time.monotonic()
+        self._interactive = threading.Event()
+        self._stop = threading.Event()
+        self._failed: set = set()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, generator, on_prefetched: Optional[Callable[[str], None]] = None) -> Optional['Prefetcher']:
+        """
+        按环境变量创建预取器（默认关闭，PREFETCH_ENABLED=true 时才启用，否则返回 None）
+
+        Args:
+            generator: 文章生成器
+            on_prefetched: 每预取一篇后的回调
+
+        Returns:
+            Prefetcher 实例或 None
+        """
+        if os.getenv('PREFETCH_ENABLED', 'false').lower() not in ('1', 'true', 'yes', 'on'):
+            return None
+        return cls(
+            generator,
+            ArticleCache(),
+            KeywordHistory(),
+            idle_seconds=float(os.getenv('PREFETCH_IDLE_SECONDS', '30')),
+            spend_cap=float(os.getenv('PREFETCH_SPEND_CAP', '0.05')),
+            max_items=int(os.getenv('PREFETCH_MAX_ITEMS', '10')),
+            on_prefetched=on_prefetched
+        )
+
+    def cache_key(self, keyword: str, description: str) -> str:
+        """
+        计算界面请求对应的缓存指纹
+
+        Args:
+            keyword: 主题关键词
+            description: 主题描述
+
+        Returns:
+            请求指纹
+        """
+        prompt = self.generator.render_prompt(keyword, description)
+        return self.generator.request_key(prompt)
+
+    def take(self, keyword: str, description: str) -> Optional[str]:
+        """
+        取出预取的文章（取出后从缓存删除，下次请求会生成新文章）
+
+        Args:
+            keyword: 主题关键词
+            description: 主题描述
+
+        Returns:
+            文章内容，未预取时返回 None
+        """
+        entry = self.cache.pop(self.cache_key(keyword, description))
+        return entry['article'] if entry else None
+
+    def touch(self):
+        """记录一次用户操作"""
+        self._last_activity = time.monotonic()
+
+    def begin_interactive(self):
+        """前台生成开始，预取立即让路"""
+        self._interactive.set()
+        self.touch()
+
+    def end_interactive(self):
+        """前台生成结束"""
+        self._interactive.clear()
+        self.touch()
+
+    def start(self):
+        """启动后台预取线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止后台预取线程"""
+        self._stop.set()
+
+    def candidates(self) -> List[str]:
+        """
+        候选关键词（最近使用的在前，然后是主题配置中的关键词）
+
+        Returns:
+            去重后的关键词列表
+        """
+        keywords = self.history.recent()
+        try:
+            topics = self.generator.load_topics(self.topics_path)
+            for task in self.generator.build_tasks(topics):
+                keywords.append(task['keyword'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        seen = set()
+        result = []
+        for keyword in keywords:
+            if keyword not in seen:
+                seen.add(keyword)
+                result.append(keyword)
+        return result
+
+    def _next_candidate(self) -> Optional[str]:
+        for keyword in self.candidates():
+            if keyword in self._failed:
+                continue
+            if not self.cache.contains(self.cache_key(keyword, default_description(keyword))):
+                return keyword
+        return None
+
+    def _can_run(self, keyword: str) -> bool:
+        """当前是否可以发起一次预取"""
+        if self._interactive.is_set():
+            return False
+        if time.monotonic() - self._last_activity < self.idle_seconds:
+            return False
+        prompt = self.generator.render_prompt(keyword, default_description(keyword))
+        return self.generator.rate_limiter.has_capacity(self.generator.estimate_request_tokens(prompt))
+
+    def _run(self):
+        while not self._stop.wait(1.0):
+            if self.prefetched >= self.max_items or self.spent >= self.spend_cap:
+                return
+
+            keyword = self._next_candidate()
+            if keyword is None:
+                # 所有候选都已预取，稍后再检查（用户可能有了新的历史）
+                self._stop.wait(self.idle_seconds)
+                continue
+            if not self._can_run(keyword):
+                continue
+
+            description = default_description(keyword)
+            # 只统计这次预取请求自己的用量（同时进行的前台或批量请求不计入预取上限）
+            usage = {'cost': 0.0}
+            try:
+                with self.generator.budget.track(usage):
+                    article = self.generator.generate_article(keyword, description)
+            except GenerationError:
+                self._failed.add(keyword)
+                continue
+            finally:
+                self.spent += usage['cost']
+
+            self.cache.put(self.cache_key(keyword, description), keyword, article, prefetched=True)
+            self.prefetched += 1
+            if self.on_prefetched:
+                self.on_prefetched(keyword)
@@ -0,0 +1,127 @@
+"""
+设置对话框模块
+修改 API 地址、密钥、模型和生成参数，保存到 config/.env 后立即生效，无需重启程序
+"""
+
+import tkinter as tk
+from typing import Callable, Dict, List, Optional
+
+from .themes import AppTheme
+from .components import ModernButton, ModernEntry
+from .utils import center_window, show_error, show_warning
+
+# 导入配置（使用相对导入）
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.settings import Settings
+
+
+class SettingsDialog(tk.Toplevel):
+    """设置窗口"""
+
+    # (字段名, 标签, 说明)
+    FIELDS = [
+        ('api_base_url', "API 地址", "如 https://api.siliconflow.cn/v1"),
+        ('api_key', "API 密钥", "修改地址或密钥会建立新连接"),
+        ('model_name', "模型", "如 Qwen/Qwen2.5-7B-Instruct"),
+        ('temperature', "温度", "0-2，越高越有变化"),
+        ('article_length', "目标字数", "单位：词"),
+        ('max_tokens', "最大 token 数", "单次回复的上限"),
+        ('candidates', "候选文章数", "大于1时一次生成多篇并选出最好的一篇"),
+    ]
+
+    def __init__(self, parent, settings: Optional[Settings],
+                 on_save: Callable[[Dict[str, str]], Optional[str]],
+                 overridden: Optional[List[str]] = None):
+        """
+        初始化设置窗口
+
+        Args:
+            parent: 父窗口
+            settings: 当前配置快照（生成器初始化失败时为 None）
+            on_save: 保存回调，参数为 {字段名: 值}，返回错误信息（成功时返回 None）
+            overridden: 由环境变量指定、在这里修改不会生效的配置项
+        """
+        super().__init__(parent)
+        self.title("设置")
+        self.configure(bg=AppTheme.get_color('bg_secondary'))
+        self.resizable(False, False)
+        self.transient(parent)
+        center_window(self, 520, 470)
+
+        self.settings = settings
+        self.on_save = on_save
+        self.overridden = overridden or []
+        self.entries: Dict[str, ModernEntry] = {}
+
+        self.create_ui()
+        self.grab_set()
+
+    def create_ui(self):
+        """创建界面"""
+        container = tk.Frame(self, bg=AppTheme.get_color('bg_secondary'))
+        container.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+        for row, (name, label, hint) in enumerate(self.FIELDS):
+            tk.Label(
+                container,
+                text=label,
+                font=AppTheme.get_font('body'),
+                bg=AppTheme.get_color('bg_secondary'),
+                fg=AppTheme.get_color('text_primary'),
+                anchor=tk.W
+            ).grid(row=row * 2, column=0, sticky=tk.W, pady=(8, 0))
+
+            entry = ModernEntry(container, width=36, show='*' if name == 'api_key' else '')
+            if self.settings is not None:
+                entry.insert(0, str(getattr(self.settings, name)))
+            entry.grid(row=row * 2, column=1, sticky=tk.EW, pady=(8, 0), padx=(10, 0))
+            self.entries[name] = entry
+
+            tk.Label(
+                container,
+                text=hint,
+                font=AppTheme.get_font('small'),
+                bg=AppTheme.get_color('bg_secondary'),
+                fg=AppTheme.get_color('text_tertiary'),
+                anchor=tk.W
+            ).grid(row=row * 2 + 1, column=1, sticky=tk.W, padx=(10, 0))
+
+        container.columnconfigure(1, weight=1)
+
+        if self.overridden:
+            tk.Label(
+                container,
+                text=f"以下配置由环境变量指定，修改后不会生效：{', '.join(self.overridden)}",
+                font=AppTheme.get_font('small'),
+                bg=AppTheme.get_color('bg_secondary'),
+                fg=AppTheme.get_color('warning'),
+                wraplength=460,
+                justify=tk.LEFT
+            ).grid(row=len(self.FIELDS) * 2, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+
+        buttons = tk.Frame(self, bg=AppTheme.get_color('bg_secondary'))
+        buttons.pack(fill=tk.X, padx=20, pady=(0, 20))
+        ModernButton(buttons, text="取消", command=self.destroy, style='secondary', width=10).pack(side=tk.RIGHT)
+        ModernButton(buttons, text="💾 保存", command=self.save, style='primary',
+                     width=10).pack(side=tk.RIGHT, padx=(0, 10))
+
+    def save(self):
+        """保存修改（只提交变化的项）"""
+        values = {name: entry.get_value().strip() for name, entry in self.entries.items()}
+        if not values['api_key']:
+            show_warning("提示", "请填写 API 密钥", self)
+            return
+        if self.settings is not None:
+            values = {name: value for name, value in values.items()
+                      if value != str(getattr(self.settings, name))}
+        if not values:
+            self.destroy()
+            return
+
+        error = self.on_save(values)
+        if error:
+            show_error("保存失败", f"配置无效:\n\n{error}", self)
+            return
+        self.destroy()
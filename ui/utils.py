@@ -3,10 +3,16 @@ UI工具模块
 提供UI相关的辅助函数
 """
 
+import os
+import sys
 import tkinter as tk
 from tkinter import messagebox
 from typing import Optional
 
+# 导入存储模块（使用相对导入）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.storage import safe_name
+
 
 def center_window(window: tk.Tk, width: int, height: int):
     """
@@ -150,7 +156,7 @@ def validate_keyword(keyword: str) -> tuple[bool, str]:
 
 def safe_filename(filename: str) -> str:
     """
-    生成安全的文件名
+    生成安全的文件名（与批量生成的文件名使用同一套规则，见 src/storage.py 的 safe_name）
     
     Args:
         filename: 原始文件名
@@ -158,10 +164,5 @@ def safe_filename(filename: str) -> str:
     Returns:
         安全的文件名
     """
-    # 替换不安全的字符
-    unsafe_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|']
-    safe_name = filename
-    for char in unsafe_chars:
-        safe_name = safe_name.replace(char, '_')
-    return safe_name
+    return safe_name(filename)
 